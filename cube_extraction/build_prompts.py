@@ -0,0 +1,260 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Builds CUBE-1K style prompt datasets from extracted cultural artifacts.
+
+The script reads the artifacts of every concept, as grouped by country by
+merge_artifacts.py in any of its formats, and writes prompts such as "A high
+resolution image of sushi from Japanese cuisine, realistic" to JSON Lines
+shards, with the fields of dataset/cube_1k.json that evaluate_cube_1k.py reads.
+
+Every (concept, country) pair is a stratum. Artifact names are deduplicated
+within a stratum, and the prompts are split as evenly as possible across
+strata: strata with fewer artifacts than their share contribute all of them,
+and the others share the rest. The artifacts of a stratum are sampled with a
+random generator seeded by the seed and the stratum, so a stratum samples the
+same artifacts whatever the other strata. Prompts are written round-robin over
+strata, and shards take every num_shards-th prompt, so every shard and every
+prefix of a shard is stratified.
+
+Example usage:
+
+  python3 build_prompts.py --artifacts=cuisine=outs/cuisine_artifacts.json,\
+art=outs/art_artifacts.json,landmarks=outs/landmarks_artifacts.json \
+      --num_prompts=100000 --num_shards=8 --output_dir=dataset/cube_100k
+"""
+
+import json
+import os
+import random
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from absl import app
+from absl import flags
+
+from cube_t2i.cube_extraction import constants
+from cube_t2i.cube_extraction import jsonl_io
+
+
+_ARTIFACTS = flags.DEFINE_list(
+    name='artifacts',
+    default=None,
+    help=(
+        'Artifacts of every concept, as <concept>=<path> pairs of a concept of'
+        ' constants.PROMPT_TEMPLATES and an output of merge_artifacts.py.'
+    ),
+    required=True,
+)
+_NUM_PROMPTS = flags.DEFINE_integer(
+    name='num_prompts',
+    default=0,
+    help='Number of prompts, or 0 for one prompt per distinct artifact.',
+)
+_SEED = flags.DEFINE_integer(
+    name='seed', default=0, help='Seed of the sampling of artifacts.'
+)
+_NUM_SHARDS = flags.DEFINE_integer(
+    name='num_shards', default=1, help='Number of JSON Lines shards.'
+)
+_OUTPUT_DIR = flags.DEFINE_string(
+    name='output_dir',
+    default=None,
+    help='Directory to write prompts-<shard>-of-<num_shards>.jsonl to.',
+    required=True,
+)
+
+# The title merge_artifacts.py gives to artifacts without a Wikipedia page.
+_TITLE_NOT_FOUND = 'Title Not Found'
+
+Artifact = Dict[str, Any]
+Stratum = Tuple[str, str]
+
+
+def artifact_name(artifact: Artifact) -> Optional[str]:
+  """Returns the name of an artifact in prompts, or None if it has none.
+
+  The KB name of the artifact, or else the title of its Wikipedia page, with
+  whitespace collapsed.
+  """
+  name = artifact.get('name') or ''
+  if not name.strip():
+    title = artifact.get('title') or ''
+    name = '' if title == _TITLE_NOT_FOUND else title.replace('_', ' ')
+  return ' '.join(name.split()) or None
+
+
+def distinct_artifacts(artifacts: Iterable[Artifact]) -> List[Artifact]:
+  """Returns the first artifact of every name, ignoring case.
+
+  Artifacts without a name are skipped. The name of every returned artifact is
+  in its 'name' key.
+  """
+  by_name = {}
+  for artifact in artifacts:
+    name = artifact_name(artifact)
+    if name is not None:
+      by_name.setdefault(name.casefold(), dict(artifact, name=name))
+  return list(by_name.values())
+
+
+def load_artifacts_by_country(path: str) -> Dict[str, List[Artifact]]:
+  """Reads an output of merge_artifacts.py, in any of its formats."""
+  if jsonl_io.path_format(path) == 'json':
+    with open(path, 'r', encoding='utf-8') as f:
+      return json.load(f)
+  artifacts_by_country = {}
+  for artifact in jsonl_io.read_records(path):
+    country = artifact.pop('country')
+    artifacts_by_country.setdefault(country, []).append(artifact)
+  return artifacts_by_country
+
+
+def load_strata(
+    concept_paths: Dict[str, str],
+) -> Dict[Stratum, List[Artifact]]:
+  """Reads the distinct artifacts of every (concept, country) stratum.
+
+  Args:
+    concept_paths: Path of the output of merge_artifacts.py of every concept.
+
+  Raises:
+    ValueError: If a concept has no prompt template.
+  """
+  strata = {}
+  for concept, path in concept_paths.items():
+    if concept not in constants.PROMPT_TEMPLATES:
+      raise ValueError(f'No prompt template for concept {concept!r}.')
+    artifacts_by_country = load_artifacts_by_country(path)
+    for country, artifacts in artifacts_by_country.items():
+      artifacts = distinct_artifacts(artifacts)
+      if artifacts:
+        strata[concept, country] = artifacts
+  return strata
+
+
+def allocate(sizes: Dict[Stratum, int], num_prompts: int) -> Dict[Stratum, int]:
+  """Splits prompts as evenly as possible across strata of limited sizes.
+
+  Args:
+    sizes: Number of distinct artifacts of every stratum.
+    num_prompts: Number of prompts to split.
+
+  Returns:
+    The number of prompts of every stratum, at most its size, adding up to
+    `num_prompts` or to the total size if that is smaller.
+  """
+  allocation = {}
+  remaining = num_prompts
+  # Small strata take what they have, leaving more to the larger ones.
+  ordered = sorted(sizes, key=lambda stratum: (sizes[stratum], stratum))
+  for i, stratum in enumerate(ordered):
+    allocation[stratum] = min(sizes[stratum], remaining // (len(ordered) - i))
+    remaining -= allocation[stratum]
+  return allocation
+
+
+def prompt_record(concept: str, country: str, artifact: Artifact) -> Artifact:
+  """Returns the dataset entry of the prompt of an artifact."""
+  template = constants.ROOT_PROMPT_TEMPLATES.get(
+      artifact.get('root'), constants.PROMPT_TEMPLATES[concept]
+  )
+  return {
+      'id': artifact.get('id'),
+      'name': artifact['name'],
+      'country': country,
+      'domain': concept,
+      'root': artifact.get('root'),
+      'prompt': template.format(
+          name=artifact['name'],
+          country=country,
+          adjective=constants.country_to_adjective.get(country, country),
+      ),
+  }
+
+
+def build_prompts(
+    strata: Dict[Stratum, List[Artifact]],
+    num_prompts: int = 0,
+    seed: int = 0,
+) -> Iterator[Artifact]:
+  """Yields the prompts of a stratified sample of artifacts.
+
+  Args:
+    strata: Distinct artifacts of every (concept, country) stratum.
+    num_prompts: Number of prompts, or 0 for one prompt per artifact.
+    seed: Seed of the sampling.
+
+  Yields:
+    Dataset entries, round-robin over strata in sorted order.
+  """
+  sizes = {stratum: len(artifacts) for stratum, artifacts in strata.items()}
+  allocation = allocate(sizes, num_prompts or sum(sizes.values()))
+  samples = []
+  for stratum in sorted(strata):
+    rng = random.Random(f'{seed}:{stratum[0]}:{stratum[1]}')
+    samples.append((stratum, rng.sample(strata[stratum], allocation[stratum])))
+  for i in range(max(allocation.values(), default=0)):
+    for (concept, country), artifacts in samples:
+      if i < len(artifacts):
+        yield prompt_record(concept, country, artifacts[i])
+
+
+def shard_path(output_dir: str, shard_index: int, num_shards: int) -> str:
+  return os.path.join(
+      output_dir, f'prompts-{shard_index:05d}-of-{num_shards:05d}.jsonl'
+  )
+
+
+def write_shards(
+    records: Iterable[Artifact], output_dir: str, num_shards: int = 1
+) -> int:
+  """Writes records round-robin to JSON Lines shards, as they are generated.
+
+  Returns:
+    The number of records written.
+  """
+  os.makedirs(output_dir, exist_ok=True)
+  shard_files = [
+      open(shard_path(output_dir, i, num_shards), 'w', encoding='utf-8')
+      for i in range(num_shards)
+  ]
+  num_records = 0
+  try:
+    for num_records, record in enumerate(records, start=1):
+      shard_files[(num_records - 1) % num_shards].write(
+          json.dumps(record, ensure_ascii=False) + '\n'
+      )
+  finally:
+    for shard_file in shard_files:
+      shard_file.close()
+  return num_records
+
+
+def main(_):
+  concept_paths = dict(pair.split('=', 1) for pair in _ARTIFACTS.value)
+  strata = load_strata(concept_paths)
+  num_records = write_shards(
+      build_prompts(strata, _NUM_PROMPTS.value, _SEED.value),
+      _OUTPUT_DIR.value,
+      _NUM_SHARDS.value,
+  )
+  print(
+      f'Wrote {num_records} prompts of {len(strata)} strata to'
+      f' {_OUTPUT_DIR.value}.'
+  )
+
+
+if __name__ == '__main__':
+  app.run(main)
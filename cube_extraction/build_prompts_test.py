@@ -0,0 +1,156 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import collections
+import json
+import os
+import tempfile
+import unittest
+
+from absl import app
+from absl import flags
+from absl.testing import flagsaver
+
+from cube_t2i.cube_extraction import build_prompts
+from cube_t2i.cube_extraction import jsonl_io
+
+
+def _artifacts(country, n, root="dish"):
+  return [
+      {"id": f"Q{i}", "name": f"{country} dish {i}", "root": root}
+      for i in range(n)
+  ]
+
+
+class BuildPromptsTest(unittest.TestCase):
+  """Test class for build_prompts.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.tmp_dir = tmp_dir.name
+
+  def test_prompts_follow_cube_1k_templates(self):
+    cuisine = build_prompts.prompt_record(
+        "cuisine", "Brazil", {"id": "Q1", "name": "carne de panela"}
+    )
+    self.assertEqual(
+        cuisine["prompt"],
+        "A high resolution image of carne de panela from Brazilian cuisine,"
+        " realistic",
+    )
+    self.assertEqual(cuisine["domain"], "cuisine")
+    dance = build_prompts.prompt_record(
+        "art", "Brazil", {"name": "samba", "root": "type of dance"}
+    )
+    self.assertEqual(
+        dance["prompt"], "An image of samba performance from Brazil, realistic"
+    )
+
+  def test_names_are_deduplicated(self):
+    artifacts = [
+        {"id": "Q1", "name": "Sushi"},
+        {"id": "Q2", "name": " sushi "},
+        {"id": "Q3", "name": "", "title": "Soba_noodles"},
+        {"id": "Q4", "title": "Title Not Found"},
+    ]
+    self.assertEqual(
+        [
+            (a["id"], a["name"])
+            for a in build_prompts.distinct_artifacts(artifacts)
+        ],
+        [("Q1", "Sushi"), ("Q3", "Soba noodles")],
+    )
+
+  def test_artifacts_are_read_in_any_format(self):
+    artifacts = {
+        "Japan": _artifacts("Japan", 2),
+        "India": _artifacts("India", 1),
+    }
+    json_path = os.path.join(self.tmp_dir, "artifacts.json")
+    with open(json_path, "w") as f:
+      json.dump(artifacts, f)
+    # As merge_artifacts.py writes JSON Lines.
+    jsonl_path = os.path.join(self.tmp_dir, "artifacts.jsonl.gz")
+    jsonl_io.write_records(
+        jsonl_path,
+        (
+            dict(artifact, country=country)
+            for country, country_artifacts in artifacts.items()
+            for artifact in country_artifacts
+        ),
+    )
+    for path in (json_path, jsonl_path):
+      self.assertEqual(build_prompts.load_artifacts_by_country(path), artifacts)
+
+  def test_allocation_is_stratified(self):
+    sizes = {("art", "India"): 2, ("art", "Japan"): 10, ("art", "Brazil"): 10}
+    self.assertEqual(
+        build_prompts.allocate(sizes, 12),
+        {("art", "India"): 2, ("art", "Japan"): 5, ("art", "Brazil"): 5},
+    )
+    self.assertEqual(sum(build_prompts.allocate(sizes, 100).values()), 22)
+
+  def test_sampling_is_seeded_per_stratum(self):
+    strata = {
+        ("cuisine", "Japan"): _artifacts("Japan", 50),
+        ("cuisine", "India"): _artifacts("India", 50),
+    }
+    prompts = list(build_prompts.build_prompts(strata, 20, seed=1))
+    self.assertEqual(list(build_prompts.build_prompts(strata, 20, 1)), prompts)
+    self.assertNotEqual(list(build_prompts.build_prompts(strata, 20)), prompts)
+    # Strata alternate, and each is sampled independently of the others.
+    self.assertEqual(
+        [p["country"] for p in prompts[:4]], ["India", "Japan"] * 2
+    )
+    japan = [p for p in prompts if p["country"] == "Japan"]
+    only_japan = build_prompts.build_prompts(
+        {("cuisine", "Japan"): strata["cuisine", "Japan"]}, 10, seed=1
+    )
+    self.assertEqual(list(only_japan), japan)
+
+  @flagsaver.flagsaver
+  def test_main_writes_shards(self):
+    artifacts_path = os.path.join(self.tmp_dir, "cuisine_artifacts.json")
+    with open(artifacts_path, "w") as f:
+      json.dump(
+          {"Japan": _artifacts("Japan", 7), "India": _artifacts("India", 3)},
+          f,
+      )
+    output_dir = os.path.join(self.tmp_dir, "prompts")
+    flags.FLAGS([
+        "test_program",
+        f"--artifacts=cuisine={artifacts_path}",
+        "--num_prompts=8",
+        "--num_shards=2",
+        f"--output_dir={output_dir}",
+    ])
+
+    build_prompts.main([])
+
+    shards = []
+    for shard in range(2):
+      with open(build_prompts.shard_path(output_dir, shard, 2)) as f:
+        shards.append([json.loads(line) for line in f])
+    self.assertEqual([len(shard) for shard in shards], [4, 4])
+    countries = collections.Counter(
+        entry["country"] for shard in shards for entry in shard
+    )
+    self.assertEqual(countries, {"India": 3, "Japan": 5})
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -91,6 +91,13 @@ ART_ROOT_NODES = {
     'Q1153484': 'folk art',
 }
 
+# Root nodes of every concept, as named by the --concept flags.
+CONCEPT_ROOT_NODES = {
+    'cuisine': CUISINE_ROOT_NODES,
+    'landmarks': LANDMARK_ROOT_NODES,
+    'art': ART_ROOT_NODES,
+}
+
 # Edges of WikiData considered for the CUBE extraction process.
 # New edges may be introduced for newer concepts.
 # Refer here for IDs: https://www.wikidata.org/wiki/Property:P361.
@@ -138,6 +145,34 @@ country_to_adjective = {
     'France': 'French',
 }
 
+# Prompt templates of the artifacts of every concept, as in CUBE-1K. {name} is
+# the name of the artifact, {country} and {adjective} its country and the
+# adjective of the country.
+PROMPT_TEMPLATES = {
+    'cuisine': (
+        'A high resolution image of {name} from {adjective} cuisine, realistic'
+    ),
+    'landmarks': 'A panoramic view of {name} in {country}, realistic',
+    'art': 'Image of {name} art from {country}, realistic',
+}
+
+# Prompt templates of the artifacts of some root nodes, in place of the
+# template of their concept.
+ROOT_PROMPT_TEMPLATES = {
+    'clothing': 'An image of {name} from {adjective} clothing, realistic',
+    'costume': 'An image of {name} from {adjective} clothing, realistic',
+    'traditional costume': (
+        'An image of {name} from {adjective} clothing, realistic'
+    ),
+    'type of dance': 'An image of {name} performance from {country}, realistic',
+    'performing art genre': (
+        'An image of {name} performance from {country}, realistic'
+    ),
+    'style of painting': (
+        'An image of {name} painting from {country}, realistic'
+    ),
+}
+
 # Refer https://developers.google.com/custom-search/docs/json_api_reference#country-codes # pylint: disable=line-too-long
 country_to_search_api_code = {
     'Brazil': 'br',
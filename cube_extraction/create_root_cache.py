@@ -18,7 +18,7 @@ r"""Creates a JSON file containing a list of root nodes to start KB traversal.
 The script reads a dictionary of root nodes from constants.py file.
 The dictionary contains Wikidata IDs as keys and names of the nodes as values.
 It then creates a JSON file containing a list of dictionaries as cache to start
-the KB traversal.
+the KB traversal, or a JSON Lines file with --format, see jsonl_io.py.
 
 Example usage:
 
@@ -26,7 +26,6 @@ Example usage:
   --concept=cuisine     --root_cache_file_dir=temps/
 """
 
-import json
 import os
 from typing import Dict, List
 
@@ -34,6 +33,7 @@ from absl import app
 from absl import flags
 
 from cube_t2i.cube_extraction import constants
+from cube_t2i.cube_extraction import jsonl_io
 
 
 _CONCEPT = flags.DEFINE_string(
@@ -50,6 +50,13 @@ _ROOT_CACHE_FILE_DIR = flags.DEFINE_string(
     required=True,
 )
 
+_FORMAT = flags.DEFINE_enum(
+    name='format',
+    default=jsonl_io.DEFAULT_FORMAT,
+    enum_values=list(jsonl_io.FORMATS),
+    help='Format of the cache file, see jsonl_io.py.',
+)
+
 
 def create_root_cache_nodes(root_dict: Dict[str, str]) -> List[Dict[str, str]]:
   """Create a list of dictionaries for pre-caching from a dictionary.
@@ -77,7 +84,8 @@ def main(_):
     os.makedirs(_ROOT_CACHE_FILE_DIR.value)
 
   output_file_path = os.path.join(
-      _ROOT_CACHE_FILE_DIR.value, f'{_CONCEPT.value}_root_nodes.json'
+      _ROOT_CACHE_FILE_DIR.value,
+      f'{_CONCEPT.value}_root_nodes.{_FORMAT.value}',
   )
 
   # Check if the file exists
@@ -85,20 +93,14 @@ def main(_):
     return
 
   # Load the root nodes and make a cache json file
-  # Add a new if statement for a newly introduced concept
-  if _CONCEPT.value == 'cuisine':
-    root_dict = constants.CUISINE_ROOT_NODES
-  elif _CONCEPT.value == 'landmarks':
-    root_dict = constants.LANDMARK_ROOT_NODES
-  elif _CONCEPT.value == 'art':
-    root_dict = constants.ART_ROOT_NODES
-  else:
+  # Add newly introduced concepts to constants.CONCEPT_ROOT_NODES
+  if _CONCEPT.value not in constants.CONCEPT_ROOT_NODES:
     raise ValueError('Invalid concept: %s' % _CONCEPT.value)
+  root_dict = constants.CONCEPT_ROOT_NODES[_CONCEPT.value]
 
   root_cache_nodes = create_root_cache_nodes(root_dict)
 
-  with open(output_file_path, 'w') as fp:
-    json.dump(root_cache_nodes, fp, indent=2)
+  jsonl_io.write_records(output_file_path, root_cache_nodes)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,125 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Measures the import time of the CUBE extraction entry points.
+
+Every traversal worker process imports its entry point before doing any work,
+so slow imports (e.g. sling) are paid once per process and per hop. Each module
+is imported in a fresh interpreter, optionally with sling blocked to check that
+the module also loads on machines without SLING.
+
+Example usage:
+
+  python3 import_benchmark.py --import_repeats 5 --block_sling
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from absl import app
+from absl import flags
+
+
+_MODULES = flags.DEFINE_list(
+    name='modules',
+    default=[
+        'cube_t2i.cube_extraction.traverse_one_hop_kb',
+        'cube_t2i.cube_extraction.create_root_cache',
+        'cube_t2i.cube_extraction.merge_artifacts',
+        'cube_t2i.cube_extraction.partition_kb',
+    ],
+    help='Modules to import.',
+)
+_IMPORT_REPEATS = flags.DEFINE_integer(
+    name='import_repeats',
+    default=5,
+    help='Number of fresh interpreters to start per module.',
+)
+_BLOCK_SLING = flags.DEFINE_boolean(
+    name='block_sling',
+    default=False,
+    help='Make `import sling` fail, as on machines without SLING.',
+)
+
+# Prints whether sling was loaded as a side effect of importing the module.
+_IMPORT_SNIPPET = """
+import sys
+if {block_sling}:
+  sys.modules['sling'] = None
+import {module}
+print('sling' in sys.modules and sys.modules['sling'] is not None)
+"""
+
+
+def time_import(module: str, block_sling: bool = False) -> Dict[str, float]:
+  """Imports `module` in a fresh interpreter.
+
+  Args:
+    module: Fully qualified name of the module to import.
+    block_sling: Whether `import sling` should fail in the child interpreter.
+
+  Returns:
+    A dictionary with the wall time of the child interpreter in seconds
+    ('seconds') and whether sling got imported ('loads_sling', 0 or 1).
+
+  Raises:
+    subprocess.CalledProcessError: If the module fails to import.
+  """
+  env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+  start = time.perf_counter()
+  completed = subprocess.run(
+      [
+          sys.executable,
+          '-c',
+          _IMPORT_SNIPPET.format(module=module, block_sling=block_sling),
+      ],
+      capture_output=True,
+      check=True,
+      env=env,
+      text=True,
+  )
+  seconds = time.perf_counter() - start
+  loads_sling = completed.stdout.strip().splitlines()[-1] == 'True'
+  return {'seconds': seconds, 'loads_sling': float(loads_sling)}
+
+
+def benchmark(
+    modules: List[str], repeats: int, block_sling: bool
+) -> Dict[str, Dict[str, float]]:
+  """Returns the best-of-`repeats` import time for each module."""
+  results = {}
+  for module in modules:
+    runs = [time_import(module, block_sling) for _ in range(repeats)]
+    results[module] = {
+        'seconds': min(run['seconds'] for run in runs),
+        'loads_sling': runs[0]['loads_sling'],
+    }
+  return results
+
+
+def main(_):
+  results = benchmark(_MODULES.value, _IMPORT_REPEATS.value, _BLOCK_SLING.value)
+  for module, result in results.items():
+    print(
+        f'{module}: {result["seconds"] * 1000:.1f} ms'
+        f' (loads sling: {bool(result["loads_sling"])})'
+    )
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,59 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import unittest
+
+from absl import app
+
+from cube_t2i.cube_extraction import import_benchmark
+
+# Generous bound on interpreter start-up plus import, so the test only catches
+# heavy dependencies creeping back into the import path.
+_MAX_IMPORT_SECONDS = 5.0
+
+
+class ImportBenchmarkTest(unittest.TestCase):
+  """Test class for import_benchmark.py."""
+
+  def test_traversal_imports_without_sling(self):
+    """The traversal entry point must load on machines without SLING."""
+    result = import_benchmark.time_import(
+        "cube_t2i.cube_extraction.traverse_one_hop_kb", block_sling=True
+    )
+    self.assertFalse(result["loads_sling"])
+    self.assertLess(result["seconds"], _MAX_IMPORT_SECONDS)
+
+  def test_entry_points_do_not_load_sling(self):
+    """Only code paths that read `.sling` stores should import sling."""
+    results = import_benchmark.benchmark(
+        [
+            "cube_t2i.cube_extraction.create_root_cache",
+            "cube_t2i.cube_extraction.kb_utils",
+            "cube_t2i.cube_extraction.merge_artifacts",
+            "cube_t2i.cube_extraction.partition_kb",
+        ],
+        repeats=1,
+        block_sling=True,
+    )
+    for module, result in results.items():
+      self.assertFalse(result["loads_sling"], module)
+
+  def test_flags_do_not_clash_with_jsonl_io_benchmark(self):
+    # pylint: disable-next=g-import-not-at-top,unused-import
+    from cube_t2i.cube_extraction import jsonl_io_benchmark
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
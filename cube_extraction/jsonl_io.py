@@ -0,0 +1,320 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Reads and writes the lists of records passed between extraction stages.
+
+KB partitions, caches and hop outputs are lists of JSON objects, stored in one
+of `FORMATS`, named after their file extension:
+
+  json: an indented JSON array, the original format. It must be parsed whole.
+  jsonl: JSON Lines, one compact object per line.
+  jsonl.gz: gzip compressed JSON Lines.
+  jsonl.zst: Zstandard compressed JSON Lines. Needs the zstandard package.
+
+Readers pick the format from the file extension, so every stage reads the
+outputs of the others whatever their format. JSON Lines files are read as a
+stream of records. Compressed files are decompressed on a background thread
+while the records are parsed: zlib and zstd release the GIL, so decompression
+overlaps with parsing. Zstandard files are compressed with one thread per core.
+"""
+
+import concurrent.futures
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+from typing import (
+    Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence
+)
+
+
+FORMATS = ('json', 'jsonl', 'jsonl.gz', 'jsonl.zst')
+DEFAULT_FORMAT = 'json'
+
+# Size of the blocks of decompressed data read at once.
+_BLOCK_BYTES = 1 << 20
+# Number of decompressed blocks the background thread reads ahead.
+_PREFETCH_BLOCKS = 4
+_GZIP_LEVEL = 6
+_ZSTD_LEVEL = 3
+
+Record = Dict[str, Any]
+
+
+def path_format(path: str) -> str:
+  """Returns the format of a file from its extension, 'json' by default."""
+  # Longest extensions first, so 'x.jsonl.gz' is not read as 'jsonl'.
+  for fmt in sorted(FORMATS, key=len, reverse=True):
+    if fmt != DEFAULT_FORMAT and path.endswith('.' + fmt):
+      return fmt
+  return DEFAULT_FORMAT
+
+
+def with_format(path: str, fmt: str) -> str:
+  """Returns `path` with the extension of a format in place of its own.
+
+  Args:
+    path: Path with or without the extension of one of `FORMATS`.
+    fmt: One of `FORMATS`.
+
+  Raises:
+    ValueError: If the format is unknown.
+  """
+  if fmt not in FORMATS:
+    raise ValueError(f'Unknown format {fmt!r}, expected one of {FORMATS}.')
+  current = path_format(path)
+  if path.endswith('.' + current):
+    path = path[: -len(current) - 1]
+  return f'{path}.{fmt}'
+
+
+def existing_path(path: str) -> str:
+  """Returns `path`, or else the path with another format's extension.
+
+  Lets a reader find a file written in another format than expected. `path`
+  is returned if no such file exists.
+  """
+  if os.path.exists(path):
+    return path
+  for fmt in FORMATS:
+    candidate = with_format(path, fmt)
+    if os.path.exists(candidate):
+      return candidate
+  return path
+
+
+def _zstandard():
+  try:
+    import zstandard  # pylint: disable=g-import-not-at-top
+  except ImportError as e:
+    raise ImportError(
+        'The jsonl.zst format needs the zstandard package: pip install'
+        ' zstandard'
+    ) from e
+  return zstandard
+
+
+def _open_binary(path: str, mode: str, fmt: str) -> BinaryIO:
+  """Opens a file for reading ('rb') or writing ('wb') its decompressed data."""
+  if fmt == 'jsonl.gz':
+    return gzip.open(path, mode, compresslevel=_GZIP_LEVEL)
+  if fmt == 'jsonl.zst':
+    zstandard = _zstandard()
+    if mode == 'rb':
+      return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    return zstandard.ZstdCompressor(
+        level=_ZSTD_LEVEL, threads=-1
+    ).stream_writer(open(path, 'wb'))
+  return open(path, mode)
+
+
+def _read_blocks(binary_file: BinaryIO) -> Iterator[bytes]:
+  while True:
+    block = binary_file.read(_BLOCK_BYTES)
+    if not block:
+      return
+    yield block
+
+
+def _prefetch(blocks: Iterator[bytes]) -> Iterator[bytes]:
+  """Yields `blocks`, reading them ahead on a background thread.
+
+  The thread stops when the generator is closed, so the blocks must be closed
+  before the file they are read from.
+  """
+  blocks_queue = queue.Queue(maxsize=_PREFETCH_BLOCKS)
+  stopped = threading.Event()
+  end = object()
+
+  def put(item) -> bool:
+    # Gives up once the consumer stops, rather than waiting for free space.
+    while not stopped.is_set():
+      try:
+        blocks_queue.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        continue
+    return False
+
+  def read_ahead():
+    try:
+      for block in blocks:
+        if not put(block):
+          return
+      put(end)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      # Raised again by the consumer.
+      put(e)
+
+  thread = threading.Thread(target=read_ahead, daemon=True)
+  thread.start()
+  try:
+    while True:
+      block = blocks_queue.get()
+      if block is end:
+        return
+      if isinstance(block, Exception):
+        raise block
+      yield block
+  finally:
+    stopped.set()
+    thread.join()
+
+
+def _split_lines(blocks: Iterable[bytes]) -> Iterator[bytes]:
+  pending = b''
+  for block in blocks:
+    lines = (pending + block).split(b'\n')
+    pending = lines.pop()
+    yield from lines
+  yield pending
+
+
+def read_records(path: str, prefetch: bool = True) -> Iterator[Record]:
+  """Yields the records of a file in any of `FORMATS`.
+
+  Args:
+    path: Path of the file. Its format is picked from its extension.
+    prefetch: Whether to decompress compressed files on a background thread.
+
+  Yields:
+    The records of the file, in order. JSON Lines files are read as a stream,
+    while JSON files are parsed whole first.
+  """
+  fmt = path_format(path)
+  if fmt == 'json':
+    with open(path, 'r', encoding='utf-8') as f:
+      yield from json.load(f)
+    return
+
+  with _open_binary(path, 'rb', fmt) as binary_file:
+    blocks = _read_blocks(binary_file)
+    if prefetch and fmt != 'jsonl':
+      blocks = _prefetch(blocks)
+    try:
+      for line in _split_lines(blocks):
+        if line.strip():
+          yield json.loads(line)
+    finally:
+      blocks.close()
+
+
+def load(path: str) -> List[Record]:
+  """Returns the records of a file in any of `FORMATS`."""
+  return list(read_records(path))
+
+
+def load_many(
+    paths: Sequence[str], num_threads: Optional[int] = None
+) -> List[List[Record]]:
+  """Reads several files at once, on `num_threads` threads.
+
+  Args:
+    paths: Paths of the files, in any of `FORMATS`.
+    num_threads: Number of files read at once, by default one per core.
+
+  Returns:
+    The records of every file, in the order of `paths`.
+  """
+  num_threads = num_threads or os.cpu_count() or 1
+  with concurrent.futures.ThreadPoolExecutor(num_threads) as executor:
+    return list(executor.map(load, paths))
+
+
+def _encode_lines(records: Iterable[Record]) -> Iterator[bytes]:
+  """Yields blocks of about `_BLOCK_BYTES` of JSON Lines."""
+  lines = []
+  num_bytes = 0
+  for record in records:
+    line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+    lines.append(line)
+    num_bytes += len(line)
+    if num_bytes >= _BLOCK_BYTES:
+      yield ('\n'.join(lines) + '\n').encode('utf-8')
+      lines = []
+      num_bytes = 0
+  if lines:
+    yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def write_records(
+    path: str, records: Iterable[Record], fmt: Optional[str] = None
+) -> int:
+  """Writes records to a file in one of `FORMATS`.
+
+  JSON Lines records are written as they are generated, so `records` may be a
+  generator of more records than fit into memory.
+
+  Args:
+    path: Path of the file.
+    records: Records to write.
+    fmt: Format of the file, by default picked from the extension of `path`.
+      The extension is not changed, see `with_format`.
+
+  Returns:
+    The number of records written.
+  """
+  fmt = fmt or path_format(path)
+  if fmt == 'json':
+    records = list(records)
+    with open(path, 'w', encoding='utf-8') as f:
+      json.dump(records, f, indent=2)
+    return len(records)
+
+  num_records = 0
+
+  def counted():
+    nonlocal num_records
+    for num_records, record in enumerate(records, start=1):
+      yield record
+
+  with _open_binary(path, 'wb', fmt) as binary_file:
+    for block in _encode_lines(counted()):
+      binary_file.write(block)
+  return num_records
+
+
+def dumps(records: Iterable[Record], fmt: str = DEFAULT_FORMAT) -> bytes:
+  """Returns the contents of a file of `records` in a format."""
+  buffer = io.BytesIO()
+  if fmt == 'json':
+    buffer.write(json.dumps(list(records), indent=2).encode('utf-8'))
+    return buffer.getvalue()
+  if fmt == 'jsonl.gz':
+    with gzip.GzipFile(
+        fileobj=buffer, mode='wb', compresslevel=_GZIP_LEVEL, mtime=0
+    ) as binary_file:
+      for block in _encode_lines(records):
+        binary_file.write(block)
+    return buffer.getvalue()
+  if fmt == 'jsonl.zst':
+    compressor = _zstandard().ZstdCompressor(level=_ZSTD_LEVEL)
+    return compressor.compress(b''.join(_encode_lines(records)))
+  return b''.join(_encode_lines(records))
+
+
+def loads(data: bytes, fmt: str = DEFAULT_FORMAT) -> List[Record]:
+  """Returns the records of the contents of a file in a format."""
+  if fmt == 'json':
+    return json.loads(data)
+  if fmt == 'jsonl.gz':
+    data = gzip.decompress(data)
+  elif fmt == 'jsonl.zst':
+    # Streamed, since frames written by a stream do not record their size.
+    decompressor = _zstandard().ZstdDecompressor()
+    data = decompressor.stream_reader(io.BytesIO(data)).readall()
+  return [json.loads(line) for line in data.split(b'\n') if line.strip()]
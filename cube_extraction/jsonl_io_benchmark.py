@@ -0,0 +1,155 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Measures the size on disk and read throughput of the jsonl_io.py formats.
+
+The nodes of a partition written by partition_kb.py, or synthetic nodes shaped
+like them, are written in every format, and each file is read back several
+times. Compressed files are read with and without decompression on a
+background thread.
+
+Example usage:
+
+  python3 jsonl_io_benchmark.py --input_path kb_nodes/partition_0.json
+"""
+
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+from absl import app
+from absl import flags
+
+from cube_t2i.cube_extraction import constants
+from cube_t2i.cube_extraction import jsonl_io
+
+
+_INPUT_PATH = flags.DEFINE_string(
+    name='input_path',
+    default=None,
+    help='Partition to read the nodes from, or synthetic nodes if unset.',
+)
+_NUM_NODES = flags.DEFINE_integer(
+    name='num_nodes',
+    default=100000,
+    help='Number of synthetic nodes.',
+)
+_FORMATS = flags.DEFINE_list(
+    name='formats',
+    default=list(jsonl_io.FORMATS),
+    help='Formats to measure.',
+)
+_REPEATS = flags.DEFINE_integer(
+    name='repeats',
+    default=3,
+    help='Number of reads per format.',
+)
+
+
+def synthetic_nodes(num_nodes: int, seed: int = 0) -> List[jsonl_io.Record]:
+  """Returns nodes with the keys and value sizes of partition_kb.py nodes."""
+  rng = random.Random(seed)
+  nodes = []
+  for i in range(num_nodes):
+    node = {}
+    for key in constants.PROPERTY_2_ID.values():
+      num_values = rng.choice((0, 0, 1, 2))
+      node[key] = [f'Q{rng.randrange(10**7)}' for _ in range(num_values)]
+    node['id'] = f'Q{i}'
+    node['name'] = ' '.join(
+        rng.choice(('dish', 'river', 'Saint', 'festival', 'de', 'temple'))
+        for _ in range(rng.randint(1, 4))
+    )
+    node['description'] = f'{node["name"]} in region {rng.randrange(1000)}'
+    nodes.append(node)
+  return nodes
+
+
+def _best_read_seconds(path: str, repeats: int, prefetch: bool = True) -> float:
+  seconds = []
+  for _ in range(repeats):
+    start = time.perf_counter()
+    for _ in jsonl_io.read_records(path, prefetch):
+      pass
+    seconds.append(time.perf_counter() - start)
+  return min(seconds)
+
+
+def benchmark(
+    records: Sequence[jsonl_io.Record],
+    formats: Sequence[str],
+    directory: str,
+    repeats: int = 3,
+) -> Dict[str, Dict[str, float]]:
+  """Writes and reads `records` in every format.
+
+  Args:
+    records: Records to write.
+    formats: Formats of `jsonl_io.FORMATS` to measure.
+    directory: Directory to write the files to.
+    repeats: Number of reads per format, of which the fastest is kept.
+
+  Returns:
+    For each format, the size of the file in bytes ('bytes'), the time to
+    write it ('write_seconds') and to read it ('read_seconds') and the number
+    of records read per second ('records_per_second'). Compressed formats also
+    have the read time without a background thread ('read_seconds_unthreaded').
+  """
+  results = {}
+  for fmt in formats:
+    path = os.path.join(directory, f'records.{fmt}')
+    start = time.perf_counter()
+    jsonl_io.write_records(path, records)
+    write_seconds = time.perf_counter() - start
+    read_seconds = _best_read_seconds(path, repeats)
+    results[fmt] = {
+        'bytes': os.path.getsize(path),
+        'write_seconds': write_seconds,
+        'read_seconds': read_seconds,
+        'records_per_second': len(records) / max(read_seconds, 1e-9),
+    }
+    if fmt not in ('json', 'jsonl'):
+      results[fmt]['read_seconds_unthreaded'] = _best_read_seconds(
+          path, repeats, prefetch=False
+      )
+  return results
+
+
+def main(_):
+  if _INPUT_PATH.value:
+    records = jsonl_io.load(_INPUT_PATH.value)
+  else:
+    records = synthetic_nodes(_NUM_NODES.value)
+  with tempfile.TemporaryDirectory() as directory:
+    results = benchmark(records, _FORMATS.value, directory, _REPEATS.value)
+
+  json_bytes = results.get('json', {}).get('bytes')
+  for fmt, result in results.items():
+    line = (
+        f'{fmt}: {result["bytes"] / 1e6:.1f} MB, read in'
+        f' {result["read_seconds"]:.2f} s'
+        f' ({result["records_per_second"]:.0f} records/s)'
+    )
+    if 'read_seconds_unthreaded' in result:
+      line += f', {result["read_seconds_unthreaded"]:.2f} s unthreaded'
+    if json_bytes:
+      line += f', {result["bytes"] / json_bytes:.1%} of json'
+    print(line)
+
+
+if __name__ == '__main__':
+  app.run(main)
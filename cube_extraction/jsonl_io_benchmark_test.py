@@ -0,0 +1,42 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import tempfile
+import unittest
+
+from absl import app
+
+from cube_t2i.cube_extraction import jsonl_io_benchmark
+
+
+class JsonlIoBenchmarkTest(unittest.TestCase):
+  """Test class for jsonl_io_benchmark.py."""
+
+  def test_json_lines_are_smaller(self):
+    nodes = jsonl_io_benchmark.synthetic_nodes(2000)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      results = jsonl_io_benchmark.benchmark(
+          nodes, ["json", "jsonl", "jsonl.gz"], tmp_dir, repeats=1
+      )
+
+    self.assertLess(results["jsonl"]["bytes"], results["json"]["bytes"])
+    # Node IDs and names repeat a lot across nodes.
+    self.assertLess(results["jsonl.gz"]["bytes"], results["jsonl"]["bytes"] / 3)
+    self.assertIn("read_seconds_unthreaded", results["jsonl.gz"])
+    self.assertGreater(results["jsonl"]["records_per_second"], 0)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
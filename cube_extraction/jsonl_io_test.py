@@ -0,0 +1,119 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from absl import app
+
+from cube_t2i.cube_extraction import jsonl_io
+
+_HAS_ZSTANDARD = importlib.util.find_spec("zstandard") is not None
+_FORMATS = [
+    fmt for fmt in jsonl_io.FORMATS if _HAS_ZSTANDARD or fmt != "jsonl.zst"
+]
+
+
+def _nodes(n):
+  return [
+      {"id": f"Q{i}", "name": f"bánh {i}\nmì", "P495": ["Q881"] * (i % 3)}
+      for i in range(n)
+  ]
+
+
+class JsonlIoTest(unittest.TestCase):
+  """Test class for jsonl_io.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.tmp_dir = tmp_dir.name
+
+  def test_formats_round_trip(self):
+    nodes = _nodes(100)
+    for fmt in _FORMATS:
+      path = os.path.join(self.tmp_dir, f"nodes.{fmt}")
+      self.assertEqual(jsonl_io.write_records(path, iter(nodes)), 100)
+      for prefetch in (True, False):
+        self.assertEqual(
+            list(jsonl_io.read_records(path, prefetch=prefetch)), nodes, fmt
+        )
+      self.assertEqual(jsonl_io.loads(jsonl_io.dumps(nodes, fmt), fmt), nodes)
+      empty_path = os.path.join(self.tmp_dir, f"empty.{fmt}")
+      self.assertEqual(jsonl_io.write_records(empty_path, []), 0)
+      self.assertEqual(jsonl_io.load(empty_path), [])
+
+  def test_json_format_is_unchanged(self):
+    nodes = _nodes(3)
+    path = os.path.join(self.tmp_dir, "nodes.json")
+    jsonl_io.write_records(path, nodes)
+    with open(path) as f:
+      self.assertEqual(f.read(), json.dumps(nodes, indent=2))
+
+  def test_records_span_blocks(self):
+    nodes = _nodes(1000)
+    path = os.path.join(self.tmp_dir, "nodes.jsonl.gz")
+    with mock.patch.object(jsonl_io, "_BLOCK_BYTES", 100):
+      jsonl_io.write_records(path, nodes)
+      records = jsonl_io.read_records(path)
+      self.assertEqual(next(records), nodes[0])
+      # Stops the prefetching thread before all blocks are read.
+      records.close()
+      self.assertEqual(jsonl_io.load(path), nodes)
+
+  def test_paths_name_their_format(self):
+    self.assertEqual(jsonl_io.path_format("a/1_hop_out.jsonl.gz"), "jsonl.gz")
+    self.assertEqual(jsonl_io.path_format("a/roots.jsonl"), "jsonl")
+    self.assertEqual(jsonl_io.path_format("a/partition_0"), "json")
+    self.assertEqual(
+        jsonl_io.with_format("a/out.json", "jsonl.zst"), "a/out.jsonl.zst"
+    )
+    self.assertEqual(
+        jsonl_io.with_format("a/out.jsonl.gz", "json"), "a/out.json"
+    )
+    self.assertEqual(jsonl_io.with_format("a/out", "jsonl"), "a/out.jsonl")
+    with self.assertRaisesRegex(ValueError, "Unknown format"):
+      jsonl_io.with_format("a/out.json", "csv")
+
+    path = os.path.join(self.tmp_dir, "out.json")
+    self.assertEqual(jsonl_io.existing_path(path), path)
+    jsonl_io.write_records(jsonl_io.with_format(path, "jsonl.gz"), [])
+    self.assertEqual(
+        jsonl_io.existing_path(path), jsonl_io.with_format(path, "jsonl.gz")
+    )
+
+  def test_load_many_keeps_order(self):
+    paths = []
+    for i, fmt in enumerate(_FORMATS):
+      paths.append(os.path.join(self.tmp_dir, f"{i}.{fmt}"))
+      jsonl_io.write_records(paths[-1], _nodes(i + 1))
+    self.assertEqual(
+        jsonl_io.load_many(paths, num_threads=2),
+        [_nodes(i + 1) for i in range(len(paths))],
+    )
+
+  @unittest.skipIf(_HAS_ZSTANDARD, "zstandard is installed")
+  def test_zstd_without_zstandard(self):
+    with self.assertRaisesRegex(ImportError, "pip install zstandard"):
+      jsonl_io.write_records(os.path.join(self.tmp_dir, "a.jsonl.zst"), [])
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -16,25 +16,32 @@
 """Utility functions for interacting with Wikidata KB."""
 
 import logging
-from typing import Dict, List, Union
-
-import sling
+from typing import TYPE_CHECKING, Dict, List, Union
 
 from cube_t2i.cube_extraction import constants
 
+if TYPE_CHECKING:
+  import sling  # pylint: disable=g-bad-import-order
+
 
 USEFUL_EDGES = constants.PROPERTY_2_ID.values()
 
 
-def get_kb(kb_path: str) -> sling.Store:
+def get_kb(kb_path: str) -> 'sling.Store':
   """Retrieves KB from the given path.
 
+  SLING is imported here rather than at module load, so that stages which only
+  read JSON partitions (e.g. traversal workers) do not pay for the import and
+  can run on machines without SLING installed.
+
   Args:
     kb_path: path to the local Wikidata KB.
 
   Returns:
     Retrieved KB in sling.Store format.
   """
+  import sling  # pylint: disable=g-import-not-at-top,redefined-outer-name
+
   kb = sling.Store()
   kb.load(kb_path)  # load the KB from the sling file
   kb.freeze()  # making the store read-only
@@ -42,7 +49,7 @@ def get_kb(kb_path: str) -> sling.Store:
 
 
 def get_node_dict(
-    node: sling.Frame,
+    node: 'sling.Frame',
 ) -> Union[Dict[str, List[str]], Dict[str, str]]:
   """Convert a sling KB node to a dictionary with useful nodes.
 
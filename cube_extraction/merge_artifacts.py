@@ -18,7 +18,14 @@ r"""Merges Wikidata nodes from multiple hop files and groups by country.
 This script takes multiple JSON files, each representing Wikidata nodes
 reached after a certain number of hops from a root node. It merges these nodes,
 extracts nodes associated with countries of interest, and groups them by
-country. The final output is saved as a JSON file.
+country. The final output is saved as a JSON file mapping countries to their
+artifacts, or with a JSON Lines --format, as one record per artifact and country
+with the country in its 'country' key, grouped by country. The hop files may be
+in any format of jsonl_io.py.
+
+A node reached from several roots is in the hop files once per root. Its
+artifact is listed once per country, with its first root in its 'root' key and
+all of its distinct roots in its 'roots' key.
 
 Example Usage:
   python3 merge_artifacts.py \
@@ -35,10 +42,10 @@ from typing import Dict
 
 from absl import app
 from absl import flags
-import sling
 import tqdm
 
 from cube_t2i.cube_extraction import constants
+from cube_t2i.cube_extraction import jsonl_io
 
 
 _INPUT_FILEPATHS = flags.DEFINE_list(
@@ -53,6 +60,16 @@ _OUTPUT_FILEPATH = flags.DEFINE_string(
     help='Path to the output JSON file.',
     required=True,
 )
+_FORMAT = flags.DEFINE_enum(
+    name='format',
+    default=jsonl_io.DEFAULT_FORMAT,
+    enum_values=list(jsonl_io.FORMATS),
+    help=(
+        'Format of the output file, see jsonl_io.py. Unless it is the default,'
+        ' the extension of --output_filepath is replaced by that of the'
+        ' format.'
+    ),
+)
 
 
 def load_qid_mapping(sling_wiki_mapping_file: str) -> Dict[str, str]:
@@ -66,6 +83,8 @@ def load_qid_mapping(sling_wiki_mapping_file: str) -> Dict[str, str]:
     Wikipedia page titles.
     For example, {'Q920940': 'dosa'}
   """
+  import sling  # pylint: disable=g-import-not-at-top
+
   commons = sling.Store()
   commons.load(sling_wiki_mapping_file)
   commons.freeze()
@@ -98,19 +117,21 @@ def main(_):
   qid_mapping = load_qid_mapping(f'{home}/{constants.SLING_PATH}')
 
   # Merge nodes from all input files.
-  all_items = []
+  input_filepaths = []
   for file_path in _INPUT_FILEPATHS.value:
     # Check if the file exists
     if not os.path.exists(file_path):
       logging.error('Input file not found: %s. Skipping...', file_path)
       continue  # Skip to the next file
+    input_filepaths.append(file_path)
 
-    with open(file_path, 'r') as f:
-      all_items.extend(json.load(f))
+  all_items = []
+  for items in jsonl_io.load_many(input_filepaths):
+    all_items.extend(items)
 
   # Artifact nodes grouped by country
   country_ids = constants.ID_2_COUNTRY.keys()
-  cultural_artifacts = {key: [] for key in constants.ID_2_COUNTRY.values()}
+  cultural_artifacts = {key: {} for key in constants.ID_2_COUNTRY.values()}
 
   # Group nodes by country and add Wikipedia titles.
   for item in tqdm.tqdm(all_items):
@@ -128,13 +149,35 @@ def main(_):
     for country_id in item_countries:
       if country_id in country_ids:
         country_name = constants.ID_2_COUNTRY[country_id]
-        if item not in cultural_artifacts[country_name]:
-          cultural_artifacts[country_name].append(item)
+        artifact = cultural_artifacts[country_name].setdefault(
+            item['id'], item
+        )
+        if 'root' in item:
+          roots = artifact.setdefault('roots', [])
+          if item['root'] not in roots:
+            roots.append(item['root'])
+  cultural_artifacts = {
+      country: list(artifacts.values())
+      for country, artifacts in cultural_artifacts.items()
+  }
 
   # Save the grouped nodes to the output JSON file.
-
-  with open(_OUTPUT_FILEPATH.value, 'w') as fp:
-    json.dump(cultural_artifacts, fp, indent=2)
+  # The default format writes to the given path, whatever its extension.
+  output_filepath = _OUTPUT_FILEPATH.value
+  if _FORMAT.value != jsonl_io.DEFAULT_FORMAT:
+    output_filepath = jsonl_io.with_format(output_filepath, _FORMAT.value)
+  if _FORMAT.value == 'json':
+    with open(output_filepath, 'w') as fp:
+      json.dump(cultural_artifacts, fp, indent=2)
+  else:
+    jsonl_io.write_records(
+        output_filepath,
+        (
+            dict(item, country=country)
+            for country, items in cultural_artifacts.items()
+            for item in items
+        ),
+    )
 
 
 if __name__ == '__main__':
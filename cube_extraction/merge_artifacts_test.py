@@ -15,7 +15,9 @@
 
 import json
 import os
+import tempfile
 import unittest
+from unittest import mock
 
 from absl import app
 from absl import flags
@@ -71,6 +73,58 @@ class MergeArtifactsTest(unittest.TestCase):
       self.assertEqual(len(data["Brazil"]), 2)
       self.assertEqual(data["Brazil"][0]["title"], "Title0")
 
+  def _merge(self, hop_files, output_filename, *extra_flags):
+    """Runs main on hop files of nodes, returning the output directory."""
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    input_filepaths = []
+    for i, nodes in enumerate(hop_files):
+      filepath = os.path.join(tmp_dir.name, f"{i + 1}_hop_out_nodes.json")
+      with open(filepath, "w") as f:
+        json.dump(nodes, f)
+      input_filepaths.append(filepath)
+    flags.FLAGS([
+        "test_program",
+        "--input_filepaths",
+        ",".join(input_filepaths),
+        "--output_filepath",
+        os.path.join(tmp_dir.name, output_filename),
+        *extra_flags,
+    ])
+    with mock.patch.object(
+        merge_artifacts, "load_qid_mapping", return_value={}
+    ):
+      merge_artifacts.main([])
+    return tmp_dir.name
+
+  @flagsaver.flagsaver
+  def test_node_shared_by_two_roots_is_merged_once(self):
+    output_dir = self._merge(
+        [
+            [{"id": "Q1", "P495": ["Q155"], "root": root} for root in roots]
+            for roots in (["a", "b"], ["b"])
+        ],
+        "artifacts.json",
+    )
+
+    output_filepath = os.path.join(output_dir, "artifacts.json")
+
+    with open(output_filepath, "r") as f:
+      data = json.load(f)
+    self.assertEqual(len(data["Brazil"]), 1)
+    self.assertEqual(data["Brazil"][0]["root"], "a")
+    self.assertEqual(data["Brazil"][0]["roots"], ["a", "b"])
+
+  @flagsaver.flagsaver
+  def test_output_extension_is_only_replaced_for_other_formats(self):
+    nodes = [{"id": "Q1", "P495": ["Q155"]}]
+
+    output_dir = self._merge([nodes], "artifacts.txt")
+    self.assertIn("artifacts.txt", os.listdir(output_dir))
+
+    output_dir = self._merge([nodes], "artifacts.txt", "--format=jsonl.gz")
+    self.assertIn("artifacts.txt.jsonl.gz", os.listdir(output_dir))
+
 
 if __name__ == "__main__":
   app.run(lambda argv: unittest.main(argv=argv))
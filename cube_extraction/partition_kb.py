@@ -17,25 +17,31 @@ r"""Partitions the Wikidata KB into smaller parts for multicore processing.
 
 The script reads the nodes inside Wikidata Knowledge Base (KB) and extracts
 useful information from the nodes into Python dictionaries. Later those
-dictionaries are saved into JSON files. The script uses the sling framework
+dictionaries are saved into JSON files, or JSON Lines files with --format, see
+jsonl_io.py. The script uses the sling framework
  for KB traversal.
 
 Example usage:
 
   python3 partition_kb.py --partition_dir kb_nodes --num_partitions 200
+
+With --num_partitions=0, the number of partitions is picked from the available
+memory and cores of this machine, see partition_sizing.py.
 """
 
-import json
+import itertools
 import os
 import pathlib
+from typing import Dict, List
 
 from absl import app
 from absl import flags
-import sling  # pylint:disable=unused-import
 import tqdm
 
 from cube_t2i.cube_extraction import constants
+from cube_t2i.cube_extraction import jsonl_io
 from cube_t2i.cube_extraction import kb_utils
+from cube_t2i.cube_extraction import partition_sizing
 
 
 _PARTITION_DIR = flags.DEFINE_string(
@@ -47,9 +53,42 @@ _PARTITION_DIR = flags.DEFINE_string(
 _NUM_PARTITIONS = flags.DEFINE_integer(
     name="num_partitions",
     default=200,
-    help="Number of partitions to create",
+    help=(
+        "Number of partitions to create, or 0 to pick it from the available"
+        " memory and cores."
+    ),
+)
+
+_FORMAT = flags.DEFINE_enum(
+    name="format",
+    default=jsonl_io.DEFAULT_FORMAT,
+    enum_values=list(jsonl_io.FORMATS),
+    help="Format of the partitions, see jsonl_io.py.",
 )
 
+# Number of nodes used to estimate the KB size in bytes for --num_partitions=0.
+_SIZING_SAMPLE_NODES = 10000
+
+
+def _auto_num_partitions(
+    sample_nodes: List[Dict[str, List[str]]], num_nodes: int
+) -> int:
+  """Picks the number of partitions from a sample of the KB nodes."""
+  sample_data = jsonl_io.dumps(sample_nodes, _FORMAT.value)
+  cost = partition_sizing.measure_data_parse_cost(sample_data, _FORMAT.value)
+  bytes_per_node = len(sample_data) / max(len(sample_nodes), 1)
+  plan = partition_sizing.plan_partitions(int(bytes_per_node * num_nodes), cost)
+  return plan.num_partitions
+
+
+def _write_partition(
+    kb_nodes: List[Dict[str, List[str]]], partition_id: int
+) -> None:
+  partition_path = os.path.join(
+      _PARTITION_DIR.value, f"partition_{partition_id}.{_FORMAT.value}"
+  )
+  jsonl_io.write_records(partition_path, kb_nodes)
+
 
 def main(_):
   home_dir = pathlib.Path.home()  # path for cloudtop root directory
@@ -58,28 +97,28 @@ def main(_):
   if not os.path.exists(_PARTITION_DIR.value):
     os.makedirs(_PARTITION_DIR.value)
 
+  node_dicts = (kb_utils.get_node_dict(node) for node in kb)
+
   # KB is 15 GB in size, so we split it into smaller (70 MB) parts for
   # multicore processing. It is recommended to choose a partition size that
   # will fit into memory and be easy to process.
-  items_per_partition = len(kb) // _NUM_PARTITIONS.value + 1
+  num_partitions = _NUM_PARTITIONS.value
+  if num_partitions == 0:
+    sample_nodes = list(itertools.islice(node_dicts, _SIZING_SAMPLE_NODES))
+    num_partitions = _auto_num_partitions(sample_nodes, len(kb))
+    node_dicts = itertools.chain(sample_nodes, node_dicts)
+  items_per_partition = len(kb) // num_partitions + 1
 
   kb_nodes = []
   partition_id = 0
-  for node in tqdm.tqdm(kb):
-    node_dict = kb_utils.get_node_dict(node)
+  for node_dict in tqdm.tqdm(node_dicts, total=len(kb)):
     kb_nodes.append(node_dict)
     if len(kb_nodes) == items_per_partition:
-      with open(
-          f"kb_nodes/partition_{partition_id}.json", "w", encoding="utf-8"
-      ) as f:
-        json.dump(kb_nodes, f, indent=2)
+      _write_partition(kb_nodes, partition_id)
       kb_nodes = []
       partition_id += 1
 
-  with open(
-      f"kb_nodes/partition_{partition_id}.json", "w", encoding="utf-8"
-  ) as f:
-    json.dump(kb_nodes, f, indent=2)
+  _write_partition(kb_nodes, partition_id)
 
 
 if __name__ == "__main__":
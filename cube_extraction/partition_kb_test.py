@@ -16,13 +16,16 @@
 import json
 import os
 import unittest
+from unittest import mock
 
 from absl import app
 from absl import flags
 from absl.testing import flagsaver
 
+from cube_t2i.cube_extraction import jsonl_io
 from cube_t2i.cube_extraction import kb_utils
 from cube_t2i.cube_extraction import partition_kb
+from cube_t2i.cube_extraction import partition_sizing
 
 
 class PartitionKbTest(unittest.TestCase):
@@ -47,25 +50,30 @@ class PartitionKbTest(unittest.TestCase):
         os.remove(os.path.join(self.partition_dir, file))
       os.rmdir(self.partition_dir)
 
+  def _mock_kb(self, num_nodes):
+    mock_kb = mock.MagicMock()
+    mock_kb.__len__ = mock.MagicMock(return_value=num_nodes)
+    mock_kb.__iter__ = mock.MagicMock(
+        return_value=iter([{"id": f"Q{i}"} for i in range(num_nodes)])
+    )
+    return mock_kb
+
   @flagsaver.flagsaver
+  @mock.patch.object(kb_utils, "get_kb")
   def test_main_creates_partitions(self, mock_get_kb):
     """Test the main function."""
-    mock_kb = unittest.mock.MagicMock()
-    mock_kb.__len__ = unittest.mock.MagicMock(return_value=10)
-    mock_kb.__iter__ = unittest.mock.MagicMock(
-        return_value=iter([{"id": f"Q{i}"} for i in range(10)])
-    )
-    mock_get_kb.return_value = mock_kb
+    mock_get_kb.return_value = self._mock_kb(10)
 
     # Mock get_node_dict
-    with unittest.mock.patch.object(
+    with mock.patch.object(
         kb_utils, "get_node_dict", return_value={"id": "Q1", "name": "Node1"}
     ):
       partition_kb.main([])
 
     self.assertTrue(os.path.exists(self.partition_dir))
     partition_files = os.listdir(self.partition_dir)
-    self.assertEqual(len(partition_files), 3)  # 2 partitions + 1 leftover
+    # 10 nodes in 2 partitions of 6: one full partition and the leftover.
+    self.assertEqual(len(partition_files), 2)
 
     for file in partition_files:
       with open(os.path.join(self.partition_dir, file), "r") as f:
@@ -73,16 +81,64 @@ class PartitionKbTest(unittest.TestCase):
         self.assertIsInstance(data, list)
 
   @flagsaver.flagsaver
-  def test_main_handles_empty_kb(self):
+  @mock.patch.object(kb_utils, "get_kb", return_value=[])
+  def test_main_handles_empty_kb(self, unused_mock_get_kb):
     """Test the main function with an empty KB."""
-    mock_get_kb = unittest.mock.MagicMock()
-    mock_get_kb.return_value = []
-      partition_kb.main([])
+    partition_kb.main([])
 
     self.assertTrue(os.path.exists(self.partition_dir))
     partition_files = os.listdir(self.partition_dir)
     self.assertEqual(len(partition_files), 1)  # Only the leftover partition
 
+  @flagsaver.flagsaver(num_partitions=0)
+  @mock.patch.object(kb_utils, "get_kb")
+  def test_main_picks_num_partitions(self, mock_get_kb):
+    """Test that --num_partitions=0 uses the sizing plan."""
+    mock_get_kb.return_value = self._mock_kb(10)
+    plan = partition_sizing.SizingPlan(
+        num_workers=2, num_partitions=4, partition_bytes=100
+    )
+
+    with mock.patch.object(
+        partition_sizing, "plan_partitions", return_value=plan
+    ), mock.patch.object(
+        kb_utils, "get_node_dict", side_effect=lambda node: node
+    ):
+      partition_kb.main([])
+
+    # 10 nodes in 4 partitions of 3: three full partitions and the leftover.
+    partition_files = sorted(os.listdir(self.partition_dir))
+    self.assertEqual(len(partition_files), 4)
+    nodes = []
+    for i in range(4):
+      with open(os.path.join(self.partition_dir, f"partition_{i}.json")) as f:
+        nodes.extend(json.load(f))
+    self.assertEqual(nodes, [{"id": f"Q{i}"} for i in range(10)])
+
+  @flagsaver.flagsaver(format="jsonl.gz")
+  @mock.patch.object(kb_utils, "get_kb")
+  def test_main_writes_format(self, mock_get_kb):
+    """Test that partitions are written in --format."""
+    mock_get_kb.return_value = self._mock_kb(10)
+
+    with mock.patch.object(
+        kb_utils, "get_node_dict", side_effect=lambda node: node
+    ):
+      partition_kb.main([])
+
+    self.assertEqual(
+        sorted(os.listdir(self.partition_dir)),
+        ["partition_0.jsonl.gz", "partition_1.jsonl.gz"],
+    )
+    nodes = jsonl_io.load_many([
+        os.path.join(self.partition_dir, f"partition_{i}.jsonl.gz")
+        for i in range(2)
+    ])
+    self.assertEqual(
+        [node for partition in nodes for node in partition],
+        [{"id": f"Q{i}"} for i in range(10)],
+    )
+
 
 if __name__ == "__main__":
   app.run(lambda argv: unittest.main(argv=argv))
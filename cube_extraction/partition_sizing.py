@@ -0,0 +1,212 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Picks partition sizes and worker counts from the machine's resources.
+
+Each traversal worker holds one parsed partition in memory at a time, and a
+parsed JSON partition takes several times its size on disk. The number of
+workers is therefore bounded by the available cores and by how many parsed
+partitions fit into memory, while each partition should be large enough that
+its parse time dominates the per-task overhead. Partitions of equal size in
+bytes take about equally long to parse, and a number of partitions that is a
+multiple of the number of workers lets all workers finish at about the same
+time.
+"""
+
+import dataclasses
+import json
+import math
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from cube_t2i.cube_extraction import jsonl_io
+
+
+# Used when no partition is available to measure the parse cost on. Parsed
+# Wikidata partitions take about 6x their size on disk in memory.
+DEFAULT_MEMORY_PER_BYTE = 6.0
+DEFAULT_BYTES_PER_SECOND = 50e6
+
+
+@dataclasses.dataclass(frozen=True)
+class ParseCost:
+  """Measured cost of parsing a JSON partition, per byte on disk."""
+
+  bytes_per_second: float = DEFAULT_BYTES_PER_SECOND
+  memory_per_byte: float = DEFAULT_MEMORY_PER_BYTE
+
+
+@dataclasses.dataclass(frozen=True)
+class SizingPlan:
+  """Partitioning and worker count for a KB of a given size."""
+
+  num_workers: int
+  num_partitions: int
+  partition_bytes: int
+
+
+def available_memory_bytes() -> int:
+  """Returns the memory available to new processes, in bytes."""
+  try:
+    with open('/proc/meminfo', 'r', encoding='utf-8') as meminfo:
+      for line in meminfo:
+        if line.startswith('MemAvailable:'):
+          return int(line.split()[1]) * 1024
+  except OSError:
+    pass
+  return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+
+
+def available_cores() -> int:
+  """Returns the number of cores this process may run on."""
+  if hasattr(os, 'sched_getaffinity'):
+    return len(os.sched_getaffinity(0))
+  return os.cpu_count() or 1
+
+
+def _measure_cost(parse: Callable[[], Any], num_bytes: int) -> ParseCost:
+  """Measures the time and peak memory of `parse`, per byte on disk."""
+  num_bytes = max(num_bytes, 1)
+  start = time.perf_counter()
+  parse()
+  seconds = max(time.perf_counter() - start, 1e-9)
+
+  # Memory is measured in a second pass, since tracing slows parsing down.
+  tracemalloc.start()
+  try:
+    parse()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+
+  return ParseCost(
+      bytes_per_second=num_bytes / seconds,
+      memory_per_byte=max(peak_bytes / num_bytes, 1.0),
+  )
+
+
+def measure_text_parse_cost(text: str) -> ParseCost:
+  """Measures the parse time and peak memory of a JSON document.
+
+  Args:
+    text: JSON document, e.g. the contents of a partition.
+
+  Returns:
+    The parse throughput and the peak memory per byte of `text`.
+  """
+  return _measure_cost(lambda: json.loads(text), len(text.encode('utf-8')))
+
+
+def measure_data_parse_cost(
+    data: bytes, fmt: str = jsonl_io.DEFAULT_FORMAT
+) -> ParseCost:
+  """Measures the parse cost of the contents of a file in a jsonl_io format.
+
+  Decompression counts as parsing, so the cost of compressed data is per
+  compressed byte.
+
+  Args:
+    data: Contents of a file, e.g. of a partition.
+    fmt: Format of the contents, one of `jsonl_io.FORMATS`.
+  """
+  return _measure_cost(lambda: jsonl_io.loads(data, fmt), len(data))
+
+
+def measure_parse_cost(partition_path: str) -> ParseCost:
+  """Measures the parse cost of a partition written by partition_kb.py."""
+  fmt = jsonl_io.path_format(partition_path)
+  if fmt == 'json':
+    with open(partition_path, 'r', encoding='utf-8') as partition_file:
+      return measure_text_parse_cost(partition_file.read())
+  with open(partition_path, 'rb') as partition_file:
+    return measure_data_parse_cost(partition_file.read(), fmt)
+
+
+def plan_partitions(
+    total_bytes: int,
+    cost: ParseCost = ParseCost(),
+    memory_bytes: Optional[int] = None,
+    num_cores: Optional[int] = None,
+    memory_fraction: float = 0.8,
+    min_partition_seconds: float = 2.0,
+) -> SizingPlan:
+  """Picks the partition size and number of workers for a KB.
+
+  Args:
+    total_bytes: Size of the whole KB as JSON partitions, in bytes.
+    cost: Parse cost of a partition, see `measure_parse_cost`.
+    memory_bytes: Memory to plan for, defaults to the available memory.
+    num_cores: Cores to plan for, defaults to the available cores.
+    memory_fraction: Fraction of `memory_bytes` the workers may use together.
+    min_partition_seconds: Partitions are made at least large enough to take
+      this long to parse, so that per-task overhead stays small.
+
+  Returns:
+    The sizing plan. `num_partitions` is a multiple of `num_workers`.
+  """
+  if memory_bytes is None:
+    memory_bytes = available_memory_bytes()
+  if num_cores is None:
+    num_cores = available_cores()
+
+  memory_budget = memory_bytes * memory_fraction
+  min_partition_bytes = cost.bytes_per_second * min_partition_seconds
+  num_workers = max(num_cores, 1)
+  # Largest partition of which `num_workers` parsed copies fit into memory.
+  max_partition_bytes = memory_budget / num_workers / cost.memory_per_byte
+  if max_partition_bytes < min_partition_bytes:
+    # Too little memory for all cores: use fewer, but not too small, partitions.
+    num_workers = memory_budget / cost.memory_per_byte / min_partition_bytes
+    num_workers = max(min(int(num_workers), num_cores), 1)
+    max_partition_bytes = memory_budget / num_workers / cost.memory_per_byte
+
+  num_partitions = max(math.ceil(total_bytes / max_partition_bytes), 1)
+  # Give every worker a partition, as long as partitions stay large enough.
+  max_by_size = max(int(total_bytes // min_partition_bytes), 1)
+  num_partitions = max(num_partitions, min(num_workers, max_by_size))
+  num_workers = min(num_workers, num_partitions)
+  num_partitions = math.ceil(num_partitions / num_workers) * num_workers
+  return SizingPlan(
+      num_workers=num_workers,
+      num_partitions=num_partitions,
+      partition_bytes=math.ceil(total_bytes / num_partitions),
+  )
+
+
+def recommend_num_processes(
+    partition_dir: str, memory_fraction: float = 0.8
+) -> int:
+  """Picks the number of traversal processes for existing partitions.
+
+  Args:
+    partition_dir: Directory with partitions written by partition_kb.py.
+    memory_fraction: Fraction of the available memory the workers may use.
+
+  Returns:
+    The number of processes such that the largest partitions, parsed by all
+    processes at once, fit into memory.
+  """
+  partition_paths = [
+      os.path.join(partition_dir, name) for name in os.listdir(partition_dir)
+  ]
+  if not partition_paths:
+    return 1
+  largest_path = max(partition_paths, key=os.path.getsize)
+  cost = measure_parse_cost(min(partition_paths, key=os.path.getsize))
+  peak_bytes = max(os.path.getsize(largest_path), 1) * cost.memory_per_byte
+  max_by_memory = int(available_memory_bytes() * memory_fraction / peak_bytes)
+  return max(min(available_cores(), len(partition_paths), max_by_memory), 1)
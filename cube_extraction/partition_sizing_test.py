@@ -0,0 +1,128 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from absl import app
+
+from cube_t2i.cube_extraction import partition_sizing
+
+_MB = 1024 * 1024
+_GB = 1024 * _MB
+
+
+class PartitionSizingTest(unittest.TestCase):
+  """Test class for partition_sizing.py."""
+
+  def setUp(self):
+    super().setUp()
+    # Parses 10 MB/s and needs 5 bytes of memory per byte on disk.
+    self.cost = partition_sizing.ParseCost(
+        bytes_per_second=10 * _MB, memory_per_byte=5.0
+    )
+
+  def test_plan_uses_all_cores_with_enough_memory(self):
+    """Test a machine where memory is not the bottleneck."""
+    plan = partition_sizing.plan_partitions(
+        total_bytes=15 * _GB,
+        cost=self.cost,
+        memory_bytes=256 * _GB,
+        num_cores=64,
+        memory_fraction=0.5,
+    )
+
+    self.assertEqual(plan.num_workers, 64)
+    self.assertEqual(plan.num_partitions % plan.num_workers, 0)
+    # All workers together must fit into the memory budget.
+    self.assertLessEqual(
+        plan.num_workers * plan.partition_bytes * self.cost.memory_per_byte,
+        128 * _GB,
+    )
+
+  def test_plan_uses_fewer_workers_on_small_machines(self):
+    """Test that a small box is not over-subscribed."""
+    plan = partition_sizing.plan_partitions(
+        total_bytes=15 * _GB,
+        cost=self.cost,
+        memory_bytes=4 * _GB,
+        num_cores=64,
+        memory_fraction=0.5,
+        min_partition_seconds=2.0,
+    )
+
+    self.assertLess(plan.num_workers, 64)
+    self.assertGreaterEqual(plan.partition_bytes, 20 * _MB)
+    self.assertLessEqual(
+        plan.num_workers * plan.partition_bytes * self.cost.memory_per_byte,
+        2 * _GB,
+    )
+    self.assertEqual(plan.num_partitions % plan.num_workers, 0)
+
+  def test_plan_small_kb(self):
+    """Test that there are never more workers than partitions."""
+    plan = partition_sizing.plan_partitions(
+        total_bytes=1000, cost=self.cost, memory_bytes=_GB, num_cores=8
+    )
+
+    self.assertEqual(plan.num_workers, 1)
+    self.assertEqual(plan.num_partitions, 1)
+    self.assertEqual(plan.partition_bytes, 1000)
+
+  def test_measure_parse_cost(self):
+    """Test measuring the parse cost of a partition file."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      partition_path = os.path.join(tmp_dir, "partition_0.json")
+      with open(partition_path, "w") as f:
+        json.dump([{"id": f"Q{i}", "P31": ["Q5"]} for i in range(1000)], f)
+
+      cost = partition_sizing.measure_parse_cost(partition_path)
+
+    self.assertGreater(cost.bytes_per_second, 0)
+    self.assertGreaterEqual(cost.memory_per_byte, 1.0)
+
+  def test_recommend_num_processes_is_bounded_by_memory(self):
+    """Test that the largest partitions must fit into memory at once."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      for i in range(8):
+        with open(os.path.join(tmp_dir, f"partition_{i}.json"), "w") as f:
+          json.dump([{"id": "Q1"}] * 1000, f)
+      partition_bytes = os.path.getsize(
+          os.path.join(tmp_dir, "partition_0.json")
+      )
+
+      with mock.patch.object(
+          partition_sizing, "available_cores", return_value=16
+      ), mock.patch.object(
+          partition_sizing,
+          "available_memory_bytes",
+          return_value=partition_bytes * 100,
+      ), mock.patch.object(
+          partition_sizing, "measure_parse_cost", return_value=self.cost
+      ):
+        num_processes = partition_sizing.recommend_num_processes(
+            tmp_dir, memory_fraction=0.5
+        )
+
+    # 50 partition sizes of memory hold 10 parsed partitions, but there are
+    # only 8 partitions.
+    self.assertEqual(num_processes, 8)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
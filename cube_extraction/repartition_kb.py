@@ -0,0 +1,173 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Rewrites existing KB partitions into partitions of equal size.
+
+partition_kb.py splits the KB by number of nodes, but node sizes vary a lot
+across the KB, so some partitions take much longer to traverse than others.
+This script streams the nodes of existing partitions into new partitions of
+about equal size in bytes, so that all traversal workers finish at about the
+same time. With --num_partitions=0 the number of partitions is picked from the
+available memory, cores and the measured parse cost of a partition, and the
+matching --num_processes for traverse_one_hop_kb.py is printed. Partitions are
+read in any format of jsonl_io.py and written in --format, so the script also
+converts partitions between formats.
+
+Example usage:
+
+  python3 repartition_kb.py --input_dir kb_nodes --output_dir kb_nodes_sized \
+      --num_partitions 0
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List
+
+from absl import app
+from absl import flags
+import tqdm
+
+from cube_t2i.cube_extraction import jsonl_io
+from cube_t2i.cube_extraction import partition_sizing
+
+
+_INPUT_DIR = flags.DEFINE_string(
+    name='input_dir',
+    default='kb_nodes',
+    help='Directory containing the existing KB partitions.',
+)
+_OUTPUT_DIR = flags.DEFINE_string(
+    name='output_dir',
+    default=None,
+    help='Directory to save the new KB partitions.',
+    required=True,
+)
+_NUM_PARTITIONS = flags.DEFINE_integer(
+    name='num_partitions',
+    default=0,
+    help=(
+        'Number of partitions to create, or 0 to pick it from the available'
+        ' memory and cores.'
+    ),
+)
+_MEMORY_FRACTION = flags.DEFINE_float(
+    name='memory_fraction',
+    default=0.8,
+    help='Fraction of the available memory the traversal workers may use.',
+)
+_FORMAT = flags.DEFINE_enum(
+    name='format',
+    default=jsonl_io.DEFAULT_FORMAT,
+    enum_values=list(jsonl_io.FORMATS),
+    help='Format of the new partitions, see jsonl_io.py.',
+)
+
+
+def _write_partition(
+    nodes: List[Dict[str, str]], output_dir: str, partition_id: int, fmt: str
+) -> str:
+  partition_path = os.path.join(output_dir, f'partition_{partition_id}.{fmt}')
+  jsonl_io.write_records(partition_path, nodes)
+  return partition_path
+
+
+def repartition(
+    input_paths: List[str],
+    output_dir: str,
+    num_partitions: int,
+    fmt: str = jsonl_io.DEFAULT_FORMAT,
+) -> List[str]:
+  """Streams the nodes of `input_paths` into partitions of equal size.
+
+  Only one input and one output partition are held in memory at a time. Node
+  sizes are estimated from their serialized size, scaled so that the nodes of
+  each input partition add up to its size on disk.
+
+  Args:
+    input_paths: Paths to the existing partitions, read in the given order.
+    output_dir: Directory to write the new partitions to.
+    num_partitions: Number of partitions to create.
+    fmt: Format of the new partitions, one of `jsonl_io.FORMATS`. Their sizes
+      are balanced in bytes of the existing partitions.
+
+  Returns:
+    Paths to the written partitions.
+  """
+  total_bytes = sum(os.path.getsize(path) for path in input_paths)
+  target_bytes = total_bytes / num_partitions
+
+  partition_paths = []
+  partition_nodes = []
+  written_bytes = 0.0
+  for input_path in tqdm.tqdm(input_paths):
+    kb_nodes = jsonl_io.load(input_path)
+    node_sizes = [len(json.dumps(node)) for node in kb_nodes]
+    scale = os.path.getsize(input_path) / max(sum(node_sizes), 1)
+
+    for node_dict, node_size in zip(kb_nodes, node_sizes):
+      partition_nodes.append(node_dict)
+      written_bytes += node_size * scale
+      boundary = (len(partition_paths) + 1) * target_bytes
+      is_last_partition = len(partition_paths) == num_partitions - 1
+      if written_bytes >= boundary and not is_last_partition:
+        partition_paths.append(
+            _write_partition(
+                partition_nodes, output_dir, len(partition_paths), fmt
+            )
+        )
+        partition_nodes = []
+
+  if partition_nodes or not partition_paths:
+    partition_paths.append(
+        _write_partition(partition_nodes, output_dir, len(partition_paths), fmt)
+    )
+  return partition_paths
+
+
+def main(_):
+  input_dir = _INPUT_DIR.value
+  output_dir = _OUTPUT_DIR.value
+  if os.path.abspath(input_dir) == os.path.abspath(output_dir):
+    raise ValueError('--output_dir must differ from --input_dir.')
+  if not os.path.exists(output_dir):
+    os.makedirs(output_dir)
+
+  input_paths = [
+      os.path.join(input_dir, name) for name in sorted(os.listdir(input_dir))
+  ]
+  num_partitions = _NUM_PARTITIONS.value
+  if num_partitions == 0:
+    total_bytes = sum(os.path.getsize(path) for path in input_paths)
+    cost = partition_sizing.measure_parse_cost(
+        min(input_paths, key=os.path.getsize)
+    )
+    plan = partition_sizing.plan_partitions(
+        total_bytes, cost, memory_fraction=_MEMORY_FRACTION.value
+    )
+    num_partitions = plan.num_partitions
+    logging.info(
+        'Writing %d partitions of about %d bytes. Use --num_processes=%d.',
+        plan.num_partitions,
+        plan.partition_bytes,
+        plan.num_workers,
+    )
+    print(f'--num_processes={plan.num_workers}')
+
+  repartition(input_paths, output_dir, num_partitions, _FORMAT.value)
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,105 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import json
+import os
+import tempfile
+import unittest
+
+from absl import app
+from absl import flags
+from absl.testing import flagsaver
+
+from cube_t2i.cube_extraction import repartition_kb
+
+
+class RepartitionKbTest(unittest.TestCase):
+  """Test class for repartition_kb.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.input_dir = os.path.join(tmp_dir.name, "kb_nodes")
+    self.output_dir = os.path.join(tmp_dir.name, "kb_nodes_sized")
+    os.makedirs(self.input_dir)
+
+    # Skewed partitions: one with large nodes, one with many small nodes.
+    self.nodes = [
+        {"id": f"Q{i}", "description": "x" * 1000} for i in range(20)
+    ] + [{"id": f"Q{i}"} for i in range(20, 520)]
+    self.input_paths = []
+    for partition_id, nodes in enumerate([self.nodes[:20], self.nodes[20:]]):
+      path = os.path.join(self.input_dir, f"partition_{partition_id}.json")
+      with open(path, "w") as f:
+        json.dump(nodes, f, indent=2)
+      self.input_paths.append(path)
+
+    flags.FLAGS([
+        "test_program",
+        "--input_dir",
+        self.input_dir,
+        "--output_dir",
+        self.output_dir,
+    ])
+
+  def _read_partitions(self, partition_paths):
+    nodes = []
+    for path in partition_paths:
+      with open(path) as f:
+        nodes.extend(json.load(f))
+    return nodes
+
+  def test_repartition_balances_sizes(self):
+    """Test that the new partitions are of about equal size in bytes."""
+    os.makedirs(self.output_dir)
+
+    partition_paths = repartition_kb.repartition(
+        self.input_paths, self.output_dir, num_partitions=4
+    )
+
+    self.assertEqual(len(partition_paths), 4)
+    self.assertEqual(self._read_partitions(partition_paths), self.nodes)
+    sizes = [os.path.getsize(path) for path in partition_paths]
+    self.assertLess(max(sizes) / min(sizes), 1.5)
+
+  @flagsaver.flagsaver(num_partitions=3)
+  def test_main_writes_partitions(self):
+    """Test the main function with a fixed number of partitions."""
+    repartition_kb.main([])
+
+    partition_files = sorted(os.listdir(self.output_dir))
+    self.assertEqual(
+        partition_files,
+        ["partition_0.json", "partition_1.json", "partition_2.json"],
+    )
+    self.assertEqual(
+        self._read_partitions(
+            os.path.join(self.output_dir, name) for name in partition_files
+        ),
+        self.nodes,
+    )
+
+  @flagsaver.flagsaver
+  def test_main_rejects_same_directory(self):
+    """Test that partitions are not overwritten while being read."""
+    flags.FLAGS.output_dir = self.input_dir
+
+    with self.assertRaises(ValueError):
+      repartition_kb.main([])
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
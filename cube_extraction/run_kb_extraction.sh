@@ -23,6 +23,16 @@
 #     Enter number of hops: 3
 #     Enter desired output directory: /path/to/output/
 #     Enter desired output file name: cuisine_artifacts.json
+#     Enter directory of per-root results (optional): /path/to/results/cuisine/
+#     Enter format of intermediate files (json, jsonl, jsonl.gz, jsonl.zst;
+#       default json): jsonl.gz
+#
+# With a directory of per-root results, the hop outputs of every root are kept
+# there, and a rerun only traverses the roots added to constants.py since the
+# previous run, see update_root_results.py.
+#
+# The root cache, hop caches and hop outputs are written in the given format,
+# see jsonl_io.py. The KB partitions may be in any format.
 
 # Get concept, number of hops, output directory, and output file name from user
 IFS= read -rp "Enter directory of KB partitions: " PARTITION_DIR
@@ -30,6 +40,9 @@ IFS= read -rp "Enter concept (e.g., cuisine, landmarks, art): " CONCEPT
 IFS= read -rp "Enter number of hops: " NUM_HOPS
 IFS= read -rp "Enter desired output directory: " OUTPUT_DIR
 IFS= read -rp "Enter desired output file name: " OUTPUT_FILE
+IFS= read -rp "Enter directory of per-root results (optional): " RESULTS_DIR
+IFS= read -rp "Enter format of intermediate files (json, jsonl, jsonl.gz, jsonl.zst; default json): " FORMAT
+FORMAT=${FORMAT:-json}
 
 # Create output directory
 mkdir -p "$OUTPUT_DIR"
@@ -37,24 +50,47 @@ mkdir -p "$OUTPUT_DIR"
 # Create a temporary directory for intermediate cache files
 TEMP_DIR=$(mktemp -d -p "$OUTPUT_DIR" "temp_cache.XXXXXXXXXX")
 
-# Create the root cache
-echo "Creating root cache for concept: $CONCEPT"
-python3 create_root_cache.py \
-  --concept="$CONCEPT" \
-  --root_cache_file_dir="$TEMP_DIR"
+# Create the root cache, of the roots without stored results if any
+if [[ -n "$RESULTS_DIR" ]]; then
+  echo "Updating per-root results for concept: $CONCEPT"
+  python3 update_root_results.py \
+    --step=prepare \
+    --concept="$CONCEPT" \
+    --num_hops="$NUM_HOPS" \
+    --results_dir="$RESULTS_DIR" \
+    --work_dir="$TEMP_DIR" \
+    --format="$FORMAT"
+else
+  echo "Creating root cache for concept: $CONCEPT"
+  python3 create_root_cache.py \
+    --concept="$CONCEPT" \
+    --root_cache_file_dir="$TEMP_DIR" \
+    --format="$FORMAT"
+fi
+
+ROOT_CACHE="$TEMP_DIR/${CONCEPT}_root_nodes.$FORMAT"
+
+# Skip the traversal if all roots have stored results
+if python3 -c 'import sys
+from cube_t2i.cube_extraction import jsonl_io
+sys.exit(any(True for _ in jsonl_io.read_records(sys.argv[1])))' "$ROOT_CACHE"; then
+  START_HOP=$((NUM_HOPS + 1))
+else
+  START_HOP=1
+fi
 
 # Loop for the specified number of hops
-for (( hop=1; hop<=$NUM_HOPS; hop++ )); do
+for (( hop=START_HOP; hop<=$NUM_HOPS; hop++ )); do
   echo "Running hop $hop..."
 
   # Set CURRENT_PREV_CACHE to the root cache for the first hop
   if (( $hop == 1 )); then
-    CURRENT_PREV_CACHE="$TEMP_DIR/${CONCEPT}_root_nodes.json"
+    CURRENT_PREV_CACHE="$ROOT_CACHE"
   else
-    CURRENT_PREV_CACHE="$TEMP_DIR/$((hop-1))_hop_next_cache.json"
+    CURRENT_PREV_CACHE="$TEMP_DIR/$((hop-1))_hop_next_cache.$FORMAT"
   fi
 
-  CURRENT_NEXT_CACHE="$TEMP_DIR/${hop}_hop_next_cache.json"
+  CURRENT_NEXT_CACHE="$TEMP_DIR/${hop}_hop_next_cache.$FORMAT"
   # Execute a single hop of the traversal
   python3 traverse_one_hop_kb.py \
     --prev_cache_path="$CURRENT_PREV_CACHE" \
@@ -62,15 +98,28 @@ for (( hop=1; hop<=$NUM_HOPS; hop++ )); do
     --current_hop="$hop" \
     --output_dir="$TEMP_DIR" \
     --json_filename="out_nodes.json" \
+    --format="$FORMAT" \
     --partition_dir="$PARTITION_DIR"
 done
 
+# Store the new results and gather the results of all roots
+if [[ -n "$RESULTS_DIR" ]]; then
+  python3 update_root_results.py \
+    --step=store \
+    --concept="$CONCEPT" \
+    --num_hops="$NUM_HOPS" \
+    --results_dir="$RESULTS_DIR" \
+    --work_dir="$TEMP_DIR" \
+    --json_filename="out_nodes.json" \
+    --format="$FORMAT"
+fi
+
 # Merge the results from all hops
 echo "Merging results..."
 
 INPUT_FILES=()
 for (( hop=1; hop<=$NUM_HOPS; hop++ )); do
-  INPUT_FILES+=("$TEMP_DIR/${hop}_hop_out_nodes.json")
+  INPUT_FILES+=("$TEMP_DIR/${hop}_hop_out_nodes.$FORMAT")
 done
 
 python3 merge_artifacts.py \
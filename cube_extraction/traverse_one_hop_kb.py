@@ -17,7 +17,9 @@ r"""Traverses the WikiData from the loaded root nodes by 1 hop.
 
 The script reads the root cache file or the prev cache file and traverses the
 Wikidata knowledge base by 1 hop using the algorithm described in CUBE paper:
-https://arxiv.org/abs/2407.06863. The script uses the sling framework for KB traversal.
+https://arxiv.org/abs/2407.06863. The script only reads the JSON partitions
+written by partition_kb.py, so it does not import sling. Partitions and caches
+are read in any format of jsonl_io.py, and the outputs are written in --format.
 
 Example usage:
 
@@ -26,21 +28,38 @@ Example usage:
       --current_hop 1 \
       --output_dir outs \
       --json_filename out_nodes.json
+
+To spread a hop over several hosts with access to the same partition directory
+(e.g. shared storage), run one coordinator, which serves the partitions and
+writes the outputs, and any number of workers:
+
+  python3 traverse_one_hop_kb.py --mode coordinator \
+      --coordinator_address 0.0.0.0:5678 --authkey secret ...
+  python3 traverse_one_hop_kb.py --mode worker \
+      --coordinator_address coordinator-host:5678 --authkey secret ...
+
+Workers take the same flags as the coordinator, and each runs
+`--num_processes` processes claiming partitions from the coordinator.
+Partitions held by workers that stop sending heartbeats are reassigned after
+`--lease_seconds`.
 """
 
+import functools
 import itertools
-import json
 import logging
 import multiprocessing
 import os
+import time
 from typing import Dict, List
 from absl import app
 from absl import flags
-import sling  # pylint:disable=unused-import
 import tqdm
 
 
 from cube_t2i.cube_extraction import constants
+from cube_t2i.cube_extraction import jsonl_io
+from cube_t2i.cube_extraction import partition_sizing
+from cube_t2i.cube_extraction import work_queue
 
 _PREV_CACHE_PATH = flags.DEFINE_string(
     name='prev_cache_path',
@@ -77,7 +96,47 @@ _PARTITION_DIR = flags.DEFINE_string(
 _NUM_PROCESSES = flags.DEFINE_integer(
     name='num_processes',
     default=64,
-    help='Number of processes to use for multicore processing.',
+    help=(
+        'Number of processes to use for multicore processing, or 0 to pick it'
+        ' from the available memory, cores and partition sizes.'
+    ),
+)
+_MODE = flags.DEFINE_enum(
+    name='mode',
+    default='local',
+    enum_values=['local', 'coordinator', 'worker'],
+    help=(
+        "'local' traverses all partitions on this host, 'coordinator' serves"
+        " partitions to workers and writes the merged outputs, 'worker'"
+        ' processes partitions claimed from a coordinator.'
+    ),
+)
+_COORDINATOR_ADDRESS = flags.DEFINE_string(
+    name='coordinator_address',
+    default='localhost:5678',
+    help='host:port the coordinator listens on and workers connect to.',
+)
+_AUTHKEY = flags.DEFINE_string(
+    name='authkey',
+    default=None,
+    help=(
+        'Shared secret key authenticating workers to the coordinator, required'
+        ' in coordinator and worker modes.'
+    ),
+)
+_LEASE_SECONDS = flags.DEFINE_float(
+    name='lease_seconds',
+    default=300.0,
+    help='Time after which partitions of unresponsive workers are reassigned.',
+)
+_FORMAT = flags.DEFINE_enum(
+    name='format',
+    default=jsonl_io.DEFAULT_FORMAT,
+    enum_values=list(jsonl_io.FORMATS),
+    help=(
+        'Format of the output and next cache files, see jsonl_io.py. Their'
+        ' extensions are replaced by that of the format.'
+    ),
 )
 USEFUL_EDGES = constants.PROPERTY_2_ID.values()
 
@@ -164,43 +223,138 @@ def _has_country_property(node_dict: Dict[str, str]) -> bool:
 
 def _one_partition_traversal(
     partition_path: str,
-    prev_cache_ids: List[str],
-    prev_cache_id_to_root: Dict[str, str],
+    prev_cache_roots: Dict[str, List[str]],
 ) -> Dict[str, List[Dict[str, str]]]:
   """Traverses one partition of the Wikidata KB.
 
   Args:
     partition_path: Path to the KB partition to traverse.
-    prev_cache_ids: List of Wikidata IDs from the previous cache.
-    prev_cache_id_to_root: Dictionary mapping Wikidata IDs from the previous
-      cache to their root nodes.
+    prev_cache_roots: Dictionary mapping Wikidata IDs from the previous cache
+      to the distinct root nodes they descend from.
 
   Returns:
     A dictionary containing the results (output nodes and next cache nodes)
-    of the traversal.
+    of the traversal. A node is kept once per root it descends from.
   """
   full_partition_path = os.path.join(_PARTITION_DIR.value, partition_path)
-  with open(full_partition_path, 'r', encoding='utf-8') as partition_file:
-    kb_nodes = json.load(partition_file)
+  # JSON Lines partitions are streamed rather than loaded whole.
+  kb_nodes = jsonl_io.read_records(full_partition_path)
 
   partition_result = {'output_nodes': [], 'next_cache_nodes': []}
   for node_dict in tqdm.tqdm(kb_nodes):
-    # Look for nodes along the 'subclass of' and 'instance of' edges.
-    for root_id in prev_cache_ids:
+    # Look for nodes along the 'subclass of' and 'instance of' edges. The
+    # roots of all matching cache nodes are collected first, so that a node
+    # reached through several of them is kept once per root, not per path.
+    roots = {}
+    for root_id, root_names in prev_cache_roots.items():
       if _is_subclass_of_root(node_dict, root_id) or _is_instance_of_root(
           node_dict, root_id
       ):
-
-        node_dict['root'] = prev_cache_id_to_root[root_id]
-        if _has_country_property(node_dict):  # if a node has country property
-          partition_result['output_nodes'].append(node_dict)
-        else:
-          partition_result['next_cache_nodes'].append(
-              node_dict
-          )  # add to next cache
+        roots.update(dict.fromkeys(root_names))
+    for root in roots:
+      root_node = dict(node_dict, root=root)
+      if _has_country_property(node_dict):  # if a node has country property
+        partition_result['output_nodes'].append(root_node)
+      else:
+        partition_result['next_cache_nodes'].append(
+            root_node
+        )  # add to next cache
   return partition_result
 
 
+def _load_prev_cache(prev_cache_path: str) -> Dict[str, List[str]]:
+  """Loads the IDs of the previous cache nodes and their distinct roots.
+
+  A node reached from several roots is in the cache once per root.
+  """
+  prev_cache_roots = {}
+  for cache_node in jsonl_io.read_records(prev_cache_path):
+    roots = prev_cache_roots.setdefault(cache_node['id'], [])
+    if cache_node['root'] not in roots:
+      roots.append(cache_node['root'])
+  return prev_cache_roots
+
+
+def _num_processes() -> int:
+  """Returns --num_processes, or a value fitting this machine if it is 0."""
+  if _NUM_PROCESSES.value:
+    return _NUM_PROCESSES.value
+  return partition_sizing.recommend_num_processes(_PARTITION_DIR.value)
+
+
+def _traverse_local(
+    kb_partition_dir: List[str],
+    prev_cache_roots: Dict[str, List[str]],
+) -> List[Dict[str, List[Dict[str, str]]]]:
+  """Traverses all partitions with a pool of processes on this host."""
+  with multiprocessing.Pool(_num_processes()) as pool:
+    partition_results = list(
+        pool.starmap(
+            _one_partition_traversal,
+            zip(kb_partition_dir, itertools.repeat(prev_cache_roots)),
+        )
+    )
+    pool.close()
+    pool.join()
+  return partition_results
+
+
+def _traverse_as_coordinator(
+    kb_partition_dir: List[str],
+) -> List[Dict[str, List[Dict[str, str]]]]:
+  """Serves partitions to workers and waits until all results are in.
+
+  Raises:
+    RuntimeError: If a partition failed too many times.
+  """
+  server = work_queue.WorkQueueServer(
+      kb_partition_dir,
+      work_queue.parse_address(_COORDINATOR_ADDRESS.value),
+      _AUTHKEY.value.encode('utf-8'),
+      lease_seconds=_LEASE_SECONDS.value,
+  ).start()
+  queue = server.queue
+  try:
+    with tqdm.tqdm(total=len(kb_partition_dir)) as progress_bar:
+      # Gives up as soon as a partition failed too many times.
+      while not queue.done() and not queue.failures():
+        time.sleep(1)
+        progress_bar.update(queue.progress()[0] - progress_bar.n)
+    failures = queue.failures()
+    if failures:
+      raise RuntimeError(f'Partitions failed too many times: {failures}')
+    return queue.results()
+  finally:
+    server.stop()
+
+
+def _run_workers(prev_cache_roots: Dict[str, List[str]]) -> None:
+  """Processes partitions claimed from the coordinator until it is done."""
+  process_fn = functools.partial(
+      _one_partition_traversal, prev_cache_roots=prev_cache_roots
+  )
+  worker_args = (
+      work_queue.parse_address(_COORDINATOR_ADDRESS.value),
+      _AUTHKEY.value.encode('utf-8'),
+      process_fn,
+  )
+  # Renew leases well before they expire.
+  worker_kwargs = {'heartbeat_seconds': _LEASE_SECONDS.value / 4}
+  workers = [
+      multiprocessing.Process(
+          target=work_queue.run_worker, args=worker_args, kwargs=worker_kwargs
+      )
+      for _ in range(_num_processes())
+  ]
+  for worker in workers:
+    worker.start()
+  for worker in workers:
+    worker.join()
+  exit_codes = [worker.exitcode for worker in workers]
+  if any(exit_codes):
+    raise RuntimeError(f'Workers failed with exit codes {exit_codes}.')
+
+
 def main(_):
   # Access cache file paths from flags
 
@@ -208,9 +362,21 @@ def main(_):
   logger.setLevel(logging.ERROR)
 
   prev_cache_path = _PREV_CACHE_PATH.value
-  next_cache_path = _NEXT_CACHE_PATH.value
+  next_cache_path = jsonl_io.with_format(_NEXT_CACHE_PATH.value, _FORMAT.value)
   output_filename = f'{_CURRENT_HOP.value}_hop_{_JSON_FILENAME.value}'
-  output_path = os.path.join(_OUTPUT_DIR.value, output_filename)
+  output_path = jsonl_io.with_format(
+      os.path.join(_OUTPUT_DIR.value, output_filename), _FORMAT.value
+  )
+
+  # Partitions are merged in name order, so that all modes write the same
+  # outputs.
+  kb_partition_dir = sorted(os.listdir(_PARTITION_DIR.value))
+
+  if _MODE.value != 'local' and not _AUTHKEY.value:
+    raise app.UsageError(f'--authkey is required in {_MODE.value} mode.')
+  if _MODE.value == 'worker':
+    _run_workers(_load_prev_cache(prev_cache_path))
+    return
 
   if not os.path.exists(_OUTPUT_DIR.value):
     os.makedirs(_OUTPUT_DIR.value)
@@ -218,39 +384,19 @@ def main(_):
   output_nodes = []
   next_cache_nodes = []
 
-  with open(prev_cache_path, 'r', encoding='utf-8') as prev_cache_file:
-    prev_cache_nodes = json.load(prev_cache_file)
-  prev_cache_ids = []
-
-  prev_cache_id_to_root = {}
-  for cache_node in prev_cache_nodes:
-    prev_cache_ids.append(cache_node['id'])
-    prev_cache_id_to_root[cache_node['id']] = cache_node['root']
-
-  kb_partition_dir = os.listdir(_PARTITION_DIR.value)
-  with multiprocessing.Pool(_NUM_PROCESSES.value) as pool:
-    partition_results = list(
-        pool.starmap(
-            _one_partition_traversal,
-            zip(
-                kb_partition_dir,
-                itertools.repeat(prev_cache_ids),
-                itertools.repeat(prev_cache_id_to_root),
-            ),
-        )
+  if _MODE.value == 'coordinator':
+    partition_results = _traverse_as_coordinator(kb_partition_dir)
+  else:
+    partition_results = _traverse_local(
+        kb_partition_dir, _load_prev_cache(prev_cache_path)
     )
-    pool.close()
-    pool.join()
 
   for partition_result in partition_results:
     output_nodes.extend(partition_result['output_nodes'])
     next_cache_nodes.extend(partition_result['next_cache_nodes'])
 
-  with open(output_path, 'w', encoding='utf-8') as f:
-    json.dump(output_nodes, f, indent=2)
-
-  with open(next_cache_path, 'w', encoding='utf-8') as f:
-    json.dump(next_cache_nodes, f, indent=2)
+  jsonl_io.write_records(output_path, output_nodes)
+  jsonl_io.write_records(next_cache_path, next_cache_nodes)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,111 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import os
+import tempfile
+import unittest
+
+from absl import app
+from absl import flags
+from absl.testing import flagsaver
+
+from cube_t2i.cube_extraction import jsonl_io
+from cube_t2i.cube_extraction import traverse_one_hop_kb
+
+
+def _kb_node(id_, parents=(), classes=(), country=False):
+  return {
+      "id": id_,
+      "name": id_,
+      "P279": list(parents),
+      "P31": list(classes),
+      "P495": ["Q155"] if country else [],
+      "P17": [],
+  }
+
+
+# Roots QA and QB share the subclass QX, whose subclass QY has a country. QZ
+# is reached from QA along two paths.
+_KB_NODES = [
+    _kb_node("QX", parents=["QA", "QB"]),
+    _kb_node("QW", parents=["QA"]),
+    _kb_node("QY", parents=["QX"], country=True),
+    _kb_node("QZ", parents=["QX"], classes=["QW"], country=True),
+]
+
+
+class TraverseOneHopKbTest(unittest.TestCase):
+  """Test class for traverse_one_hop_kb.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.tmp_dir = tmp_dir.name
+    partition_dir = os.path.join(self.tmp_dir, "partitions")
+    os.makedirs(partition_dir)
+    jsonl_io.write_records(
+        os.path.join(partition_dir, "partition_0.json"), _KB_NODES[:2]
+    )
+    jsonl_io.write_records(
+        os.path.join(partition_dir, "partition_1.json"), _KB_NODES[2:]
+    )
+
+  def _traverse(self, roots, num_hops=2):
+    """Runs the hops from a root cache and returns the (id, root) outputs."""
+    cache_path = os.path.join(self.tmp_dir, "cache_0.json")
+    jsonl_io.write_records(
+        cache_path, [{"id": id_, "root": root} for id_, root in roots.items()]
+    )
+    outputs = []
+    for hop in range(1, num_hops + 1):
+      next_cache_path = os.path.join(self.tmp_dir, f"cache_{hop}.json")
+      with flagsaver.flagsaver():
+        flags.FLAGS([
+            "test_program",
+            f"--prev_cache_path={cache_path}",
+            f"--next_cache_path={next_cache_path}",
+            f"--current_hop={hop}",
+            f"--output_dir={self.tmp_dir}",
+            "--json_filename=out_nodes.json",
+            f"--partition_dir={os.path.join(self.tmp_dir, 'partitions')}",
+            "--num_processes=1",
+        ])
+        traverse_one_hop_kb.main([])
+      output_path = os.path.join(self.tmp_dir, f"{hop}_hop_out_nodes.json")
+      nodes = jsonl_io.load(output_path)
+      outputs.append(sorted((node["id"], node["root"]) for node in nodes))
+      cache_path = next_cache_path
+    return outputs
+
+  def test_shared_node_is_kept_once_per_root(self):
+    outputs = self._traverse({"QA": "a", "QB": "b"})
+
+    self.assertEqual(
+        outputs,
+        [[], [("QY", "a"), ("QY", "b"), ("QZ", "a"), ("QZ", "b")]],
+    )
+
+  def test_roots_are_traversed_independently(self):
+    both = self._traverse({"QA": "a", "QB": "b"})
+    only_a = self._traverse({"QA": "a"})
+    only_b = self._traverse({"QB": "b"})
+
+    for hop_both, hop_a, hop_b in zip(both, only_a, only_b):
+      self.assertEqual(hop_both, sorted(hop_a + hop_b))
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
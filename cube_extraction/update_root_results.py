@@ -0,0 +1,313 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Keeps the artifacts of every root node, to only traverse added roots.
+
+Every node found by traverse_one_hop_kb.py carries the name of the root node it
+descends from in its 'root' key, and the nodes of a root only depend on that
+root. So the hop outputs of every root are kept in a results directory:
+
+  roots.json: the roots ({id: name}) whose results are stored, and the number
+    of hops they were traversed for.
+  <root id>/<hop>_hop_<json_filename>: the output nodes of the root at a hop.
+
+When the root dictionary of a concept in constants.py changes, only the roots
+added since the last run are traversed, and the results of removed roots are
+dropped. An extraction runs in two steps around the usual hops:
+
+  --step=prepare drops the results of removed roots and writes the root cache
+    of the added roots to --work_dir, in place of create_root_cache.py. The
+    hops are then run from it; they can be skipped if the cache is empty.
+  --step=store moves the hop outputs in --work_dir to the results of their
+    roots, and replaces them with the hop outputs of all roots, for
+    merge_artifacts.py.
+
+A change of --num_hops traverses all roots again. The root cache and hop
+outputs are written in --format, see jsonl_io.py. Results stored in another
+format are still read.
+
+Example usage:
+
+  python3 update_root_results.py --step=prepare --concept=landmarks \
+      --num_hops=3 --results_dir=results/landmarks --work_dir=temp
+  # Hops 1 to 3 of traverse_one_hop_kb.py from temp/landmarks_root_nodes.json.
+  python3 update_root_results.py --step=store --concept=landmarks \
+      --num_hops=3 --results_dir=results/landmarks --work_dir=temp
+"""
+
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Tuple
+
+from absl import app
+from absl import flags
+
+from cube_t2i.cube_extraction import constants
+from cube_t2i.cube_extraction import jsonl_io
+
+
+_STEP = flags.DEFINE_enum(
+    name='step',
+    default=None,
+    enum_values=['prepare', 'store'],
+    help='Step of the extraction to run, see the module docstring.',
+    required=True,
+)
+_CONCEPT = flags.DEFINE_string(
+    name='concept',
+    default=None,  # For list of valid concepts, refer constants.py
+    help='Name of the concept that is being considered',
+    required=True,
+)
+_NUM_HOPS = flags.DEFINE_integer(
+    name='num_hops', default=None, help='Number of hops.', required=True
+)
+_RESULTS_DIR = flags.DEFINE_string(
+    name='results_dir',
+    default=None,
+    help='Directory keeping the hop outputs of every root across runs.',
+    required=True,
+)
+_WORK_DIR = flags.DEFINE_string(
+    name='work_dir',
+    default=None,
+    help='Directory of the root cache and hop outputs of this run.',
+    required=True,
+)
+_JSON_FILENAME = flags.DEFINE_string(
+    name='json_filename',
+    default='out_nodes.json',
+    help='Filename passed to traverse_one_hop_kb.py --json_filename.',
+)
+_FORMAT = flags.DEFINE_enum(
+    name='format',
+    default=jsonl_io.DEFAULT_FORMAT,
+    enum_values=list(jsonl_io.FORMATS),
+    help='Format passed to traverse_one_hop_kb.py --format.',
+)
+
+_MANIFEST_FILE = 'roots.json'
+
+Node = Dict[str, Any]
+
+
+def load_manifest(results_dir: str) -> Tuple[Dict[str, str], int]:
+  """Returns the stored roots ({id: name}) and their number of hops."""
+  manifest_path = os.path.join(results_dir, _MANIFEST_FILE)
+  if not os.path.exists(manifest_path):
+    return {}, 0
+  with open(manifest_path, 'r') as f:
+    manifest = json.load(f)
+  return manifest['roots'], manifest['num_hops']
+
+
+def _save_manifest(
+    results_dir: str, roots: Dict[str, str], num_hops: int
+) -> None:
+  # Written to a temporary file first, so the manifest is never partial.
+  manifest_path = os.path.join(results_dir, _MANIFEST_FILE)
+  with open(manifest_path + '.tmp', 'w') as f:
+    json.dump({'roots': roots, 'num_hops': num_hops}, f, indent=2)
+  os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def diff_roots(
+    stored: Dict[str, str], current: Dict[str, str]
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+  """Returns the added and the removed roots, as {id: name}.
+
+  Nodes name their root, so a renamed root is both removed and added.
+
+  Args:
+    stored: Roots whose results are stored.
+    current: Roots of the concept.
+  """
+  added = {
+      id_: name for id_, name in current.items() if stored.get(id_) != name
+  }
+  removed = {
+      id_: name for id_, name in stored.items() if current.get(id_) != name
+  }
+  return added, removed
+
+
+def prepare_roots(
+    results_dir: str, roots: Dict[str, str], num_hops: int
+) -> Dict[str, str]:
+  """Drops the results of removed roots and returns the roots to traverse.
+
+  Args:
+    results_dir: Directory of the stored results.
+    roots: Current roots of the concept, {id: name}.
+    num_hops: Number of hops of this run. If it differs from the stored one,
+      all results are dropped.
+
+  Returns:
+    The roots missing from the stored results, {id: name}.
+  """
+  os.makedirs(results_dir, exist_ok=True)
+  stored, stored_num_hops = load_manifest(results_dir)
+  if stored_num_hops != num_hops:
+    stored, removed = {}, stored
+  else:
+    _, removed = diff_roots(stored, roots)
+    stored = {id_: stored[id_] for id_ in stored if id_ not in removed}
+  # The manifest is updated before the files are deleted, so it only ever
+  # lists complete results.
+  _save_manifest(results_dir, stored, num_hops)
+  for id_ in removed:
+    shutil.rmtree(os.path.join(results_dir, id_), ignore_errors=True)
+  added, _ = diff_roots(stored, roots)
+  return added
+
+
+def split_by_root(
+    nodes: List[Node], roots: Dict[str, str]
+) -> Dict[str, List[Node]]:
+  """Groups nodes by the ID of their root.
+
+  Args:
+    nodes: Nodes with the name of their root in their 'root' key.
+    roots: Roots of the nodes, {id: name}.
+
+  Returns:
+    The nodes of every root, by root ID, in their original order.
+
+  Raises:
+    ValueError: If a node descends from another root.
+  """
+  name_to_id = {name: id_ for id_, name in roots.items()}
+  nodes_by_root = {id_: [] for id_ in roots}
+  for node in nodes:
+    if node['root'] not in name_to_id:
+      raise ValueError(f'Node {node["id"]} has unknown root {node["root"]!r}.')
+    nodes_by_root[name_to_id[node['root']]].append(node)
+  return nodes_by_root
+
+
+def _hop_filename(hop: int, json_filename: str) -> str:
+  # The output filename of traverse_one_hop_kb.py.
+  return f'{hop}_hop_{json_filename}'
+
+
+def store_roots(
+    results_dir: str,
+    added: Dict[str, str],
+    hop_dir: str,
+    num_hops: int,
+    json_filename: str = 'out_nodes.json',
+) -> None:
+  """Stores the hop outputs of the added roots by root.
+
+  Args:
+    results_dir: Directory of the stored results.
+    added: Roots the hop outputs were traversed from, {id: name}.
+    hop_dir: Directory of the hop outputs.
+    num_hops: Number of hops.
+    json_filename: Filename of the hop outputs, without hop prefix. Its
+      extension gives the format of the hop outputs and of the stored results.
+  """
+  nodes_by_hop = []
+  for hop in range(1, num_hops + 1):
+    hop_nodes = jsonl_io.read_records(
+        os.path.join(hop_dir, _hop_filename(hop, json_filename))
+    )
+    nodes_by_hop.append(split_by_root(hop_nodes, added))
+  for id_ in added:
+    root_dir = os.path.join(results_dir, id_)
+    os.makedirs(root_dir, exist_ok=True)
+    for hop, nodes_by_root in enumerate(nodes_by_hop, start=1):
+      jsonl_io.write_records(
+          os.path.join(root_dir, _hop_filename(hop, json_filename)),
+          nodes_by_root[id_],
+      )
+  stored, _ = load_manifest(results_dir)
+  _save_manifest(results_dir, {**stored, **added}, num_hops)
+
+
+def load_hop(
+    results_dir: str,
+    roots: Dict[str, str],
+    hop: int,
+    json_filename: str = 'out_nodes.json',
+) -> List[Node]:
+  """Returns the output nodes of all roots at a hop, in the order of `roots`.
+
+  Raises:
+    ValueError: If the results of a root are not stored.
+  """
+  stored, _ = load_manifest(results_dir)
+  missing = [name for id_, name in roots.items() if stored.get(id_) != name]
+  if missing:
+    raise ValueError(f'No stored results for the roots {missing}.')
+  # Results may be stored in another format than `json_filename`.
+  root_paths = [
+      jsonl_io.existing_path(
+          os.path.join(results_dir, id_, _hop_filename(hop, json_filename))
+      )
+      for id_ in roots
+  ]
+  return [node for nodes in jsonl_io.load_many(root_paths) for node in nodes]
+
+
+def _root_cache_path(work_dir: str, concept: str) -> str:
+  # The root cache path of create_root_cache.py.
+  return os.path.join(work_dir, f'{concept}_root_nodes.json')
+
+
+def main(_):
+  if _CONCEPT.value not in constants.CONCEPT_ROOT_NODES:
+    raise ValueError('Invalid concept: %s' % _CONCEPT.value)
+  roots = constants.CONCEPT_ROOT_NODES[_CONCEPT.value]
+  root_cache_path = jsonl_io.with_format(
+      _root_cache_path(_WORK_DIR.value, _CONCEPT.value), _FORMAT.value
+  )
+  json_filename = jsonl_io.with_format(_JSON_FILENAME.value, _FORMAT.value)
+
+  if _STEP.value == 'prepare':
+    added = prepare_roots(_RESULTS_DIR.value, roots, _NUM_HOPS.value)
+    os.makedirs(_WORK_DIR.value, exist_ok=True)
+    # Root is same as name for first hop, as in create_root_cache.py.
+    root_cache_nodes = [
+        {'id': id_, 'name': name, 'root': name} for id_, name in added.items()
+    ]
+    jsonl_io.write_records(root_cache_path, root_cache_nodes)
+    print(f'{len(added)} roots to traverse: {sorted(added.values())}')
+    return
+
+  added = {
+      node['id']: node['name']
+      for node in jsonl_io.read_records(root_cache_path)
+  }
+  if added:
+    store_roots(
+        _RESULTS_DIR.value,
+        added,
+        _WORK_DIR.value,
+        _NUM_HOPS.value,
+        json_filename,
+    )
+  for hop in range(1, _NUM_HOPS.value + 1):
+    output_path = os.path.join(
+        _WORK_DIR.value, _hop_filename(hop, json_filename)
+    )
+    jsonl_io.write_records(
+        output_path, load_hop(_RESULTS_DIR.value, roots, hop, json_filename)
+    )
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,169 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from absl import app
+from absl import flags
+from absl.testing import flagsaver
+
+from cube_t2i.cube_extraction import constants
+from cube_t2i.cube_extraction import jsonl_io
+from cube_t2i.cube_extraction import update_root_results
+
+
+def _node(id_, root):
+  return {"id": id_, "P495": ["Q155"], "root": root}
+
+
+# Output nodes of a 2-hop traversal from every root, by hop.
+_HOP_NODES = {
+    "Q2095": [[_node("Q1", "food")], [_node("Q2", "food")]],
+    "Q746549": [[_node("Q3", "dish")], []],
+    "Q19861951": [[], [_node("Q4", "type of food or dish")]],
+}
+
+
+class UpdateRootResultsTest(unittest.TestCase):
+  """Test class for update_root_results.py."""
+
+  def setUp(self):
+    super().setUp()
+    self.results_dir = tempfile.mkdtemp()
+    self.work_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.results_dir)
+    self.addCleanup(shutil.rmtree, self.work_dir)
+
+  def _traverse(self, roots, num_hops=2, fmt="json"):
+    """Writes the hop outputs of `roots`, as traverse_one_hop_kb.py would."""
+    for hop in range(1, num_hops + 1):
+      nodes = [node for id_ in roots for node in _HOP_NODES[id_][hop - 1]]
+      jsonl_io.write_records(
+          os.path.join(self.work_dir, f"{hop}_hop_out_nodes.{fmt}"), nodes
+      )
+
+  def _run(self, roots, num_hops=2, fmt="json"):
+    """Runs an extraction and returns the roots it traversed."""
+    added = update_root_results.prepare_roots(
+        self.results_dir, roots, num_hops
+    )
+    self._traverse(added, num_hops, fmt)
+    update_root_results.store_roots(
+        self.results_dir, added, self.work_dir, num_hops, f"out_nodes.{fmt}"
+    )
+    return added
+
+  def test_only_added_roots_are_traversed(self):
+    roots = {"Q2095": "food", "Q746549": "dish"}
+    self.assertEqual(self._run(roots), roots)
+    self.assertEqual(
+        update_root_results.load_hop(self.results_dir, roots, hop=1),
+        [_node("Q1", "food"), _node("Q3", "dish")],
+    )
+
+    roots = {"Q746549": "dish", "Q19861951": "type of food or dish"}
+    self.assertEqual(self._run(roots), {"Q19861951": "type of food or dish"})
+    self.assertFalse(os.path.exists(os.path.join(self.results_dir, "Q2095")))
+    for hop in (1, 2):
+      self.assertEqual(
+          update_root_results.load_hop(self.results_dir, roots, hop),
+          [node for id_ in roots for node in _HOP_NODES[id_][hop - 1]],
+      )
+
+    self.assertEqual(self._run(roots), {})
+    # All roots are traversed again for another number of hops.
+    self.assertEqual(self._run(roots, num_hops=1), roots)
+
+  def test_results_are_read_in_any_format(self):
+    self._run({"Q2095": "food"})
+    roots = {"Q2095": "food", "Q746549": "dish"}
+    self._run(roots, fmt="jsonl.gz")
+    self.assertEqual(
+        sorted(os.listdir(os.path.join(self.results_dir, "Q746549"))),
+        ["1_hop_out_nodes.jsonl.gz", "2_hop_out_nodes.jsonl.gz"],
+    )
+    self.assertEqual(
+        update_root_results.load_hop(
+            self.results_dir, roots, hop=1, json_filename="out_nodes.jsonl.gz"
+        ),
+        [_node("Q1", "food"), _node("Q3", "dish")],
+    )
+
+  def test_renamed_root_is_traversed_again(self):
+    self._run({"Q2095": "food"})
+    added, removed = update_root_results.diff_roots(
+        {"Q2095": "food"}, {"Q2095": "foods"}
+    )
+    self.assertEqual(added, {"Q2095": "foods"})
+    self.assertEqual(removed, {"Q2095": "food"})
+
+  def test_load_hop_of_missing_root(self):
+    self._run({"Q2095": "food"})
+    with self.assertRaisesRegex(ValueError, "dish"):
+      update_root_results.load_hop(
+          self.results_dir, {"Q746549": "dish"}, hop=1
+      )
+
+  def test_split_by_root_of_unknown_root(self):
+    with self.assertRaisesRegex(ValueError, "unknown root"):
+      update_root_results.split_by_root(
+          [_node("Q1", "food")], {"Q746549": "dish"}
+      )
+
+  @flagsaver.flagsaver
+  def test_main_writes_hop_outputs_of_all_roots(self):
+    flags.FLAGS([
+        "test_program",
+        "--step=prepare",
+        "--concept=cuisine",
+        "--num_hops=2",
+        f"--results_dir={self.results_dir}",
+        f"--work_dir={self.work_dir}",
+    ])
+    update_root_results.main([])
+    with open(os.path.join(self.work_dir, "cuisine_root_nodes.json")) as f:
+      root_cache = json.load(f)
+    self.assertEqual(
+        [node["id"] for node in root_cache],
+        list(constants.CUISINE_ROOT_NODES),
+    )
+
+    self._traverse(constants.CUISINE_ROOT_NODES)
+    flags.FLAGS.step = "store"
+    update_root_results.main([])
+    with open(os.path.join(self.work_dir, "2_hop_out_nodes.json")) as f:
+      self.assertEqual(
+          json.load(f),
+          [_node("Q2", "food"), _node("Q4", "type of food or dish")],
+      )
+
+    # Nothing to traverse in a rerun, which still writes all hop outputs.
+    flags.FLAGS.step = "prepare"
+    update_root_results.main([])
+    with open(os.path.join(self.work_dir, "cuisine_root_nodes.json")) as f:
+      self.assertEqual(json.load(f), [])
+    os.remove(os.path.join(self.work_dir, "2_hop_out_nodes.json"))
+    flags.FLAGS.step = "store"
+    update_root_results.main([])
+    with open(os.path.join(self.work_dir, "2_hop_out_nodes.json")) as f:
+      self.assertEqual(len(json.load(f)), 2)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
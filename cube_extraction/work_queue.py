@@ -0,0 +1,369 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Shared work queue for traversing KB partitions on several hosts.
+
+A coordinator serves a `PartitionWorkQueue` over TCP with
+`multiprocessing.managers`, from a child process. Workers on any host connect
+to it, claim one partition at a time, and report the partition result back. A
+claim is a lease: workers renew their leases with heartbeats while they process
+a partition, and partitions whose lease expires (e.g. because the worker died)
+are handed out again. Results are returned in partition order, so the merged
+output does not depend on which worker processed which partition. A partition
+that fails or loses its lease `max_attempts` times, e.g. because its file is
+corrupt, fails for good instead of taking down every worker in turn.
+"""
+
+import collections
+import logging
+from multiprocessing import managers
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+Address = Tuple[str, int]
+
+
+def parse_address(address: str) -> Address:
+  """Parses a 'host:port' string into a (host, port) tuple."""
+  host, port = address.rsplit(':', 1)
+  return host, int(port)
+
+
+class PartitionWorkQueue:
+  """Leases partitions to workers and collects the partition results.
+
+  All public methods are thread-safe, since the manager server handles each
+  worker connection in its own thread.
+  """
+
+  def __init__(
+      self,
+      partitions: Iterable[str],
+      lease_seconds: float = 300.0,
+      max_attempts: int = 3,
+      clock: Callable[[], float] = time.monotonic,
+  ):
+    """Initializes the queue.
+
+    Args:
+      partitions: Names of the partitions to process.
+      lease_seconds: Time after which a claimed partition that was neither
+        completed nor renewed by a heartbeat is handed out again.
+      max_attempts: Number of claims of a partition that end in a failure or
+        an expired lease after which the partition fails for good.
+      clock: Monotonic clock in seconds, overridable for tests.
+    """
+    self._partitions = sorted(set(partitions))
+    self._pending = collections.deque(self._partitions)
+    self._leases: Dict[str, Tuple[str, float]] = {}  # partition -> lease
+    self._results: Dict[str, Any] = {}
+    self._attempts: Dict[str, int] = collections.Counter()
+    self._failures: Dict[str, str] = {}  # partition -> last error
+    self._lease_seconds = lease_seconds
+    self._max_attempts = max_attempts
+    self._clock = clock
+    self._lock = threading.Lock()
+
+  def _retry_or_fail(self, partition: str, error: str) -> None:
+    """Moves a partition back to the pending queue, or fails it for good."""
+    if self._attempts[partition] >= self._max_attempts:
+      logging.error(
+          'Partition %s failed %d times, giving up: %s',
+          partition,
+          self._attempts[partition],
+          error,
+      )
+      self._failures[partition] = error
+    else:
+      self._pending.appendleft(partition)
+
+  def _reclaim_expired_leases(self) -> None:
+    """Moves partitions with expired leases back to the pending queue."""
+    now = self._clock()
+    for partition, (worker_id, deadline) in list(self._leases.items()):
+      if deadline < now:
+        logging.warning(
+            'Lease of %s by worker %s expired, reassigning.',
+            partition,
+            worker_id,
+        )
+        del self._leases[partition]
+        self._retry_or_fail(partition, f'Lease of worker {worker_id} expired.')
+
+  def claim(self, worker_id: str) -> Optional[str]:
+    """Leases the next pending partition to `worker_id`.
+
+    Args:
+      worker_id: Unique name of the claiming worker.
+
+    Returns:
+      The claimed partition name, or None if no partition is pending. Callers
+      should check `done()` before waiting for leased partitions to expire.
+    """
+    with self._lock:
+      self._reclaim_expired_leases()
+      while self._pending:
+        partition = self._pending.popleft()
+        if partition in self._results or partition in self._leases:
+          continue
+        deadline = self._clock() + self._lease_seconds
+        self._leases[partition] = (worker_id, deadline)
+        self._attempts[partition] += 1
+        return partition
+      return None
+
+  def heartbeat(self, worker_id: str) -> None:
+    """Renews all leases held by `worker_id`."""
+    with self._lock:
+      deadline = self._clock() + self._lease_seconds
+      for partition, (lease_owner, _) in self._leases.items():
+        if lease_owner == worker_id:
+          self._leases[partition] = (worker_id, deadline)
+
+  def complete(self, worker_id: str, partition: str, result: Any) -> bool:
+    """Records the result of a partition.
+
+    Args:
+      worker_id: Name of the worker reporting the result.
+      partition: Name of the processed partition.
+      result: Result of processing the partition.
+
+    Returns:
+      Whether the result was recorded. Results for partitions that already have
+      one (e.g. from a worker presumed dead whose lease was reassigned) are
+      ignored, since processing a partition is deterministic. So are late
+      results for partitions that failed for good, which the coordinator has
+      given up on.
+    """
+    with self._lock:
+      if partition in self._results:
+        logging.info(
+            'Ignoring duplicate result for %s from %s.', partition, worker_id
+        )
+        return False
+      if partition in self._failures:
+        logging.info(
+            'Ignoring result for %s from %s, which failed for good.',
+            partition,
+            worker_id,
+        )
+        return False
+      self._results[partition] = result
+      self._leases.pop(partition, None)
+      return True
+
+  def fail(self, worker_id: str, partition: str, error: str) -> bool:
+    """Reports that `worker_id` failed to process a partition.
+
+    The partition is handed out again, unless it was claimed `max_attempts`
+    times already, in which case it fails for good.
+
+    Args:
+      worker_id: Name of the worker reporting the failure.
+      partition: Name of the partition that failed.
+      error: Description of the failure.
+
+    Returns:
+      Whether the partition failed for good.
+    """
+    with self._lock:
+      lease = self._leases.get(partition)
+      if lease is not None and lease[0] == worker_id:
+        del self._leases[partition]
+        self._retry_or_fail(partition, error)
+      return partition in self._failures
+
+  def failures(self) -> Dict[str, str]:
+    """Returns the last error of every partition that failed for good."""
+    with self._lock:
+      return dict(self._failures)
+
+  def progress(self) -> Tuple[int, int]:
+    """Returns the number of completed partitions and the total number."""
+    with self._lock:
+      return len(self._results), len(self._partitions)
+
+  def done(self) -> bool:
+    """Returns whether every partition has a result or failed for good."""
+    with self._lock:
+      return len(self._results) + len(self._failures) == len(self._partitions)
+
+  def results(self) -> List[Any]:
+    """Returns the results of all completed partitions in partition order."""
+    with self._lock:
+      return [
+          self._results[partition]
+          for partition in self._partitions
+          if partition in self._results
+      ]
+
+
+class _ClientManager(managers.BaseManager):
+  """Manager used by workers to connect to a served queue."""
+
+
+_ClientManager.register('get_queue')
+
+
+# The queue of the process started by a `WorkQueueServer`.
+_served_queue: Optional[PartitionWorkQueue] = None
+
+
+def _create_served_queue(*args) -> None:
+  global _served_queue
+  _served_queue = PartitionWorkQueue(*args)
+
+
+def _get_served_queue() -> PartitionWorkQueue:
+  return _served_queue
+
+
+class _ServerManager(managers.BaseManager):
+  """Manager running a served queue in a process of its own."""
+
+
+_ServerManager.register('get_queue', callable=_get_served_queue)
+
+
+class WorkQueueServer:
+  """Serves a `PartitionWorkQueue` over TCP from a child process.
+
+  The queue lives in the child process, which handles every worker connection
+  in a thread of its own, and the coordinator reads it through the `queue`
+  proxy. `stop` terminates the process.
+  """
+
+  def __init__(
+      self,
+      partitions: Iterable[str],
+      address: Address,
+      authkey: bytes,
+      lease_seconds: float = 300.0,
+      max_attempts: int = 3,
+  ):
+    """Initializes the server, see `PartitionWorkQueue` for the queue args.
+
+    Args:
+      partitions: Names of the partitions to process.
+      address: Address to listen on; port 0 picks a free port.
+      authkey: Secret key authenticating workers.
+      lease_seconds: See `PartitionWorkQueue`.
+      max_attempts: See `PartitionWorkQueue`.
+    """
+    self._manager = _ServerManager(address=address, authkey=authkey)
+    self._queue_args = (sorted(partitions), lease_seconds, max_attempts)
+    self.queue: Optional[PartitionWorkQueue] = None
+
+  @property
+  def address(self) -> Address:
+    return self._manager.address
+
+  def start(self) -> 'WorkQueueServer':
+    self._manager.start(_create_served_queue, self._queue_args)
+    self.queue = self._manager.get_queue()
+    return self
+
+  def stop(self) -> None:
+    """Terminates the server process."""
+    self._manager.shutdown()
+
+
+def connect(address: Address, authkey: bytes) -> PartitionWorkQueue:
+  """Returns a proxy for the queue served at `address`."""
+  manager = _ClientManager(address=address, authkey=authkey)
+  manager.connect()
+  return manager.get_queue()
+
+
+def _default_worker_id() -> str:
+  return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def run_worker(
+    address: Address,
+    authkey: bytes,
+    process_fn: Callable[[str], Any],
+    worker_id: Optional[str] = None,
+    heartbeat_seconds: float = 30.0,
+    poll_seconds: float = 1.0,
+) -> int:
+  """Claims and processes partitions until the queue is done.
+
+  Args:
+    address: Address of the coordinator serving the queue.
+    authkey: Authentication key of the coordinator.
+    process_fn: Function mapping a partition name to its result.
+    worker_id: Unique name of this worker, defaults to 'hostname:pid'.
+    heartbeat_seconds: Interval between lease renewals. Must be well below
+      the lease duration of the queue.
+    poll_seconds: Time to wait before claiming again while all remaining
+      partitions are leased to other workers.
+
+  Returns:
+    The number of partitions processed by this worker.
+
+  Raises:
+    RuntimeError: If a partition this worker failed to process failed for
+      good. Failures are reported to the queue, and the worker keeps claiming
+      other partitions until the queue is done.
+  """
+  worker_id = worker_id or _default_worker_id()
+  queue = connect(address, authkey)
+  stop_heartbeat = threading.Event()
+
+  def _heartbeat():
+    # Proxies open one connection per thread, so this does not block claims.
+    try:
+      heartbeat_queue = connect(address, authkey)
+      while not stop_heartbeat.wait(heartbeat_seconds):
+        heartbeat_queue.heartbeat(worker_id)
+    except (EOFError, OSError):
+      # The coordinator shut down.
+      return
+
+  heartbeat_thread = threading.Thread(target=_heartbeat, daemon=True)
+  heartbeat_thread.start()
+
+  num_processed = 0
+  failed_partitions = []
+  try:
+    while True:
+      partition = queue.claim(worker_id)
+      if partition is None:
+        if queue.done():
+          break
+        time.sleep(poll_seconds)
+        continue
+      try:
+        result = process_fn(partition)
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        logging.exception('Worker %s failed on %s.', worker_id, partition)
+        if queue.fail(worker_id, partition, repr(e)):
+          failed_partitions.append(partition)
+        continue
+      queue.complete(worker_id, partition, result)
+      num_processed += 1
+  except (EOFError, OSError):
+    # The coordinator shuts down once all results are in.
+    logging.info('Coordinator at %s went away, stopping.', address)
+  finally:
+    stop_heartbeat.set()
+  if failed_partitions:
+    raise RuntimeError(f'Partitions failed for good: {failed_partitions}.')
+  return num_processed
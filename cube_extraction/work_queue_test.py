@@ -0,0 +1,240 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import threading
+import unittest
+
+from absl import app
+
+from cube_t2i.cube_extraction import work_queue
+
+
+class _FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+
+class PartitionWorkQueueTest(unittest.TestCase):
+  """Test class for PartitionWorkQueue."""
+
+  def test_claims_each_partition_once(self):
+    """Test that partitions are handed out once, in name order."""
+    queue = work_queue.PartitionWorkQueue(["p2", "p0", "p1"])
+
+    claimed = [queue.claim("w0"), queue.claim("w1"), queue.claim("w0")]
+
+    self.assertEqual(claimed, ["p0", "p1", "p2"])
+    self.assertIsNone(queue.claim("w1"))
+    self.assertFalse(queue.done())
+
+  def test_results_are_in_partition_order(self):
+    """Test that results do not depend on the completion order."""
+    queue = work_queue.PartitionWorkQueue(["p1", "p0"])
+    first, second = queue.claim("w0"), queue.claim("w1")
+
+    self.assertTrue(queue.complete("w1", second, "result1"))
+    self.assertTrue(queue.complete("w0", first, "result0"))
+
+    self.assertTrue(queue.done())
+    self.assertEqual(queue.results(), ["result0", "result1"])
+
+  def test_reassigns_expired_lease(self):
+    """Test that partitions of a dead worker are handed out again."""
+    clock = _FakeClock()
+    queue = work_queue.PartitionWorkQueue(
+        ["p0"], lease_seconds=10.0, clock=clock
+    )
+    self.assertEqual(queue.claim("dead"), "p0")
+
+    clock.now = 5.0
+    self.assertIsNone(queue.claim("alive"))
+    clock.now = 11.0
+    self.assertEqual(queue.claim("alive"), "p0")
+
+    self.assertTrue(queue.complete("alive", "p0", "result"))
+    # A late result from the presumed-dead worker is ignored.
+    self.assertFalse(queue.complete("dead", "p0", "late"))
+    self.assertEqual(queue.results(), ["result"])
+
+  def test_heartbeat_renews_lease(self):
+    """Test that heartbeats keep a slow worker's lease alive."""
+    clock = _FakeClock()
+    queue = work_queue.PartitionWorkQueue(
+        ["p0"], lease_seconds=10.0, clock=clock
+    )
+    queue.claim("slow")
+
+    clock.now = 8.0
+    queue.heartbeat("slow")
+    clock.now = 15.0
+
+    self.assertIsNone(queue.claim("other"))
+
+  def test_failed_partition_is_claimed_again(self):
+    """Test that a partition is retried until it fails for good."""
+    queue = work_queue.PartitionWorkQueue(["p0"], max_attempts=2)
+    queue.claim("w0")
+
+    self.assertFalse(queue.fail("w0", "p0", "ValueError()"))
+    self.assertEqual(queue.claim("w1"), "p0")
+    self.assertTrue(queue.fail("w1", "p0", "ValueError()"))
+
+    # A late result, e.g. of a worker whose lease expired, is ignored.
+    self.assertFalse(queue.complete("w0", "p0", "late"))
+    self.assertEqual(queue.progress(), (0, 1))
+    self.assertTrue(queue.done())
+
+  def test_partition_fails_for_good_after_max_attempts(self):
+    """Test that a partition that keeps failing is not handed out forever."""
+    clock = _FakeClock()
+    queue = work_queue.PartitionWorkQueue(
+        ["p0", "p1"], lease_seconds=10.0, max_attempts=3, clock=clock
+    )
+    self.assertEqual(queue.claim("w0"), "p0")
+    self.assertFalse(queue.fail("w0", "p0", "ValueError()"))
+    # An expired lease counts as an attempt too.
+    self.assertEqual(queue.claim("dead"), "p0")
+    clock.now = 11.0
+    self.assertEqual(queue.claim("w1"), "p0")
+    self.assertTrue(queue.fail("w1", "p0", "ValueError()"))
+
+    self.assertEqual(queue.failures(), {"p0": "ValueError()"})
+    self.assertEqual(queue.claim("w1"), "p1")
+    queue.complete("w1", "p1", "result")
+    self.assertTrue(queue.done())
+    self.assertEqual(queue.results(), ["result"])
+
+
+class WorkQueueServerTest(unittest.TestCase):
+  """Test class for serving the queue to workers over TCP."""
+
+  def setUp(self):
+    super().setUp()
+    self.authkey = b"test"
+
+  def _serve(self, partitions, **kwargs):
+    server = work_queue.WorkQueueServer(
+        partitions, ("127.0.0.1", 0), self.authkey, **kwargs
+    ).start()
+    self.addCleanup(server.stop)
+    return server
+
+  def test_workers_process_all_partitions(self):
+    """Test that several workers together process every partition once."""
+    partitions = [f"partition_{i}.json" for i in range(20)]
+    server = self._serve(partitions)
+    num_processed = []
+
+    def _worker(worker_id):
+      num_processed.append(
+          work_queue.run_worker(
+              server.address,
+              self.authkey,
+              process_fn=lambda partition: {"name": partition},
+              worker_id=worker_id,
+              poll_seconds=0.01,
+          )
+      )
+
+    threads = [
+        threading.Thread(target=_worker, args=(f"w{i}",)) for i in range(3)
+    ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    self.assertTrue(server.queue.done())
+    self.assertEqual(sum(num_processed), len(partitions))
+    self.assertEqual(
+        server.queue.results(), [{"name": name} for name in sorted(partitions)]
+    )
+
+  def test_worker_takes_over_from_dead_worker(self):
+    """Test that a live worker finishes partitions leased by a dead one."""
+    server = self._serve(["p0", "p1"], lease_seconds=0.2)
+    work_queue.connect(server.address, self.authkey).claim("dead")
+
+    num_processed = work_queue.run_worker(
+        server.address,
+        self.authkey,
+        process_fn=lambda partition: partition,
+        worker_id="alive",
+        poll_seconds=0.05,
+    )
+
+    self.assertEqual(num_processed, 2)
+    self.assertEqual(server.queue.results(), ["p0", "p1"])
+
+  def test_workers_stop_on_partition_that_always_fails(self):
+    """Test that a corrupt partition fails the workers instead of looping."""
+    server = self._serve(["bad", "good"], max_attempts=2)
+    errors = []
+
+    def _process(partition):
+      if partition == "bad":
+        raise ValueError("Corrupt partition.")
+      return partition
+
+    def _worker(worker_id):
+      try:
+        work_queue.run_worker(
+            server.address,
+            self.authkey,
+            process_fn=_process,
+            worker_id=worker_id,
+            poll_seconds=0.01,
+        )
+      except RuntimeError as e:
+        errors.append(e)
+
+    threads = [
+        threading.Thread(target=_worker, args=(f"w{i}",)) for i in range(2)
+    ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join(timeout=10)
+
+    self.assertFalse(any(thread.is_alive() for thread in threads))
+    self.assertEqual(len(errors), 1)
+    self.assertEqual(list(server.queue.failures()), ["bad"])
+    self.assertEqual(server.queue.results(), ["good"])
+
+  def test_stop_closes_server(self):
+    server = work_queue.WorkQueueServer(
+        ["p0"], ("127.0.0.1", 0), self.authkey
+    ).start()
+    self.assertEqual(
+        work_queue.connect(server.address, self.authkey).claim("w0"), "p0"
+    )
+
+    server.stop()
+
+    with self.assertRaises(OSError):
+      work_queue.connect(server.address, self.authkey)
+
+  def test_parse_address(self):
+    self.assertEqual(
+        work_queue.parse_address("localhost:5678"), ("localhost", 5678)
+    )
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,170 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Persistent cache of VLM responses, keyed by content hashes.
+
+A response is keyed by the hashes of the image pixels, the question and the
+name of the VLM, so re-running an evaluation only queries the VLM for new
+(image, question, model) triples, wherever the images are stored and whether
+they are read from files or generated in memory. Responses are stored in a
+SQLite database. When the cache exceeds its size limit, the least recently used
+responses are evicted.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Optional, Union
+
+from PIL import Image
+
+
+def image_digest(image: Union[str, Image.Image]) -> str:
+  """Returns the hex SHA-256 digest of an image file or in-memory image.
+
+  Images are hashed by their mode, size and pixels, so an image saved to a
+  file and the same image in memory have the same digest, and hashing an
+  in-memory image takes a small fraction of the time to encode it.
+  """
+  if isinstance(image, str):
+    with Image.open(image) as image_file:
+      return image_digest(image_file)
+  header = f'{image.mode}:{image.size[0]}x{image.size[1]}:'.encode('utf-8')
+  return hashlib.sha256(header + image.tobytes()).hexdigest()
+
+
+def annotation_key(image_digest: str, question: str, vlm_name: str) -> str:
+  """Returns the cache key of a VLM response.
+
+  Args:
+    image_digest: Hash of the image, see `image_digest`.
+    question: Question asked about the image.
+    vlm_name: Name of the VLM, including its version if it matters.
+  """
+  key = hashlib.sha256()
+  for part in (image_digest, question, vlm_name):
+    key.update(hashlib.sha256(part.encode('utf-8')).digest())
+  return key.hexdigest()
+
+
+class AnnotationCache:
+  """SQLite-backed cache of VLM responses with size-based LRU eviction.
+
+  The cache is safe to share between the threads of a tagging run, and
+  between processes: the total size is read from the database when evicting.
+  """
+
+  def __init__(self, path: str, max_bytes: Optional[int] = None):
+    """Opens or creates the cache.
+
+    Args:
+      path: Path to the SQLite database file.
+      max_bytes: Maximum total size of the cached responses in bytes. Least
+        recently used responses are evicted beyond it. Unlimited if None.
+    """
+    self._max_bytes = max_bytes
+    self._lock = threading.Lock()
+    self._connection = sqlite3.connect(path, check_same_thread=False)
+    with self._connection:
+      self._connection.execute('PRAGMA journal_mode=WAL')
+      self._connection.execute(
+          'CREATE TABLE IF NOT EXISTS annotations ('
+          ' key TEXT PRIMARY KEY,'
+          ' response TEXT NOT NULL,'
+          ' num_bytes INTEGER NOT NULL,'
+          ' last_access REAL NOT NULL)'
+      )
+      self._connection.execute(
+          'CREATE INDEX IF NOT EXISTS annotations_by_last_access'
+          ' ON annotations (last_access)'
+      )
+    self.hits = 0
+    self.misses = 0
+
+  @property
+  def total_bytes(self) -> int:
+    """Total size of the cached responses in bytes."""
+    with self._lock:
+      return self._total_bytes_in_db()
+
+  def _total_bytes_in_db(self) -> int:
+    return self._connection.execute(
+        'SELECT COALESCE(SUM(num_bytes), 0) FROM annotations'
+    ).fetchone()[0]
+
+  def __len__(self) -> int:
+    with self._lock:
+      return self._connection.execute(
+          'SELECT COUNT(*) FROM annotations'
+      ).fetchone()[0]
+
+  def get(self, key: str) -> Optional[str]:
+    """Returns the cached response for `key`, or None on a miss."""
+    with self._lock, self._connection:
+      row = self._connection.execute(
+          'SELECT response FROM annotations WHERE key = ?', (key,)
+      ).fetchone()
+      if row is None:
+        self.misses += 1
+        return None
+      self.hits += 1
+      self._connection.execute(
+          'UPDATE annotations SET last_access = ? WHERE key = ?',
+          (time.time(), key),
+      )
+      return row[0]
+
+  def put(self, key: str, response: str) -> None:
+    """Stores `response` under `key` and evicts responses beyond the limit."""
+    num_bytes = len(response.encode('utf-8'))
+    with self._lock, self._connection:
+      # The write starts the transaction and locks out other writers, so the
+      # eviction below sees the responses stored by every process.
+      self._connection.execute(
+          'INSERT OR REPLACE INTO annotations VALUES (?, ?, ?, ?)',
+          (key, response, num_bytes, time.time()),
+      )
+      self._evict()
+
+  def _evict(self) -> None:
+    """Deletes least recently used responses until the cache fits."""
+    if self._max_bytes is None:
+      return
+    total_bytes = self._total_bytes_in_db()
+    if total_bytes <= self._max_bytes:
+      return
+    rows = self._connection.execute(
+        'SELECT key, num_bytes FROM annotations ORDER BY last_access, rowid'
+    )
+    evicted_keys = []
+    for key, num_bytes in rows:
+      if total_bytes <= self._max_bytes:
+        break
+      evicted_keys.append((key,))
+      total_bytes -= num_bytes
+    self._connection.executemany(
+        'DELETE FROM annotations WHERE key = ?', evicted_keys
+    )
+
+  def close(self) -> None:
+    with self._lock:
+      self._connection.close()
+
+  def __enter__(self) -> 'AnnotationCache':
+    return self
+
+  def __exit__(self, *unused_exc_info) -> None:
+    self.close()
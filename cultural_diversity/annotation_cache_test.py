@@ -0,0 +1,170 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from absl import app
+from PIL import Image
+
+from cube_t2i.cultural_diversity import annotation_cache
+from cube_t2i.cultural_diversity import geo_tagging
+from cube_t2i.cultural_diversity import mock_vlm_server
+from cube_t2i.cultural_diversity import vlm_clients
+
+
+class AnnotationCacheTest(unittest.TestCase):
+  """Test class for annotation_cache.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.tmp_dir = tmp_dir.name
+    self.cache_path = os.path.join(self.tmp_dir, "annotations.sqlite")
+
+  def test_annotation_key_depends_on_every_part(self):
+    key = annotation_cache.annotation_key("digest", "question", "gpt-4")
+    self.assertEqual(
+        key, annotation_cache.annotation_key("digest", "question", "gpt-4")
+    )
+    self.assertNotEqual(
+        key, annotation_cache.annotation_key("digest2", "question", "gpt-4")
+    )
+    self.assertNotEqual(
+        key, annotation_cache.annotation_key("digest", "question2", "gpt-4")
+    )
+    self.assertNotEqual(
+        key, annotation_cache.annotation_key("digest", "question", "gemini")
+    )
+
+  def test_image_digest_of_file_matches_in_memory_image(self):
+    image = Image.new("RGB", (8, 8), color=(1, 2, 3))
+    image_path = os.path.join(self.tmp_dir, "0.png")
+    image.save(image_path)
+
+    self.assertEqual(
+        annotation_cache.image_digest(image_path),
+        annotation_cache.image_digest(image),
+    )
+    self.assertNotEqual(
+        annotation_cache.image_digest(image),
+        annotation_cache.image_digest(image.convert("RGBA")),
+    )
+
+  def test_put_and_get_persist(self):
+    with annotation_cache.AnnotationCache(self.cache_path) as cache:
+      self.assertIsNone(cache.get("a"))
+      cache.put("a", "Asia, India, sari")
+      self.assertEqual(cache.get("a"), "Asia, India, sari")
+      self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    with annotation_cache.AnnotationCache(self.cache_path) as cache:
+      self.assertEqual(cache.get("a"), "Asia, India, sari")
+      self.assertEqual(cache.total_bytes, len("Asia, India, sari"))
+
+  def test_evicts_least_recently_used(self):
+    with annotation_cache.AnnotationCache(
+        self.cache_path, max_bytes=20
+    ) as cache:
+      cache.put("a", "x" * 8)
+      cache.put("b", "y" * 8)
+      cache.get("a")  # Makes "b" the least recently used response.
+      cache.put("c", "z" * 8)
+
+      self.assertEqual(len(cache), 2)
+      self.assertIsNone(cache.get("b"))
+      self.assertEqual(cache.get("a"), "x" * 8)
+      self.assertEqual(cache.get("c"), "z" * 8)
+      self.assertEqual(cache.total_bytes, 16)
+
+  def test_evicts_responses_stored_by_other_processes(self):
+    with annotation_cache.AnnotationCache(
+        self.cache_path, max_bytes=20
+    ) as cache, annotation_cache.AnnotationCache(
+        self.cache_path, max_bytes=20
+    ) as other_cache:
+      cache.put("a", "x" * 8)
+      other_cache.put("b", "y" * 8)
+      cache.put("c", "z" * 8)
+
+      self.assertEqual(len(other_cache), 2)
+      self.assertEqual(other_cache.total_bytes, 16)
+      self.assertIsNone(cache.get("a"))
+
+  def test_tag_images_only_queries_new_images(self):
+    """Test that a re-run queries the VLM for new or moved images only."""
+    image_paths = []
+    for i in range(4):
+      image_path = os.path.join(self.tmp_dir, f"{i}.png")
+      Image.new("RGB", (8, 8), color=(i, 0, 0)).save(image_path)
+      image_paths.append(image_path)
+    question = geo_tagging.geo_tagging_question("Image of clothing", "sari")
+
+    with mock_vlm_server.MockVlmServer() as server:
+      vlm_fn = vlm_clients.gpt4_response_fn("test-key", url=server.url)
+      with annotation_cache.AnnotationCache(self.cache_path) as cache:
+        first = geo_tagging.tag_images(
+            image_paths[:3], question, vlm_fn, cache=cache, vlm_name="gpt-4"
+        )
+      self.assertEqual(len(server.requests), 3)
+
+      # A copy of a tagged image is keyed by its content, not its path.
+      moved_path = os.path.join(self.tmp_dir, "moved.png")
+      shutil.copy(image_paths[0], moved_path)
+      with annotation_cache.AnnotationCache(self.cache_path) as cache:
+        second = geo_tagging.tag_images(
+            image_paths + [moved_path],
+            question,
+            vlm_fn,
+            cache=cache,
+            vlm_name="gpt-4",
+        )
+        self.assertEqual((cache.hits, cache.misses), (4, 1))
+      self.assertEqual(len(server.requests), 4)
+
+    self.assertEqual(second[:3], first)
+    self.assertEqual(second[4]["image_name"], "moved.png")
+
+  def test_tag_images_does_not_cache_unparseable_responses(self):
+    """Test that a rerun queries the VLM again after a bad response."""
+    image_path = os.path.join(self.tmp_dir, "0.png")
+    Image.new("RGB", (8, 8)).save(image_path)
+    responses = ["I cannot tell.", "Asia, India, sari"]
+    vlm_fn = lambda *_: responses.pop(0)
+
+    with annotation_cache.AnnotationCache(self.cache_path) as cache:
+      failed = geo_tagging.tag_images(
+          [image_path], "question", vlm_fn, cache=cache, vlm_name="gpt-4"
+      )
+      self.assertEqual(len(cache), 0)
+      annotations = geo_tagging.tag_images(
+          [image_path], "question", vlm_fn, cache=cache, vlm_name="gpt-4"
+      )
+
+    self.assertIsNone(failed[0]["label"])
+    self.assertEqual(annotations[0]["label"]["country"], " India")
+    self.assertEqual(responses, [])
+
+  def test_tag_images_requires_vlm_name(self):
+    with annotation_cache.AnnotationCache(self.cache_path) as cache:
+      with self.assertRaises(ValueError):
+        geo_tagging.tag_images([], "question", lambda *_: "", cache=cache)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,244 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Bootstrap and permutation confidence intervals of diversity scores.
+
+`calculate_cultural_diversity` averages Vendi scores over fixed chunks of
+images in generation order, and scores only the first 24 of fewer than 32
+images, so its value depends on which images land in which chunk. To compare
+models, the score is recomputed on thousands of resamples of the images:
+
+  bootstrap: samples drawn with replacement, for the sampling variance of the
+    score.
+  permutation: random orders of the images (and, for fewer than 32 images,
+    random subsets of 24), for the variance due to chunking and truncation.
+
+The similarity matrix of all images is computed once. Resamples are drawn as
+index arrays, their kernels are gathered from it with fancy indexing, and the
+eigenvalues of all of their chunks are computed with batched `eigvalsh` calls.
+"""
+
+import dataclasses
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from cube_t2i.cultural_diversity import embedding_diversity
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+MODES = ('bootstrap', 'permutation')
+
+# Maximum number of kernel entries gathered at once, bounding memory to about
+# 128 MiB of float64.
+_MAX_BLOCK_ENTRIES = 2**24
+
+
+@dataclasses.dataclass(frozen=True)
+class ConfidenceInterval:
+  """Point estimate and resampling distribution of a diversity score."""
+
+  # Score of the images in their original order.
+  estimate: float
+  # Mean and standard deviation of the score over resamples.
+  mean: float
+  std: float
+  # Percentile interval of the score over resamples.
+  lower: float
+  upper: float
+
+
+def _num_scored(num_images: int) -> int:
+  return len(vendi_utils.truncate_to_scored(range(num_images)))
+
+
+def resample_indices(
+    num_images: int,
+    num_resamples: int,
+    mode: str = 'bootstrap',
+    sample_size: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+  """Draws resamples of images as index arrays.
+
+  Args:
+    num_images: Number of images to resample.
+    num_resamples: Number of resamples.
+    mode: 'bootstrap' to draw with replacement, 'permutation' to draw without.
+    sample_size: Number of images per resample. Defaults to the number of
+      images `calculate_cultural_diversity` scores.
+    rng: Random number generator.
+
+  Returns:
+    An int array of shape [num_resamples, sample_size].
+  """
+  if mode not in MODES:
+    raise ValueError(f'Unknown mode {mode!r}, expected one of {MODES}.')
+  rng = rng or np.random.default_rng()
+  sample_size = sample_size or _num_scored(num_images)
+  if mode == 'bootstrap':
+    return rng.integers(0, num_images, size=(num_resamples, sample_size))
+  if sample_size > num_images:
+    raise ValueError(
+        f'Cannot permute {sample_size} of {num_images} images without'
+        ' replacement.'
+    )
+  # Sorting random keys gives independent permutations of every row.
+  keys = rng.random((num_resamples, num_images))
+  return np.argsort(keys, axis=-1)[:, :sample_size]
+
+
+def resampled_scores(
+    kernel: np.ndarray,
+    indices: np.ndarray,
+    batch_size: Optional[int] = 8,
+    q: Union[float, str] = 1,
+) -> np.ndarray:
+  """Scores resamples of images from their full similarity matrix.
+
+  Args:
+    kernel: Similarity matrix of shape [n, n] of all images.
+    indices: Int array of shape [num_resamples, m] of resampled images.
+    batch_size: Number of images per chunk; the score of a resample is the mean
+      normalized Vendi score of its chunks, as in
+      `calculate_cultural_diversity`. If None, the score is the (unnormalized)
+      Vendi score of the whole resample.
+    q: Order of the Vendi score.
+
+  Returns:
+    An array of shape [num_resamples] with the score of every resample.
+  """
+  kernel = np.asarray(kernel, dtype=np.float64)
+  indices = np.asarray(indices)
+  num_resamples, sample_size = indices.shape
+  chunk_size = batch_size or sample_size
+  num_chunks = -(-sample_size // chunk_size)
+
+  # Pads every resample to whole chunks, masking the padding out.
+  padded = np.zeros((num_resamples, num_chunks * chunk_size), dtype=np.int64)
+  padded[:, :sample_size] = indices
+  mask = np.zeros(num_chunks * chunk_size, dtype=bool)
+  mask[:sample_size] = True
+  padded = padded.reshape(num_resamples, num_chunks, chunk_size)
+  mask = mask.reshape(num_chunks, chunk_size)
+  pair_mask = mask[:, :, None] & mask[:, None, :]
+  sizes = mask.sum(axis=-1)
+
+  block_size = max(1, _MAX_BLOCK_ENTRIES // (num_chunks * chunk_size**2))
+  scores = np.empty((num_resamples, num_chunks))
+  for start in range(0, num_resamples, block_size):
+    block = padded[start : start + block_size]
+    kernels = kernel[block[..., :, None], block[..., None, :]] * pair_mask
+    scores[start : start + block_size] = vendi_utils.vendi_scores_from_kernels(
+        kernels, np.broadcast_to(sizes, block.shape[:2]), q
+    )
+  if batch_size is None:
+    return scores[:, 0]
+  return (scores / batch_size).mean(axis=-1)
+
+
+def bootstrap_kernel_diversity(
+    kernel: np.ndarray,
+    num_resamples: int = 2000,
+    mode: str = 'bootstrap',
+    batch_size: Optional[int] = 8,
+    confidence: float = 0.95,
+    sample_size: Optional[int] = None,
+    q: Union[float, str] = 1,
+    seed: Optional[int] = 0,
+) -> ConfidenceInterval:
+  """Computes a confidence interval of the diversity of images.
+
+  Args:
+    kernel: Similarity matrix of shape [n, n] of the images, in their original
+      order.
+    num_resamples: Number of resamples.
+    mode: 'bootstrap' or 'permutation', see the module docstring.
+    batch_size: Number of images per chunk, or None to score whole resamples,
+      see `resampled_scores`.
+    confidence: Probability mass of the interval.
+    sample_size: Number of images per resample, see `resample_indices`.
+    q: Order of the Vendi score.
+    seed: Seed of the resampling.
+
+  Returns:
+    The score of the images in their original order, and the mean, standard
+    deviation and percentile interval of the scores of the resamples.
+
+  Raises:
+    ValueError: If there are no images.
+  """
+  num_images = len(kernel)
+  if not num_images:
+    raise ValueError('Cannot compute the diversity of no images.')
+  sample_size = sample_size or _num_scored(num_images)
+  estimate = resampled_scores(
+      kernel, np.arange(sample_size)[None], batch_size, q
+  )[0]
+  scores = resampled_scores(
+      kernel,
+      resample_indices(
+          num_images,
+          num_resamples,
+          mode,
+          sample_size,
+          np.random.default_rng(seed),
+      ),
+      batch_size,
+      q,
+  )
+  tail = (1 - confidence) / 2 * 100
+  lower, upper = np.percentile(scores, [tail, 100 - tail])
+  return ConfidenceInterval(
+      estimate=float(estimate),
+      mean=float(scores.mean()),
+      std=float(scores.std(ddof=1)) if len(scores) > 1 else 0.0,
+      lower=float(lower),
+      upper=float(upper),
+  )
+
+
+def bootstrap_cultural_diversity(
+    labels: Sequence[vendi_utils.Label],
+    weights: Sequence[float] = vendi_utils.DEFAULT_WEIGHTS,
+    is_global: bool = True,
+    **kwargs,
+) -> ConfidenceInterval:
+  """Computes a confidence interval of `calculate_cultural_diversity`.
+
+  Args:
+    labels: Labels of the generated images, in generation order.
+    weights: Weights of the (continent, country, artifact) equalities.
+    is_global: Whether the labels are for global prompts.
+    **kwargs: Arguments of `bootstrap_kernel_diversity`.
+  """
+  codes = vendi_utils.encode_labels(labels, is_global)
+  return bootstrap_kernel_diversity(
+      vendi_utils.label_similarity_matrices(codes, weights), **kwargs
+  )
+
+
+def bootstrap_embedding_diversity(
+    embeddings: np.ndarray, **kwargs
+) -> ConfidenceInterval:
+  """Computes a confidence interval of `calculate_embedding_diversity`.
+
+  Args:
+    embeddings: Array of shape [num_images, dim], in generation order.
+    **kwargs: Arguments of `bootstrap_kernel_diversity`.
+  """
+  return bootstrap_kernel_diversity(
+      embedding_diversity.embedding_similarity_matrices(embeddings), **kwargs
+  )
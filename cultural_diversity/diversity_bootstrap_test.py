@@ -0,0 +1,120 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import random
+import unittest
+
+from absl import app
+import numpy as np
+
+from cube_t2i.cultural_diversity import diversity_bootstrap
+from cube_t2i.cultural_diversity import embedding_diversity
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+def _random_labels(num_images, seed=0):
+  rng = random.Random(seed)
+  return [
+      {
+          "continent": rng.choice(["Asia", "Europe"]),
+          "country": rng.choice(["India", "Japan", "France"]),
+          "artifact": rng.choice(["sari", "kimono", "beret", "kurta"]),
+      }
+      for _ in range(num_images)
+  ]
+
+
+class DiversityBootstrapTest(unittest.TestCase):
+  """Test class for diversity_bootstrap.py."""
+
+  def test_resampled_scores_match_direct_scores(self):
+    labels = _random_labels(20)
+    weights = (0.5, 0.3, 0.2)
+    kernel = vendi_utils.label_similarity_matrices(
+        vendi_utils.encode_labels(labels), weights
+    )
+    indices = diversity_bootstrap.resample_indices(
+        20, 10, sample_size=12, rng=np.random.default_rng(1)
+    )
+
+    chunked = diversity_bootstrap.resampled_scores(kernel, indices)
+    whole = diversity_bootstrap.resampled_scores(
+        kernel, indices, batch_size=None
+    )
+
+    for row, chunked_score, whole_score in zip(indices, chunked, whole):
+      resample = [labels[i] for i in row]
+      self.assertAlmostEqual(
+          chunked_score,
+          vendi_utils.calculate_cultural_diversity(resample, weights),
+      )
+      self.assertAlmostEqual(
+          whole_score, vendi_utils.vendi_score_from_labels(resample, weights)
+      )
+
+  def test_estimate_matches_calculate_cultural_diversity(self):
+    for num_images in (16, 20, 40):
+      labels = _random_labels(num_images, seed=num_images)
+      interval = diversity_bootstrap.bootstrap_cultural_diversity(
+          labels, num_resamples=500
+      )
+
+      self.assertAlmostEqual(
+          interval.estimate,
+          vendi_utils.calculate_cultural_diversity(labels),
+      )
+      self.assertLessEqual(interval.lower, interval.mean)
+      self.assertLessEqual(interval.mean, interval.upper)
+      self.assertGreater(interval.std, 0)
+
+  def test_permutations_of_whole_samples_do_not_change_the_score(self):
+    embeddings = np.random.default_rng(0).normal(size=(40, 8))
+
+    interval = diversity_bootstrap.bootstrap_embedding_diversity(
+        embeddings, mode="permutation", batch_size=None, num_resamples=100
+    )
+
+    self.assertAlmostEqual(
+        interval.estimate,
+        embedding_diversity.embedding_vendi_score(embeddings),
+    )
+    self.assertAlmostEqual(interval.std, 0)
+
+  def test_permutations_draw_distinct_images(self):
+    indices = diversity_bootstrap.resample_indices(
+        20, 50, mode="permutation", rng=np.random.default_rng(0)
+    )
+
+    self.assertEqual(indices.shape, (50, 20))
+    for row in indices:
+      self.assertEqual(sorted(row), list(range(20)))
+    self.assertGreater(len({tuple(row) for row in indices}), 1)
+
+    with self.assertRaises(ValueError):
+      diversity_bootstrap.resample_indices(
+          20, 5, mode="permutation", sample_size=21
+      )
+    with self.assertRaises(ValueError):
+      diversity_bootstrap.resample_indices(20, 5, mode="jackknife")
+
+  def test_rejects_no_images(self):
+    with self.assertRaisesRegex(ValueError, "no images"):
+      diversity_bootstrap.bootstrap_cultural_diversity([])
+    with self.assertRaisesRegex(ValueError, "no images"):
+      diversity_bootstrap.bootstrap_embedding_diversity(np.zeros((0, 3)))
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
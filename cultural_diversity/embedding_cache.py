@@ -0,0 +1,209 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Persistent cache of image embeddings in a memory-mapped float16 array.
+
+A cache directory holds three files:
+
+  embeddings.f16: a [capacity, dim] float16 array, one row per image, mapped
+    into memory so that lookups only read the rows they need.
+  hashes.txt: the hash of the image of every filled row, one per line, in row
+    order. Rows are written before their hashes, so an interrupted write leaves
+    at most unreferenced rows.
+  metadata.json: the embedding dimension and the name of the encoder, so that
+    a cache is not read with embeddings of another model.
+
+The array doubles its capacity when it is full, so appending n embeddings one
+batch at a time costs O(n) amortized copies.
+
+Embeddings are stored unnormalized. Values beyond the float16 range (about
++-65504) are rejected rather than stored as infinities, so embeddings of an
+encoder with larger outputs must be normalized before they are cached.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+_EMBEDDINGS_FILE = 'embeddings.f16'
+_HASHES_FILE = 'hashes.txt'
+_METADATA_FILE = 'metadata.json'
+
+
+class EmbeddingCache:
+  """Memory-mapped float16 embeddings indexed by image hash.
+
+  A cache is safe to share between the threads of a process, but must only be
+  open in one process at a time: writers append to hashes.txt and the array
+  without coordinating with other processes, so concurrent writers would
+  corrupt the cache.
+  """
+
+  def __init__(
+      self,
+      directory: str,
+      dim: int,
+      encoder_name: str,
+      initial_capacity: int = 1024,
+  ):
+    """Opens or creates the cache.
+
+    Args:
+      directory: Directory of the cache files.
+      dim: Dimension of the embeddings.
+      encoder_name: Name of the encoder of the embeddings, including its
+        checkpoint if it matters, e.g. 'openai/clip-vit-large-patch14'.
+      initial_capacity: Number of rows to allocate in a new cache.
+
+    Raises:
+      ValueError: If the cache exists with another embedding dimension or
+        encoder.
+    """
+    os.makedirs(directory, exist_ok=True)
+    self._dim = dim
+    self._encoder_name = encoder_name
+    self._lock = threading.Lock()
+    self._embeddings_path = os.path.join(directory, _EMBEDDINGS_FILE)
+    self._hashes_path = os.path.join(directory, _HASHES_FILE)
+
+    metadata_path = os.path.join(directory, _METADATA_FILE)
+    if os.path.exists(metadata_path):
+      with open(metadata_path, 'r') as f:
+        metadata = json.load(f)
+      if metadata['dim'] != dim:
+        raise ValueError(
+            f'{directory} holds embeddings of dimension {metadata["dim"]}, not'
+            f' {dim}.'
+        )
+      if metadata.get('encoder') != encoder_name:
+        raise ValueError(
+            f'{directory} holds embeddings of encoder'
+            f' {metadata.get("encoder")!r}, not {encoder_name!r}.'
+        )
+    else:
+      with open(metadata_path, 'w') as f:
+        json.dump({'dim': dim, 'encoder': encoder_name}, f)
+
+    self._rows: Dict[str, int] = {}
+    if os.path.exists(self._hashes_path):
+      with open(self._hashes_path, 'r') as f:
+        for line in f:
+          digest = line.strip()
+          if digest:
+            self._rows[digest] = len(self._rows)
+
+    if not os.path.exists(self._embeddings_path):
+      self._resize_file(max(initial_capacity, 1))
+    self._map()
+    self._hashes_file = open(self._hashes_path, 'a')
+
+  @property
+  def dim(self) -> int:
+    return self._dim
+
+  @property
+  def encoder_name(self) -> str:
+    return self._encoder_name
+
+  def _resize_file(self, capacity: int) -> None:
+    with open(self._embeddings_path, 'ab') as f:
+      f.truncate(capacity * self._dim * np.dtype(np.float16).itemsize)
+
+  def _map(self) -> None:
+    num_bytes = os.path.getsize(self._embeddings_path)
+    capacity = num_bytes // (self._dim * np.dtype(np.float16).itemsize)
+    self._embeddings = np.memmap(
+        self._embeddings_path,
+        dtype=np.float16,
+        mode='r+',
+        shape=(capacity, self._dim),
+    )
+
+  def __len__(self) -> int:
+    return len(self._rows)
+
+  def __contains__(self, digest: str) -> bool:
+    return digest in self._rows
+
+  def get(self, digests: Sequence[str]) -> np.ndarray:
+    """Returns the float32 embeddings of images, one row per hash.
+
+    Raises:
+      KeyError: If an image is not cached.
+    """
+    with self._lock:
+      rows = [self._rows[digest] for digest in digests]
+      return np.asarray(self._embeddings[rows], dtype=np.float32)
+
+  def put(self, digests: Sequence[str], embeddings: np.ndarray) -> None:
+    """Stores the embeddings of images not cached yet.
+
+    Args:
+      digests: Hashes of the images.
+      embeddings: Array of shape [len(digests), dim].
+
+    Raises:
+      ValueError: If the embeddings have another shape, or values that are not
+        finite in float16.
+    """
+    embeddings = np.asarray(embeddings)
+    if embeddings.shape != (len(digests), self._dim):
+      raise ValueError(
+          f'Expected embeddings of shape {(len(digests), self._dim)}, got'
+          f' {embeddings.shape}.'
+      )
+    with np.errstate(over='ignore'):
+      embeddings = embeddings.astype(np.float16)
+    if not np.isfinite(embeddings).all():
+      raise ValueError(
+          'Embeddings must be finite and within the float16 range, normalize'
+          ' them before caching.'
+      )
+    with self._lock:
+      new = {}
+      for digest, embedding in zip(digests, embeddings):
+        if digest not in self._rows and digest not in new:
+          new[digest] = embedding
+      if not new:
+        return
+
+      start = len(self._rows)
+      end = start + len(new)
+      if end > len(self._embeddings):
+        self._embeddings.flush()
+        del self._embeddings
+        self._resize_file(max(end, 2 * start))
+        self._map()
+      self._embeddings[start:end] = np.stack(list(new.values()))
+      self._embeddings.flush()
+      for digest in new:
+        self._hashes_file.write(digest + '\n')
+        self._rows[digest] = len(self._rows)
+      self._hashes_file.flush()
+
+  def close(self) -> None:
+    with self._lock:
+      self._embeddings.flush()
+      self._hashes_file.close()
+
+  def __enter__(self) -> 'EmbeddingCache':
+    return self
+
+  def __exit__(self, *unused_exc_info) -> None:
+    self.close()
@@ -0,0 +1,95 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import os
+import tempfile
+import unittest
+
+from absl import app
+import numpy as np
+
+from cube_t2i.cultural_diversity import embedding_cache
+
+
+class EmbeddingCacheTest(unittest.TestCase):
+  """Test class for embedding_cache.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.cache_dir = tmp_dir.name
+    self.embeddings = np.random.default_rng(0).normal(size=(10, 4))
+
+  def test_put_and_get_grow_and_persist(self):
+    digests = [f"hash{i}" for i in range(10)]
+    with embedding_cache.EmbeddingCache(
+        self.cache_dir, dim=4, encoder_name="clip", initial_capacity=3
+    ) as cache:
+      cache.put(digests[:6], self.embeddings[:6])
+      cache.put(digests[4:], self.embeddings[4:])
+
+      self.assertEqual(len(cache), 10)
+      self.assertIn("hash9", cache)
+      np.testing.assert_allclose(
+          cache.get(digests[::-1]), self.embeddings[::-1], rtol=1e-3
+      )
+
+    with embedding_cache.EmbeddingCache(self.cache_dir, 4, "clip") as cache:
+      self.assertEqual(len(cache), 10)
+      embeddings = cache.get(["hash2", "hash7"])
+    self.assertEqual(embeddings.dtype, np.float32)
+    np.testing.assert_allclose(embeddings, self.embeddings[[2, 7]], rtol=1e-3)
+    # Rows are stored as float16.
+    self.assertEqual(
+        os.path.getsize(os.path.join(self.cache_dir, "embeddings.f16")) % 8, 0
+    )
+
+  def test_existing_embeddings_are_kept(self):
+    with embedding_cache.EmbeddingCache(self.cache_dir, 4, "clip") as cache:
+      cache.put(["a"], self.embeddings[:1])
+      cache.put(["a", "a"], self.embeddings[1:3])
+
+      self.assertEqual(len(cache), 1)
+      np.testing.assert_allclose(
+          cache.get(["a"]), self.embeddings[:1], rtol=1e-3
+      )
+      with self.assertRaises(KeyError):
+        cache.get(["b"])
+      with self.assertRaises(ValueError):
+        cache.put(["b"], self.embeddings[:1, :3])
+
+  def test_rejects_other_dimension(self):
+    embedding_cache.EmbeddingCache(self.cache_dir, 4, "clip").close()
+    with self.assertRaises(ValueError):
+      embedding_cache.EmbeddingCache(self.cache_dir, 8, "clip")
+
+  def test_rejects_other_encoder(self):
+    with embedding_cache.EmbeddingCache(self.cache_dir, 4, "clip") as cache:
+      self.assertEqual(cache.encoder_name, "clip")
+    with self.assertRaisesRegex(ValueError, "encoder 'clip'"):
+      embedding_cache.EmbeddingCache(self.cache_dir, 4, "dinov2")
+
+  def test_rejects_embeddings_beyond_float16_range(self):
+    with embedding_cache.EmbeddingCache(self.cache_dir, 4, "clip") as cache:
+      with self.assertRaisesRegex(ValueError, "float16"):
+        cache.put(["a"], np.full((1, 4), 1e5))
+      with self.assertRaisesRegex(ValueError, "float16"):
+        cache.put(["a"], np.full((1, 4), np.nan))
+      self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,282 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Vendi scores with a cosine-similarity kernel over image embeddings.
+
+An alternative to the label-equality kernel of vendi_utils.py that does not
+depend on VLM tags. Images are embedded by a pluggable encoder, any function
+from a batch of PIL images to an array of embeddings, e.g.
+`clip_image_encoder()`. Embeddings are cached by image hash in an
+`EmbeddingCache`, so repeated scoring sweeps over the same images never encode
+them again.
+
+The kernel of a set of images is the Gram matrix of their L2-normalized
+embeddings, computed with a single (batched) matrix product.
+"""
+
+from typing import Callable, Optional, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+from cube_t2i.cultural_diversity import annotation_cache
+from cube_t2i.cultural_diversity import embedding_cache
+from cube_t2i.cultural_diversity import instrumentation
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+ImageInput = Union[str, Image.Image]
+ImageEncoder = Callable[[Sequence[Image.Image]], np.ndarray]
+
+
+def clip_image_encoder(
+    model_name: str = 'openai/clip-vit-base-patch32', device: str = 'cpu'
+) -> ImageEncoder:
+  """Returns an encoder computing CLIP image embeddings.
+
+  Args:
+    model_name: Hugging Face name or local path of a CLIP model.
+    device: Device to run the model on.
+  """
+  # pylint: disable=g-import-not-at-top
+  import torch
+  import transformers
+  # pylint: enable=g-import-not-at-top
+
+  model = transformers.CLIPModel.from_pretrained(model_name).to(device).eval()
+  processor = transformers.CLIPImageProcessor.from_pretrained(model_name)
+
+  def encode(images: Sequence[Image.Image]) -> np.ndarray:
+    inputs = processor(images=list(images), return_tensors='pt').to(device)
+    with torch.no_grad():
+      features = model.get_image_features(**inputs)
+    return features.float().cpu().numpy()
+
+  return encode
+
+
+def _load(image: ImageInput) -> Image.Image:
+  if isinstance(image, str):
+    return Image.open(image).convert('RGB')
+  return image.convert('RGB')
+
+
+def embed_images(
+    images: Sequence[ImageInput],
+    encoder: ImageEncoder,
+    cache: Optional[embedding_cache.EmbeddingCache] = None,
+    batch_size: int = 32,
+) -> np.ndarray:
+  """Embeds images in batches, only encoding images missing from the cache.
+
+  Args:
+    images: Paths to image files or in-memory images.
+    encoder: Function from a batch of images to their embeddings.
+    cache: Cache to read embeddings from and to store new embeddings in.
+    batch_size: Number of images per encoder call.
+
+  Returns:
+    A float32 array of shape [len(images), dim], of shape [0, 0] if there are
+    no images and no cache to tell the dimension.
+  """
+  if cache is None:
+    if not images:
+      return np.zeros((0, 0), dtype=np.float32)
+    batches = [
+        _encode_batch(encoder, images[i : i + batch_size])
+        for i in range(0, len(images), batch_size)
+    ]
+    return np.concatenate(batches).astype(np.float32)
+
+  digests = [annotation_cache.image_digest(image) for image in images]
+  missing = {}
+  for digest, image in zip(digests, images):
+    if digest not in cache:
+      missing.setdefault(digest, image)
+  instrumentation.count('embedding_cache/hits', len(digests) - len(missing))
+  instrumentation.count('embedding_cache/misses', len(missing))
+  missing_digests = list(missing)
+  for i in range(0, len(missing_digests), batch_size):
+    batch_digests = missing_digests[i : i + batch_size]
+    cache.put(
+        batch_digests,
+        _encode_batch(encoder, [missing[digest] for digest in batch_digests]),
+    )
+  return cache.get(digests)
+
+
+def _encode_batch(
+    encoder: ImageEncoder, images: Sequence[ImageInput]
+) -> np.ndarray:
+  with instrumentation.span('scoring/encode_images', images=len(images)):
+    return encoder([_load(image) for image in images])
+
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+  """L2-normalizes embeddings over the last axis, leaving zero rows zero."""
+  embeddings = np.asarray(embeddings, dtype=np.float64)
+  norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+  return embeddings / np.where(norms > 0, norms, 1.0)
+
+
+def embedding_similarity_matrices(embeddings: np.ndarray) -> np.ndarray:
+  """Returns the cosine similarity matrices of embeddings.
+
+  Args:
+    embeddings: Array of shape [..., n, dim]. Zero rows, e.g. padding, have
+      zero similarity to every image.
+
+  Returns:
+    An array of shape [..., n, n].
+  """
+  normalized = normalize_embeddings(embeddings)
+  return normalized @ np.swapaxes(normalized, -1, -2)
+
+
+def embedding_vendi_score(
+    embeddings: np.ndarray, q: Union[float, str] = 1
+) -> float:
+  """Computes the Vendi score of all images at once.
+
+  The non-zero eigenvalues of X X^T / n and X^T X / n are equal, so the
+  eigendecomposition is of the smaller of the two matrices, which makes
+  scoring n images O(n d^2) when n > d.
+
+  Args:
+    embeddings: Array of shape [n, dim].
+    q: Order of the Vendi score.
+
+  Returns:
+    The Vendi score, equal to `vendi_score.vendi.score_X` of the embeddings.
+  """
+  normalized = normalize_embeddings(embeddings)
+  n, dim = normalized.shape
+  if n <= dim:
+    kernel = normalized @ normalized.T
+  else:
+    kernel = normalized.T @ normalized
+  return float(np.exp(vendi_utils.entropy_q(np.linalg.eigvalsh(kernel / n), q)))
+
+
+def calculate_embedding_diversity_batch(
+    embedding_lists: Sequence[np.ndarray],
+    batch_size: int = 8,
+    q: Union[float, str] = 1,
+    quality_lists: Optional[Sequence[Sequence[float]]] = None,
+) -> np.ndarray:
+  """Calculates the embedding diversity of many prompts at once.
+
+  Images are chunked and the scores normalized as in
+  `vendi_utils.calculate_cultural_diversity_batch`, with the cosine similarity
+  of embeddings as kernel. The kernels of all chunks are computed with one
+  batched matrix product and their eigenvalues with one batched call.
+
+  Args:
+    embedding_lists: For each prompt, an array of shape [num_images, dim] with
+      the embeddings of its images.
+    batch_size: Number of images per chunk.
+    q: Order of the Vendi score.
+    quality_lists: For each prompt, the quality scores of its images. If
+      given, chunks are scored with the quality-weighted Vendi score.
+
+  Returns:
+    An array with the mean normalized Vendi score of each prompt, NaN for
+    prompts without images.
+  """
+  embedding_lists = [vendi_utils.truncate_to_scored(e) for e in embedding_lists]
+  num_prompts = len(embedding_lists)
+  lengths = [len(embeddings) for embeddings in embedding_lists]
+  if quality_lists is not None:
+    chunk_qualities = vendi_utils.chunk_mean_qualities(
+        [
+            vendi_utils.truncate_to_scored(qualities)
+            for qualities in quality_lists
+        ],
+        lengths,
+        batch_size,
+    )
+  if not any(lengths):
+    return np.full(num_prompts, np.nan)
+
+  embeddings = np.concatenate(
+      [np.asarray(e, dtype=np.float64) for e in embedding_lists if len(e)]
+  )
+  chunks, mask, prompt_ids = vendi_utils.chunk_label_codes(
+      embeddings, lengths, batch_size
+  )
+  normalized_scores = (
+      vendi_utils.vendi_scores_from_kernels(
+          embedding_similarity_matrices(chunks), mask.sum(axis=-1), q
+      )
+      / batch_size
+  )
+  if quality_lists is not None:
+    normalized_scores *= chunk_qualities
+  totals = np.bincount(prompt_ids, normalized_scores, minlength=num_prompts)
+  counts = np.bincount(prompt_ids, minlength=num_prompts)
+  with np.errstate(invalid='ignore', divide='ignore'):
+    return totals / counts
+
+
+def calculate_embedding_diversity(
+    embeddings: np.ndarray,
+    batch_size: int = 8,
+    q: Union[float, str] = 1,
+    qualities: Optional[Sequence[float]] = None,
+) -> float:
+  """Calculates normalized Vendi scores from embeddings over chunks of images.
+
+  The embedding counterpart of `vendi_utils.calculate_cultural_diversity`.
+
+  Args:
+    embeddings: Array of shape [num_images, dim] with the image embeddings.
+    batch_size: Number of images per chunk. Scores are normalized by it.
+    q: Order of the Vendi score.
+    qualities: Quality score of every image. If given, chunks are scored with
+      the quality-weighted Vendi score.
+
+  Returns:
+    The mean of the normalized Vendi scores over chunks.
+  """
+  return float(
+      calculate_embedding_diversity_batch(
+          [embeddings],
+          batch_size,
+          q,
+          None if qualities is None else [qualities],
+      )[0]
+  )
+
+
+def calculate_image_diversity(
+    images: Sequence[ImageInput],
+    encoder: ImageEncoder,
+    cache: Optional[embedding_cache.EmbeddingCache] = None,
+    batch_size: int = 8,
+    encoder_batch_size: int = 32,
+    q: Union[float, str] = 1,
+) -> float:
+  """Embeds images and calculates their embedding diversity.
+
+  Args:
+    images: Paths to image files or in-memory images, in seed order.
+    encoder: Function from a batch of images to their embeddings.
+    cache: Cache of embeddings, see `embed_images`.
+    batch_size: Number of images per Vendi chunk.
+    encoder_batch_size: Number of images per encoder call.
+    q: Order of the Vendi score.
+  """
+  embeddings = embed_images(images, encoder, cache, encoder_batch_size)
+  return calculate_embedding_diversity(embeddings, batch_size, q)
@@ -0,0 +1,127 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import os
+import tempfile
+import unittest
+
+from absl import app
+import numpy as np
+from PIL import Image
+from vendi_score import vendi
+
+from cube_t2i.cultural_diversity import embedding_cache
+from cube_t2i.cultural_diversity import embedding_diversity
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+class _MeanColorEncoder:
+  """Embeds images by their mean color, counting the encoded images."""
+
+  def __init__(self):
+    self.batch_sizes = []
+
+  def __call__(self, images):
+    self.batch_sizes.append(len(images))
+    return np.stack([
+        np.asarray(image, dtype=np.float32).mean(axis=(0, 1))
+        for image in images
+    ])
+
+
+class EmbeddingDiversityTest(unittest.TestCase):
+  """Test class for embedding_diversity.py."""
+
+  def setUp(self):
+    super().setUp()
+    self.rng = np.random.default_rng(0)
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.tmp_dir = tmp_dir.name
+
+  def test_embedding_vendi_score_matches_vendi_score(self):
+    for n in (5, 40):
+      embeddings = self.rng.normal(size=(n, 16))
+      self.assertAlmostEqual(
+          embedding_diversity.embedding_vendi_score(embeddings),
+          vendi.score_X(embeddings),
+          places=6,
+      )
+
+  def test_chunked_diversity_matches_per_chunk_scores(self):
+    embedding_lists = [self.rng.normal(size=(n, 8)) for n in (16, 20, 40, 0)]
+
+    scores = embedding_diversity.calculate_embedding_diversity_batch(
+        embedding_lists
+    )
+
+    for embeddings, score in zip(embedding_lists[:3], scores):
+      scored = embeddings[:24] if len(embeddings) < 32 else embeddings
+      expected = np.mean([
+          vendi.score_X(scored[i : i + 8]) / 8
+          for i in range(0, len(scored), 8)
+      ])
+      self.assertAlmostEqual(score, expected, places=6)
+    self.assertTrue(np.isnan(scores[3]))
+
+  def test_one_hot_embeddings_match_label_kernel(self):
+    """Test that one-hot embeddings give the label-equality kernel."""
+    countries = self.rng.integers(0, 3, size=20)
+    labels = [
+        {"continent": "", "country": str(c), "artifact": ""} for c in countries
+    ]
+
+    self.assertAlmostEqual(
+        embedding_diversity.calculate_embedding_diversity(np.eye(3)[countries]),
+        vendi_utils.calculate_cultural_diversity(
+            labels, weights=(0.0, 1.0, 0.0)
+        ),
+    )
+
+  def test_embed_images_only_encodes_new_images(self):
+    image_paths = []
+    for i in range(5):
+      image_path = os.path.join(self.tmp_dir, f"{i}.png")
+      Image.new("RGB", (4, 4), color=(10 * i, 0, 255)).save(image_path)
+      image_paths.append(image_path)
+    encoder = _MeanColorEncoder()
+    cache_dir = os.path.join(self.tmp_dir, "cache")
+
+    with embedding_cache.EmbeddingCache(cache_dir, 3, "mean_color") as cache:
+      first = embedding_diversity.embed_images(
+          image_paths[:3] + image_paths[:1], encoder, cache, batch_size=2
+      )
+    self.assertEqual(encoder.batch_sizes, [2, 1])
+
+    in_memory = Image.new("RGB", (4, 4), color=(0, 128, 0))
+    with embedding_cache.EmbeddingCache(cache_dir, 3, "mean_color") as cache:
+      second = embedding_diversity.embed_images(
+          image_paths + [in_memory, in_memory], encoder, cache, batch_size=2
+      )
+    self.assertEqual(encoder.batch_sizes, [2, 1, 2, 1])
+
+    images = [Image.open(image_path) for image_path in image_paths]
+    np.testing.assert_allclose(first, second[[0, 1, 2, 0]])
+    np.testing.assert_allclose(
+        second, encoder(images + [in_memory] * 2), rtol=1e-3
+    )
+    np.testing.assert_allclose(
+        embedding_diversity.embed_images(image_paths, encoder), second[:5]
+    )
+    self.assertEqual(embedding_diversity.embed_images([], encoder).size, 0)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,464 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Evaluates the cultural diversity of a model over the CUBE-1K prompts.
+
+Prompts are sharded by index (prompt i belongs to shard i % num_shards), so
+shards can run as separate processes or on separate hosts. Every shard appends
+its results to its own JSON Lines files in --output_dir as soon as they are
+available:
+
+  annotations-<shard>-of-<num_shards>.jsonl: one line per generated image, with
+    its prompt index, prompt, model, seed and geo-tagging label.
+  scores-<shard>-of-<num_shards>.jsonl: one line per prompt, with its
+    cultural diversity, once all of its images are tagged.
+
+A rerun of a shard skips the (prompt, seed, model) entries already annotated,
+so an interrupted run resumes where it stopped. With --annotation_cache, VLM
+responses are also cached by image content, question and VLM, e.g. across
+output directories or shardings, see annotation_cache.py.
+
+With --metrics_path, the time spent in every stage (SDXL base and refiner,
+image saving, VLM requests, backoffs, response parsing, Vendi scoring) and
+counters of requests, retries, bytes and cache hits are written as JSON, see
+instrumentation.py. With --trace_path, the stages are also written as a Chrome
+trace.
+
+Example usage:
+
+  python3 evaluate_cube_1k.py --output_dir=outs/cube_1k_sdxl --model_name=sdxl \
+      --vlm=gpt4 --num_shards=8 --shard_index=0
+"""
+
+import contextlib
+import functools
+import glob
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Set, TextIO, Tuple
+
+from absl import app
+from absl import flags
+
+from cube_t2i.cultural_diversity import annotation_cache
+from cube_t2i.cultural_diversity import geo_tagging
+from cube_t2i.cultural_diversity import image_generation
+from cube_t2i.cultural_diversity import instrumentation
+from cube_t2i.cultural_diversity import streaming_evaluation
+from cube_t2i.cultural_diversity import vendi_utils
+from cube_t2i.cultural_diversity import vlm_clients
+
+
+_DATASET_PATH = flags.DEFINE_string(
+    name='dataset_path',
+    default='dataset/cube_1k.json',
+    help=(
+        'Path to the CUBE-1K prompts, or glob pattern of JSON Lines prompt'
+        ' files, e.g. written by cube_extraction/build_prompts.py.'
+    ),
+)
+_OUTPUT_DIR = flags.DEFINE_string(
+    name='output_dir',
+    default=None,
+    help='Directory to write the results of the shard to.',
+    required=True,
+)
+_NUM_SHARDS = flags.DEFINE_integer(
+    name='num_shards', default=1, help='Number of shards of the prompts.'
+)
+_SHARD_INDEX = flags.DEFINE_integer(
+    name='shard_index', default=0, help='Index of the shard to evaluate.'
+)
+_MODEL_NAME = flags.DEFINE_string(
+    name='model_name', default='sdxl', help='Name of the evaluated model.'
+)
+_BASE_PATH = flags.DEFINE_string(
+    name='base_path',
+    default=image_generation.SDXL_BASE_PATH,
+    help='SDXL base pipeline.',
+)
+_REFINER_PATH = flags.DEFINE_string(
+    name='refiner_path',
+    default=image_generation.SDXL_REFINER_PATH,
+    help='SDXL refiner pipeline, or empty to denoise with the base only.',
+)
+_DEVICE = flags.DEFINE_string(
+    name='device', default='cuda:0', help='Device to generate images on.'
+)
+_NUM_IMAGES = flags.DEFINE_integer(
+    name='num_images', default=16, help='Number of images per prompt.'
+)
+_GENERATION_BATCH_SIZE = flags.DEFINE_integer(
+    name='generation_batch_size',
+    default=4,
+    help='Number of images per pipeline call.',
+)
+_VLM = flags.DEFINE_enum(
+    name='vlm',
+    default='gemini',
+    enum_values=['gemini', 'gpt4'],
+    help='VLM to geo-tag the images with.',
+)
+_ANNOTATION_CACHE = flags.DEFINE_string(
+    name='annotation_cache',
+    default=None,
+    help='If set, path of the SQLite cache of VLM responses.',
+)
+_MAX_CONCURRENCY = flags.DEFINE_integer(
+    name='max_concurrency', default=8, help='Maximum VLM requests in flight.'
+)
+_REQUESTS_PER_SECOND = flags.DEFINE_float(
+    name='requests_per_second',
+    default=None,
+    help='Maximum sustained VLM request rate.',
+)
+_IS_GLOBAL = flags.DEFINE_bool(
+    name='is_global',
+    default=False,
+    help=(
+        'Whether to compare continents, countries and artifacts separately.'
+        ' CUBE-1K prompts name their culture, so by default only whole labels'
+        ' are compared.'
+    ),
+)
+_IMAGE_DIR = flags.DEFINE_string(
+    name='image_dir',
+    default=None,
+    help='If set, images are saved to <image_dir>/<model>/<prompt index>/.',
+)
+_METRICS_PATH = flags.DEFINE_string(
+    name='metrics_path',
+    default=None,
+    help='If set, a JSON summary of stage timings and counters is written.',
+)
+_TRACE_PATH = flags.DEFINE_string(
+    name='trace_path',
+    default=None,
+    help='If set, the timed stages are written in Chrome trace format.',
+)
+
+
+def shard_prompts(
+    dataset: Sequence[Dict[str, Any]], shard_index: int, num_shards: int
+) -> List[Tuple[int, Dict[str, Any]]]:
+  """Returns the `(prompt index, entry)` pairs of a shard.
+
+  Prompts are assigned round-robin, so every shard gets a similar mix of
+  domains and countries.
+
+  Args:
+    dataset: Entries of cube_1k.json.
+    shard_index: Index of the shard, in [0, num_shards).
+    num_shards: Number of shards.
+
+  Raises:
+    ValueError: If `shard_index` is out of range.
+  """
+  if not 0 <= shard_index < num_shards:
+    raise ValueError(f'Shard {shard_index} is not in [0, {num_shards}).')
+  return [
+      (index, entry)
+      for index, entry in enumerate(dataset)
+      if index % num_shards == shard_index
+  ]
+
+
+def concept_space_samples(
+    dataset: Sequence[Dict[str, Any]], domain: str, num_samples: int = 4
+) -> str:
+  """Returns example artifacts of a domain from different countries.
+
+  They play the role of `concept_space_samples` of the notebook in the
+  geo-tagging question.
+  """
+  samples = {}
+  for entry in dataset:
+    if entry['domain'] == domain and len(samples) < num_samples:
+      samples.setdefault(entry['country'], entry['name'])
+  return ', '.join(samples.values())
+
+
+def shard_paths(
+    output_dir: str, shard_index: int, num_shards: int
+) -> Tuple[str, str]:
+  """Returns the paths to the annotations and scores files of a shard."""
+  suffix = f'{shard_index:05d}-of-{num_shards:05d}.jsonl'
+  return (
+      os.path.join(output_dir, f'annotations-{suffix}'),
+      os.path.join(output_dir, f'scores-{suffix}'),
+  )
+
+
+def read_jsonl(path: str) -> List[Dict[str, Any]]:
+  """Reads a JSON Lines file, ignoring a line truncated by an interruption."""
+  if not os.path.exists(path):
+    return []
+  records = []
+  with open(path, 'r', encoding='utf-8') as f:
+    for line in f:
+      try:
+        records.append(json.loads(line))
+      except json.JSONDecodeError:
+        logging.warning('Skipping truncated line in %s: %r', path, line)
+  return records
+
+
+def load_dataset(path: str) -> List[Dict[str, Any]]:
+  """Reads prompts from a JSON list or from JSON Lines files.
+
+  Args:
+    path: Path of a JSON list, like dataset/cube_1k.json, or glob pattern of
+      '.jsonl' files, read in file name order.
+
+  Raises:
+    FileNotFoundError: If no file matches the pattern.
+  """
+  if not path.endswith('.jsonl'):
+    with open(path, 'r') as f:
+      return json.load(f)
+  paths = sorted(glob.glob(path))
+  if not paths:
+    raise FileNotFoundError(f'No prompt files match {path}.')
+  return [entry for prompts_path in paths for entry in read_jsonl(prompts_path)]
+
+
+def _open_for_append(path: str) -> TextIO:
+  """Opens a JSON Lines file for appending after its last complete line."""
+  if os.path.exists(path) and os.path.getsize(path):
+    with open(path, 'rb+') as f:
+      f.seek(-1, os.SEEK_END)
+      if f.read(1) != b'\n':
+        f.write(b'\n')  # Ends a line truncated by an interruption.
+  return open(path, 'a', encoding='utf-8')
+
+
+def _append_jsonl(f: TextIO, record: Dict[str, Any]) -> None:
+  f.write(json.dumps(record, ensure_ascii=False) + '\n')
+  f.flush()
+
+
+def _record_annotation(
+    annotations_file: TextIO,
+    prompt_record: Dict[str, Any],
+    seeds: Sequence[int],
+    prompt_labels: Dict[int, Dict[str, str]],
+    index: int,
+    annotation: Dict[str, Any],
+) -> None:
+  """Appends the annotation of the `index`-th image of `seeds` to the file."""
+  seed = seeds[index]
+  prompt_labels[seed] = annotation['label']
+  _append_jsonl(
+      annotations_file,
+      {**prompt_record, 'seed': seed, 'label': annotation['label']},
+  )
+
+
+def evaluate_shard(
+    dataset: Sequence[Dict[str, Any]],
+    shard_index: int,
+    num_shards: int,
+    output_dir: str,
+    generator: image_generation.SdxlGenerator,
+    vlm_fn: vlm_clients.VlmFn,
+    model_name: str,
+    num_images: int = 16,
+    is_global: bool = False,
+    max_concurrency: int = 8,
+    requests_per_second: Optional[float] = None,
+    image_dir: Optional[str] = None,
+    cache: Optional[annotation_cache.AnnotationCache] = None,
+    vlm_name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+  """Evaluates the prompts of a shard, resuming from earlier results.
+
+  Args:
+    dataset: Entries of cube_1k.json.
+    shard_index: Index of the shard, in [0, num_shards).
+    num_shards: Number of shards.
+    output_dir: Directory of the results files, see `shard_paths`.
+    generator: Generator of the images of the evaluated model.
+    vlm_fn: VLM client to geo-tag the images with.
+    model_name: Name of the evaluated model, part of the resume key.
+    num_images: Number of images per prompt, with seeds 0..num_images-1.
+    is_global: Whether continents, countries and artifacts are compared
+      separately.
+    max_concurrency: Maximum number of VLM requests in flight.
+    requests_per_second: Maximum sustained VLM request rate.
+    image_dir: If given, images are saved to
+      `<image_dir>/<model_name>/<prompt index>/<seed>.png`.
+    cache: Cache of VLM responses to read from and write to.
+    vlm_name: Name of the VLM, part of the cache key. Required with `cache`.
+
+  Returns:
+    The score records of all prompts of the shard, including earlier ones.
+  """
+  os.makedirs(output_dir, exist_ok=True)
+  annotations_path, scores_path = shard_paths(
+      output_dir, shard_index, num_shards
+  )
+  labels: Dict[Tuple[str, str], Dict[int, Dict[str, str]]] = {}
+  for record in read_jsonl(annotations_path):
+    labels.setdefault((record['prompt'], record['model']), {})[
+        record['seed']
+    ] = record['label']
+  scores = [
+      record
+      for record in read_jsonl(scores_path)
+      if record['model'] == model_name
+  ]
+  scored: Set[str] = {record['prompt'] for record in scores}
+  samples_by_domain = {}
+
+  with _open_for_append(annotations_path) as annotations_file, _open_for_append(
+      scores_path
+  ) as scores_file:
+    for prompt_index, entry in shard_prompts(dataset, shard_index, num_shards):
+      prompt = entry['prompt']
+      if prompt in scored:
+        continue
+      prompt_labels = labels.setdefault((prompt, model_name), {})
+      missing_seeds = [
+          seed for seed in range(num_images) if seed not in prompt_labels
+      ]
+      logging.info(
+          'Prompt %d: %d of %d images to evaluate.',
+          prompt_index,
+          len(missing_seeds),
+          num_images,
+      )
+
+      if missing_seeds:
+        domain = entry['domain']
+        if domain not in samples_by_domain:
+          samples_by_domain[domain] = concept_space_samples(dataset, domain)
+        question = geo_tagging.geo_tagging_question(
+            prompt, samples_by_domain[domain]
+        )
+
+        streaming_evaluation.evaluate_images(
+            generator.iter_images(prompt, missing_seeds),
+            len(missing_seeds),
+            question,
+            vlm_fn,
+            is_global=is_global,
+            max_concurrency=max_concurrency,
+            requests_per_second=requests_per_second,
+            output_dir=(
+                os.path.join(image_dir, model_name, str(prompt_index))
+                if image_dir
+                else None
+            ),
+            on_annotation=functools.partial(
+                _record_annotation,
+                annotations_file,
+                {
+                    'prompt_index': prompt_index,
+                    'prompt': prompt,
+                    'model': model_name,
+                },
+                missing_seeds,
+                prompt_labels,
+            ),
+            cache=cache,
+            vlm_name=vlm_name,
+        )
+
+      # Chunks follow seed order, whether or not the images of the prompt
+      # were evaluated in one run.
+      record = {
+          'prompt_index': prompt_index,
+          'prompt': prompt,
+          'model': model_name,
+          'num_images': num_images,
+          'diversity': vendi_utils.calculate_cultural_diversity(
+              [prompt_labels[seed] for seed in range(num_images)],
+              is_global=is_global,
+          ),
+      }
+      _append_jsonl(scores_file, record)
+      scores.append(record)
+  return scores
+
+
+# Model queried for every --vlm, also naming it in the annotation cache.
+_VLM_MODELS = {'gpt4': 'gpt-4-turbo', 'gemini': 'gemini-1.5-pro-latest'}
+
+
+def _vlm_fn(vlm: str) -> vlm_clients.VlmFn:
+  if vlm == 'gpt4':
+    return vlm_clients.gpt4_response_fn(
+        os.environ['OPENAI_API_KEY'], model=_VLM_MODELS[vlm]
+    )
+  import google.generativeai as genai  # pylint: disable=g-import-not-at-top
+
+  genai.configure(api_key=os.environ['GEMINI_API_KEY'])
+  return vlm_clients.gemini_response_fn(
+      genai.GenerativeModel(model_name=_VLM_MODELS[vlm])
+  )
+
+
+def _evaluate(
+    dataset: Sequence[Dict[str, Any]],
+    cache: Optional[annotation_cache.AnnotationCache] = None,
+) -> List[Dict[str, Any]]:
+  """Evaluates the shard of the flags with the model and VLM of the flags."""
+  with instrumentation.span('generation/load_pipelines'):
+    base, refiner = image_generation.load_sdxl_pipelines(
+        _BASE_PATH.value, _REFINER_PATH.value or None, device=_DEVICE.value
+    )
+  return evaluate_shard(
+      dataset,
+      _SHARD_INDEX.value,
+      _NUM_SHARDS.value,
+      _OUTPUT_DIR.value,
+      image_generation.SdxlGenerator(
+          base, refiner, batch_size=_GENERATION_BATCH_SIZE.value
+      ),
+      _vlm_fn(_VLM.value),
+      _MODEL_NAME.value,
+      num_images=_NUM_IMAGES.value,
+      is_global=_IS_GLOBAL.value,
+      max_concurrency=_MAX_CONCURRENCY.value,
+      requests_per_second=_REQUESTS_PER_SECOND.value,
+      image_dir=_IMAGE_DIR.value,
+      cache=cache,
+      vlm_name=_VLM_MODELS[_VLM.value],
+  )
+
+
+def main(_):
+  dataset = load_dataset(_DATASET_PATH.value)
+  recorder = instrumentation.Recorder()
+  with contextlib.ExitStack() as stack:
+    cache = None
+    if _ANNOTATION_CACHE.value:
+      cache = stack.enter_context(
+          annotation_cache.AnnotationCache(_ANNOTATION_CACHE.value)
+      )
+    stack.enter_context(instrumentation.recording(recorder))
+    scores = _evaluate(dataset, cache)
+  if _METRICS_PATH.value:
+    recorder.write_summary(_METRICS_PATH.value)
+  if _TRACE_PATH.value:
+    recorder.write_chrome_trace(_TRACE_PATH.value)
+  logging.info(
+      'Evaluated %d prompts of shard %d.', len(scores), _SHARD_INDEX.value
+  )
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,210 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import json
+import os
+import tempfile
+import unittest
+
+from absl import app
+from PIL import Image
+
+from cube_t2i.cultural_diversity import annotation_cache
+from cube_t2i.cultural_diversity import evaluate_cube_1k
+
+_ARTIFACTS = (
+    ("South America", "Brazil", "feijoada"),
+    ("Asia", "Japan", "sushi"),
+    ("Europe", "Italy", "pizza"),
+)
+
+
+class _FakeGenerator:
+  """Generates images whose red channel encodes the artifact in them."""
+
+  def __init__(self):
+    self.generated = []
+
+  def iter_images(self, prompt, seeds):
+    for seed in seeds:
+      self.generated.append((prompt, seed))
+      yield seed, Image.new("RGB", (8, 8), color=(seed % 3, 0, 0))
+
+
+class _FakeVlm:
+  """Tags images by their red channel, failing after `max_calls` calls."""
+
+  def __init__(self, max_calls=None):
+    self.max_calls = max_calls
+    self.num_calls = 0
+
+  def __call__(self, image, unused_question):
+    self.num_calls += 1
+    if self.max_calls is not None and self.num_calls > self.max_calls:
+      raise RuntimeError("quota exceeded")
+    return ",".join(_ARTIFACTS[image.getpixel((0, 0))[0]])
+
+
+def _dataset(num_prompts):
+  return [
+      {
+          "name": f"dish {i}",
+          "country": ("Brazil", "Japan", "Italy")[i % 3],
+          "domain": "cuisine",
+          "prompt": f"A high resolution image of dish {i}, realistic",
+      }
+      for i in range(num_prompts)
+  ]
+
+
+class EvaluateCube1kTest(unittest.TestCase):
+  """Test class for evaluate_cube_1k.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.output_dir = tmp_dir.name
+
+  def _evaluate(
+      self, generator, vlm_fn, dataset, shard_index=0, num_shards=1, **kwargs
+  ):
+    return evaluate_cube_1k.evaluate_shard(
+        dataset,
+        shard_index,
+        num_shards,
+        kwargs.pop("output_dir", self.output_dir),
+        generator,
+        vlm_fn,
+        model_name="sdxl",
+        num_images=6,
+        max_concurrency=1,
+        **kwargs,
+    )
+
+  def test_shard_prompts(self):
+    dataset = _dataset(10)
+    shards = [evaluate_cube_1k.shard_prompts(dataset, i, 3) for i in range(3)]
+
+    self.assertEqual([len(shard) for shard in shards], [4, 3, 3])
+    self.assertEqual(
+        sorted(index for shard in shards for index, _ in shard),
+        list(range(10)),
+    )
+    with self.assertRaises(ValueError):
+      evaluate_cube_1k.shard_prompts(dataset, 3, 3)
+
+  def test_load_dataset_of_jsonl_shards(self):
+    dataset = _dataset(5)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      for shard in range(2):
+        path = os.path.join(tmp_dir, f"prompts-{shard:05d}-of-00002.jsonl")
+        with open(path, "w") as f:
+          for entry in dataset[shard::2]:
+            f.write(json.dumps(entry) + "\n")
+
+      loaded = evaluate_cube_1k.load_dataset(
+          os.path.join(tmp_dir, "prompts-*.jsonl")
+      )
+      with self.assertRaises(FileNotFoundError):
+        evaluate_cube_1k.load_dataset(os.path.join(tmp_dir, "none-*.jsonl"))
+
+    self.assertEqual(loaded, dataset[0::2] + dataset[1::2])
+
+  def test_concept_space_samples(self):
+    self.assertEqual(
+        evaluate_cube_1k.concept_space_samples(_dataset(10), "cuisine", 2),
+        "dish 0, dish 1",
+    )
+
+  def test_evaluate_shard_writes_results(self):
+    dataset = _dataset(5)
+    scores = self._evaluate(_FakeGenerator(), _FakeVlm(), dataset, 1, 2)
+
+    self.assertEqual([score["prompt_index"] for score in scores], [1, 3])
+    # Seeds 0..5 are tagged with 3 distinct labels, twice each.
+    self.assertAlmostEqual(scores[0]["diversity"], 3 / 8)
+    annotations_path, scores_path = evaluate_cube_1k.shard_paths(
+        self.output_dir, 1, 2
+    )
+    annotations = evaluate_cube_1k.read_jsonl(annotations_path)
+    self.assertEqual(len(annotations), 12)
+    self.assertEqual(
+        annotations[0]["label"],
+        {
+            "continent": "South America",
+            "country": "Brazil",
+            "artifact": "feijoada",
+        },
+    )
+    self.assertEqual(evaluate_cube_1k.read_jsonl(scores_path), scores)
+
+  def test_rerun_resumes_interrupted_shard(self):
+    dataset = _dataset(3)
+    expected = self._evaluate(_FakeGenerator(), _FakeVlm(), dataset)
+    annotations_path, scores_path = evaluate_cube_1k.shard_paths(
+        self.output_dir, 0, 1
+    )
+    os.remove(annotations_path)
+    os.remove(scores_path)
+
+    with self.assertRaisesRegex(RuntimeError, "quota exceeded"):
+      self._evaluate(_FakeGenerator(), _FakeVlm(max_calls=9), dataset)
+    # Simulates a crash while writing a line.
+    with open(annotations_path, "a") as f:
+      f.write('{"prompt_index": 1, "pro')
+
+    generator = _FakeGenerator()
+    vlm = _FakeVlm()
+    scores = self._evaluate(generator, vlm, dataset)
+
+    self.assertEqual(vlm.num_calls, 18 - 9)
+    self.assertEqual(
+        generator.generated,
+        [(dataset[1]["prompt"], seed) for seed in range(3, 6)]
+        + [(dataset[2]["prompt"], seed) for seed in range(6)],
+    )
+    self.assertEqual(scores, expected)
+
+    # A finished shard is not evaluated again.
+    generator = _FakeGenerator()
+    self.assertEqual(self._evaluate(generator, _FakeVlm(), dataset), expected)
+    self.assertEqual(generator.generated, [])
+
+  def test_annotation_cache_is_shared_across_output_dirs(self):
+    dataset = _dataset(2)
+    cache_path = os.path.join(self.output_dir, "annotations.sqlite")
+    vlms = [_FakeVlm(), _FakeVlm()]
+    scores = []
+    with annotation_cache.AnnotationCache(cache_path) as cache:
+      for i, vlm in enumerate(vlms):
+        scores.append(
+            self._evaluate(
+                _FakeGenerator(),
+                vlm,
+                dataset,
+                output_dir=os.path.join(self.output_dir, str(i)),
+                cache=cache,
+                vlm_name="fake",
+            )
+        )
+
+    # 3 distinct images per prompt, tagged by the first run only.
+    self.assertEqual([vlm.num_calls for vlm in vlms], [6, 0])
+    self.assertEqual(scores[1], scores[0])
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,91 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Generates the images of a prompt with SDXL, as the notebook does.
+
+Images are saved as <seed>.png, seeds 0..num_images-1, see image_generation.py.
+
+Example usage:
+
+  python3 generate_images.py --prompt="Image of traditional clothing" \
+      --num_images=16 --batch_size=4 --output_dir=diversity_images/sdxl
+"""
+
+from absl import app
+from absl import flags
+
+from cube_t2i.cultural_diversity import image_generation
+
+
+_PROMPT = flags.DEFINE_string(
+    name='prompt',
+    default=None,
+    help='Prompt to generate images for.',
+    required=True,
+)
+_NEGATIVE_PROMPT = flags.DEFINE_string(
+    name='negative_prompt',
+    default=image_generation.DEFAULT_NEGATIVE_PROMPT,
+    help='Negative prompt.',
+)
+_NUM_IMAGES = flags.DEFINE_integer(
+    name='num_images', default=16, help='Number of images, with seeds 0..n-1.'
+)
+_BATCH_SIZE = flags.DEFINE_integer(
+    name='batch_size', default=4, help='Number of images per pipeline call.'
+)
+_NUM_INFERENCE_STEPS = flags.DEFINE_integer(
+    name='num_inference_steps', default=40, help='Number of denoising steps.'
+)
+_BASE_PATH = flags.DEFINE_string(
+    name='base_path',
+    default=image_generation.SDXL_BASE_PATH,
+    help='SDXL base pipeline.',
+)
+_REFINER_PATH = flags.DEFINE_string(
+    name='refiner_path',
+    default=image_generation.SDXL_REFINER_PATH,
+    help='SDXL refiner pipeline, or empty to denoise with the base only.',
+)
+_DEVICE = flags.DEFINE_string(
+    name='device', default='cuda:0', help='Device to generate images on.'
+)
+_OUTPUT_DIR = flags.DEFINE_string(
+    name='output_dir',
+    default='diversity_images/sdxl',
+    help='Directory to save the images to.',
+)
+
+
+def main(_):
+  base, refiner = image_generation.load_sdxl_pipelines(
+      _BASE_PATH.value, _REFINER_PATH.value or None, device=_DEVICE.value
+  )
+  generator = image_generation.SdxlGenerator(
+      base,
+      refiner,
+      num_inference_steps=_NUM_INFERENCE_STEPS.value,
+      batch_size=_BATCH_SIZE.value,
+  )
+  image_generation.save_images(
+      generator.iter_images(
+          _PROMPT.value, range(_NUM_IMAGES.value), _NEGATIVE_PROMPT.value
+      ),
+      _OUTPUT_DIR.value,
+  )
+
+
+if __name__ == '__main__':
+  app.run(main)
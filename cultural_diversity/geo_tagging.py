@@ -0,0 +1,281 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Geo-tags generated images with a VLM, with concurrent requests.
+
+Tagging an image is bound on the round-trip latency of the VLM, so images are
+tagged by a pool of threads. A token bucket caps the request rate across all
+threads, and requests failing with rate limiting or server errors are retried
+with exponential backoff. Annotations are returned in the order of the images,
+in the format of `all_annotations` in cultural_diversity.ipynb. With an
+`AnnotationCache`, only images whose (image, question, VLM) triple is not cached
+yet are sent to the VLM.
+
+Requests, retries, cache hits, rate limiting waits, backoffs and response
+parsing are counted and timed with instrumentation.py.
+"""
+
+import concurrent.futures
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import tqdm
+
+from cube_t2i.cultural_diversity import annotation_cache
+from cube_t2i.cultural_diversity import instrumentation
+from cube_t2i.cultural_diversity import vlm_clients
+
+
+def geo_tagging_question(prompt: str, concept_space_samples: str) -> str:
+  """Returns the question asking a VLM to geo-tag an image.
+
+  Args:
+    prompt: Prompt the image was generated for.
+    concept_space_samples: Comma-separated examples of expected artifacts,
+      which help the VLM name the artifact.
+  """
+  return f"""Given is an image generated for prompt: {prompt}.
+                Which country is the artifact in image from?
+                Which continent does the country belong to?
+                What is the name of the cultural artifact? For example, cultural artifacts can be {concept_space_samples}
+                You need to tag the image to the closest country/continent and name the artifact.
+                Finally just output 3 terms "continent, country and artifact name" in a comma separated fashion and nothing else".
+            """  # pylint: disable=line-too-long
+
+
+def parse_annotation(response_text: str) -> Dict[str, str]:
+  """Parses a 'continent, country, artifact' VLM response into a label.
+
+  Parses like the notebook, so that labels and scores match its results: the
+  terms keep the whitespace around them, e.g. ' India' after a comma.
+
+  Args:
+    response_text: Response of the VLM to `geo_tagging_question`.
+
+  Returns:
+    A dictionary with 'continent', 'country' and 'artifact' keys.
+
+  Raises:
+    ValueError: If the response does not contain three comma-separated terms.
+  """
+  with instrumentation.span('tagging/parse'):
+    terms = response_text.strip().split(',')
+    if len(terms) != 3:
+      instrumentation.count('tagging/parse_errors')
+      raise ValueError(f'Expected 3 comma-separated terms: {response_text!r}')
+    continent, country, artifact = terms
+  return {'continent': continent, 'country': country, 'artifact': artifact}
+
+
+class TokenBucket:
+  """Thread-safe token bucket limiting the rate of requests."""
+
+  def __init__(
+      self,
+      rate: float,
+      capacity: Optional[float] = None,
+      clock: Callable[[], float] = time.monotonic,
+      sleep: Callable[[float], None] = time.sleep,
+  ):
+    """Initializes a full bucket.
+
+    Args:
+      rate: Tokens added per second, i.e. the sustained request rate.
+      capacity: Maximum number of tokens, i.e. the largest burst of requests.
+        Defaults to `rate`, allowing bursts of one second of requests.
+      clock: Monotonic clock in seconds, overridable for tests.
+      sleep: Sleep function, overridable for tests.
+    """
+    self._rate = rate
+    self._capacity = max(capacity if capacity is not None else rate, 1.0)
+    self._tokens = self._capacity
+    self._clock = clock
+    self._sleep = sleep
+    self._last_refill = clock()
+    self._lock = threading.Lock()
+
+  def acquire(self, tokens: float = 1.0) -> None:
+    """Blocks until `tokens` tokens are available and takes them."""
+    while True:
+      with self._lock:
+        now = self._clock()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._last_refill) * self._rate,
+        )
+        self._last_refill = now
+        if self._tokens >= tokens:
+          self._tokens -= tokens
+          return
+        wait_seconds = (tokens - self._tokens) / self._rate
+      self._sleep(wait_seconds)
+
+
+def call_with_retries(
+    fn: Callable[..., Any],
+    *args: Any,
+    max_retries: int = 5,
+    initial_backoff: float = 1.0,
+    max_backoff: float = 60.0,
+    rate_limiter: Optional[TokenBucket] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Any:
+  """Calls `fn(*args)`, retrying on `RetryableError` with backoff.
+
+  Args:
+    fn: Function to call, e.g. a VLM client.
+    *args: Arguments of `fn`.
+    max_retries: Number of retries before the error is raised.
+    initial_backoff: Backoff before the first retry, in seconds. The backoff
+      doubles with every retry and is randomized by up to 50% (jitter), unless
+      the server asked for a specific delay.
+    max_backoff: Upper bound of the backoff, in seconds.
+    rate_limiter: Token bucket to take a token from before every attempt.
+    sleep: Sleep function, overridable for tests.
+
+  Returns:
+    The return value of `fn`.
+
+  Raises:
+    vlm_clients.RetryableError: If all attempts failed.
+  """
+  for attempt in range(max_retries + 1):
+    if rate_limiter is not None:
+      with instrumentation.span('vlm/rate_limit_wait'):
+        rate_limiter.acquire()
+    instrumentation.count('vlm/requests')
+    try:
+      return fn(*args)
+    except vlm_clients.RetryableError as e:
+      if attempt == max_retries:
+        instrumentation.count('vlm/failures')
+        raise
+      instrumentation.count('vlm/retries')
+      if e.retry_after is not None:
+        backoff = min(e.retry_after, max_backoff)
+      else:
+        backoff = min(initial_backoff * 2**attempt, max_backoff)
+        backoff *= random.uniform(0.5, 1.0)
+      with instrumentation.span('vlm/backoff'):
+        sleep(backoff)
+
+
+def tag_image(
+    image: vlm_clients.ImageInput,
+    question: str,
+    vlm_fn: vlm_clients.VlmFn,
+    cache: Optional[annotation_cache.AnnotationCache] = None,
+    vlm_name: Optional[str] = None,
+    **retry_kwargs: Any,
+) -> Dict[str, str]:
+  """Geo-tags an image, reading and writing the response to a cache.
+
+  Args:
+    image: Path to the image, or the image.
+    question: Question to ask about the image, see `geo_tagging_question`.
+    vlm_fn: VLM client, see vlm_clients.py.
+    cache: Cache of VLM responses to read from and write to.
+    vlm_name: Name of the VLM, part of the cache key. Required with `cache`.
+    **retry_kwargs: Arguments of `call_with_retries`.
+
+  Returns:
+    The parsed label of the image, see `parse_annotation`.
+  """
+  response_text = None
+  if cache is not None:
+    key = annotation_cache.annotation_key(
+        annotation_cache.image_digest(image), question, vlm_name
+    )
+    response_text = cache.get(key)
+    instrumentation.count(
+        'annotation_cache/misses'
+        if response_text is None
+        else 'annotation_cache/hits'
+    )
+  is_new = response_text is None
+  if is_new:
+    response_text = call_with_retries(vlm_fn, image, question, **retry_kwargs)
+  label = parse_annotation(response_text)
+  # Cached once parsed, so that a rerun queries an unparseable one again.
+  if is_new and cache is not None:
+    cache.put(key, response_text)
+  return label
+
+
+def tag_images(
+    image_paths: Sequence[str],
+    question: str,
+    vlm_fn: vlm_clients.VlmFn,
+    max_concurrency: int = 8,
+    requests_per_second: Optional[float] = None,
+    max_retries: int = 5,
+    initial_backoff: float = 1.0,
+    cache: Optional[annotation_cache.AnnotationCache] = None,
+    vlm_name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+  """Geo-tags images with concurrent, rate-limited VLM requests.
+
+  Args:
+    image_paths: Paths to the images to tag.
+    question: Question to ask about every image, see `geo_tagging_question`.
+    vlm_fn: VLM client, see vlm_clients.py.
+    max_concurrency: Maximum number of requests in flight.
+    requests_per_second: Maximum sustained request rate, including retries.
+      Unlimited if None.
+    max_retries: Number of retries of a failed request.
+    initial_backoff: Backoff before the first retry, in seconds.
+    cache: Cache of VLM responses to read from and write to.
+    vlm_name: Name of the VLM, part of the cache key. Required with `cache`.
+
+  Returns:
+    One annotation per image, in the order of `image_paths`: dictionaries with
+    the 'image_name' and the parsed 'label' of the image. The label is None if
+    the response could not be parsed, counted as 'tagging/parse_errors'.
+
+  Raises:
+    ValueError: If `cache` is given without `vlm_name`.
+  """
+  if cache is not None and not vlm_name:
+    raise ValueError('A vlm_name is required to cache annotations.')
+  rate_limiter = (
+      TokenBucket(requests_per_second) if requests_per_second else None
+  )
+
+  def _tag(image_path: str) -> Dict[str, Any]:
+    try:
+      label = tag_image(
+          image_path,
+          question,
+          vlm_fn,
+          cache,
+          vlm_name,
+          max_retries=max_retries,
+          initial_backoff=initial_backoff,
+          rate_limiter=rate_limiter,
+      )
+    except ValueError as e:
+      logging.warning('Could not tag %s: %s', image_path, e)
+      label = None
+    return {'image_name': os.path.basename(image_path), 'label': label}
+
+  with concurrent.futures.ThreadPoolExecutor(max_concurrency) as executor:
+    # `map` yields results in the order of the inputs.
+    return list(
+        tqdm.tqdm(executor.map(_tag, image_paths), total=len(image_paths))
+    )
@@ -0,0 +1,167 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from absl import app
+from PIL import Image
+
+from cube_t2i.cultural_diversity import geo_tagging
+from cube_t2i.cultural_diversity import instrumentation
+from cube_t2i.cultural_diversity import mock_vlm_server
+from cube_t2i.cultural_diversity import vlm_clients
+
+
+class _FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+  def sleep(self, seconds):
+    self.now += seconds
+
+
+class GeoTaggingTest(unittest.TestCase):
+  """Test class for geo_tagging.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.image_paths = []
+    for i in range(12):
+      image_path = os.path.join(tmp_dir.name, f"{i}.png")
+      Image.new("RGB", (8, 8), color=(i, 0, 0)).save(image_path)
+      self.image_paths.append(image_path)
+
+  def test_parse_annotation(self):
+    self.assertEqual(
+        geo_tagging.parse_annotation(" Asia, India,  masala dosa\n"),
+        {
+            "continent": "Asia",
+            "country": " India",
+            "artifact": "  masala dosa",
+        },
+    )
+    with self.assertRaises(ValueError):
+      geo_tagging.parse_annotation("India")
+    with self.assertRaises(ValueError):
+      geo_tagging.parse_annotation("Asia, India, sari, kurta")
+
+  def test_token_bucket_limits_rate(self):
+    """Test that requests beyond the burst wait for new tokens."""
+    clock = _FakeClock()
+    bucket = geo_tagging.TokenBucket(
+        rate=2.0, capacity=2.0, clock=clock, sleep=clock.sleep
+    )
+
+    for _ in range(6):
+      bucket.acquire()
+
+    # 2 requests from the full bucket, then one every 0.5 seconds.
+    self.assertAlmostEqual(clock.now, 2.0)
+
+  def test_call_with_retries(self):
+    """Test that retryable errors are retried and others are raised."""
+    attempts = []
+    sleeps = []
+
+    def _flaky(value):
+      attempts.append(value)
+      if len(attempts) < 3:
+        raise vlm_clients.RetryableError("busy", retry_after=0.25)
+      return value
+
+    result = geo_tagging.call_with_retries(
+        _flaky, "ok", max_retries=3, sleep=sleeps.append
+    )
+
+    self.assertEqual(result, "ok")
+    self.assertEqual(sleeps, [0.25, 0.25])
+    with self.assertRaises(vlm_clients.RetryableError):
+      attempts.clear()
+      geo_tagging.call_with_retries(
+          _flaky, "ok", max_retries=1, sleep=sleeps.append
+      )
+
+  def test_tag_images_with_mock_server(self):
+    """Test concurrent tagging, retries and result order end to end."""
+    with mock_vlm_server.MockVlmServer(
+        failure_status_codes=[429, 503, 500], retry_after="0"
+    ) as server:
+      annotations = geo_tagging.tag_images(
+          self.image_paths,
+          geo_tagging.geo_tagging_question("Image of clothing", "sari"),
+          vlm_clients.gpt4_response_fn("test-key", url=server.url),
+          max_concurrency=4,
+      )
+
+    self.assertEqual(
+        [annotation["image_name"] for annotation in annotations],
+        [f"{i}.png" for i in range(12)],
+    )
+    self.assertEqual(
+        annotations[0]["label"],
+        {"continent": "Asia", "country": " India", "artifact": " sari"},
+    )
+    # 12 images plus 3 retries.
+    self.assertEqual(len(server.requests), 15)
+
+  def test_tag_images_continues_after_unparseable_response(self):
+    responses = {"1.png": "I cannot tell."}
+    vlm_fn = lambda image_path, _: responses.get(
+        os.path.basename(image_path), "Asia, India, sari"
+    )
+
+    with instrumentation.recording() as recorder:
+      annotations = geo_tagging.tag_images(self.image_paths[:3], "q", vlm_fn)
+
+    self.assertEqual(
+        [annotation["label"] is None for annotation in annotations],
+        [False, True, False],
+    )
+    self.assertEqual(recorder.summary()["counters"]["tagging/parse_errors"], 1)
+
+  def test_tag_images_runs_requests_concurrently(self):
+    """Test that requests overlap instead of running one at a time."""
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def _slow_vlm(unused_image_path, unused_question):
+      with lock:
+        in_flight.append(1)
+        max_in_flight.append(len(in_flight))
+      time.sleep(0.05)
+      with lock:
+        in_flight.pop()
+      return "Europe, France, beret"
+
+    geo_tagging.tag_images(
+        self.image_paths, "question", _slow_vlm, max_concurrency=4
+    )
+
+    self.assertEqual(max(max_in_flight), 4)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
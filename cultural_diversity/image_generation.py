@@ -0,0 +1,282 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Generates images of a prompt with SDXL, several seeds per batch.
+
+`prompt_stable_diffusion_xl` of cultural_diversity.ipynb runs the base and the
+refiner once per seed, encoding the prompt and the negative prompt again every
+time. `SdxlGenerator` encodes them once per prompt and denoises a batch of
+seeds per call, with one `torch.Generator` per seed, so an image only depends
+on its seed and not on the batch it was generated in. The latents of the base
+go straight to the refiner, batch by batch.
+
+Prompt encoding, the base and refiner calls and image saving are timed as
+'generation/*' spans of instrumentation.py.
+"""
+
+import dataclasses
+import os
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import diffusers
+from PIL import Image
+import torch
+
+from cube_t2i.cultural_diversity import instrumentation
+
+DEFAULT_NEGATIVE_PROMPT = (
+    'multiple artifacts, blurry, painting, cartoon, artificial, nsfw, bad'
+    ' quality, bad anatomy, worst quality, low quality, low resolutions, extra'
+    ' fingers, blur, blurry, ugly, wrongs proportions, watermark, image'
+    ' artifacts, lowres, ugly, jpeg artifacts, deformed, noisy image'
+)
+SDXL_BASE_PATH = 'stabilityai/stable-diffusion-xl-base-1.0'
+SDXL_REFINER_PATH = 'stabilityai/stable-diffusion-xl-refiner-1.0'
+
+
+@dataclasses.dataclass(frozen=True)
+class PromptEmbeddings:
+  """Text embeddings of a prompt and its negative prompt, for one image."""
+
+  prompt_embeds: torch.Tensor
+  pooled_prompt_embeds: torch.Tensor
+  negative_prompt_embeds: Optional[torch.Tensor] = None
+  negative_pooled_prompt_embeds: Optional[torch.Tensor] = None
+
+  def as_kwargs(self) -> Dict[str, Optional[torch.Tensor]]:
+    """Returns the embeddings as keyword arguments of an SDXL pipeline."""
+    return {
+        field.name: getattr(self, field.name)
+        for field in dataclasses.fields(self)
+    }
+
+
+def encode_prompt(
+    pipeline: diffusers.DiffusionPipeline,
+    prompt: str,
+    negative_prompt: Optional[str],
+    guidance_scale: float,
+) -> PromptEmbeddings:
+  """Encodes a prompt with the text encoders of an SDXL pipeline.
+
+  Args:
+    pipeline: SDXL base or refiner pipeline. The refiner only has the second
+      text encoder, so its embeddings differ from those of the base.
+    prompt: Prompt to encode.
+    negative_prompt: Negative prompt to encode.
+    guidance_scale: Classifier-free guidance scale. The negative prompt is only
+      encoded if it is greater than 1.
+  """
+  with torch.no_grad():
+    (
+        prompt_embeds,
+        negative_prompt_embeds,
+        pooled_prompt_embeds,
+        negative_pooled_prompt_embeds,
+    ) = pipeline.encode_prompt(
+        prompt=prompt,
+        device=pipeline.device,
+        num_images_per_prompt=1,
+        do_classifier_free_guidance=guidance_scale > 1,
+        negative_prompt=negative_prompt,
+    )
+  return PromptEmbeddings(
+      prompt_embeds=prompt_embeds,
+      pooled_prompt_embeds=pooled_prompt_embeds,
+      negative_prompt_embeds=negative_prompt_embeds,
+      negative_pooled_prompt_embeds=negative_pooled_prompt_embeds,
+  )
+
+
+def load_sdxl_pipelines(
+    base_path: str = SDXL_BASE_PATH,
+    refiner_path: Optional[str] = SDXL_REFINER_PATH,
+    device: str = 'cuda',
+    torch_dtype: torch.dtype = torch.float16,
+    components: Optional[Dict[str, Any]] = None,
+) -> Tuple[
+    diffusers.DiffusionPipeline, Optional[diffusers.DiffusionPipeline]
+]:
+  """Loads an SDXL base and a refiner sharing `text_encoder_2` and the VAE.
+
+  Args:
+    base_path: Hugging Face name or local path of the base pipeline.
+    refiner_path: Name or path of the refiner pipeline. No refiner if None.
+    device: Device to move the pipelines to, e.g. 'cuda:0'.
+    torch_dtype: Data type of the weights. Half-precision weights are loaded
+      from the 'fp16' variant.
+    components: Already loaded components of the base, e.g. {'vae': vae},
+      used instead of loading them from `base_path`.
+  """
+  variant = 'fp16' if torch_dtype == torch.float16 else None
+  base = diffusers.DiffusionPipeline.from_pretrained(
+      base_path,
+      torch_dtype=torch_dtype,
+      variant=variant,
+      use_safetensors=True,
+      **(components or {}),
+  ).to(device)
+  refiner = None
+  if refiner_path is not None:
+    refiner = diffusers.DiffusionPipeline.from_pretrained(
+        refiner_path,
+        text_encoder_2=base.text_encoder_2,
+        vae=base.vae,
+        torch_dtype=torch_dtype,
+        variant=variant,
+        use_safetensors=True,
+    ).to(device)
+  return base, refiner
+
+
+class SdxlGenerator:
+  """Generates images with an SDXL base and an optional refiner."""
+
+  def __init__(
+      self,
+      base: diffusers.DiffusionPipeline,
+      refiner: Optional[diffusers.DiffusionPipeline] = None,
+      num_inference_steps: int = 40,
+      high_noise_frac: float = 0.8,
+      guidance_scale: float = 5.0,
+      batch_size: int = 4,
+  ):
+    """Initializes the generator.
+
+    Args:
+      base: SDXL base pipeline.
+      refiner: SDXL refiner pipeline. If None, the base denoises the images
+        fully.
+      num_inference_steps: Number of denoising steps, shared by the base and
+        the refiner.
+      high_noise_frac: Fraction of the steps run by the base when there is a
+        refiner.
+      guidance_scale: Classifier-free guidance scale.
+      batch_size: Number of images to denoise per pipeline call.
+    """
+    self._base = base
+    self._refiner = refiner
+    self._num_inference_steps = num_inference_steps
+    self._high_noise_frac = high_noise_frac
+    self._guidance_scale = guidance_scale
+    self._batch_size = batch_size
+
+  def _generators(self, seeds: Sequence[int]) -> List[torch.Generator]:
+    return [
+        torch.Generator(device=self._base.device).manual_seed(seed)
+        for seed in seeds
+    ]
+
+  def iter_images(
+      self,
+      prompt: str,
+      seeds: Sequence[int],
+      negative_prompt: Optional[str] = DEFAULT_NEGATIVE_PROMPT,
+  ) -> Iterator[Tuple[int, Image.Image]]:
+    """Yields `(seed, image)` pairs, a batch of seeds at a time.
+
+    Args:
+      prompt: Prompt to generate images for.
+      seeds: Seed of every image.
+      negative_prompt: Negative prompt of every image.
+    """
+    with instrumentation.span('generation/encode_prompt'):
+      base_embeddings = encode_prompt(
+          self._base, prompt, negative_prompt, self._guidance_scale
+      )
+      if self._refiner is not None:
+        refiner_embeddings = encode_prompt(
+            self._refiner, prompt, negative_prompt, self._guidance_scale
+        )
+
+    for start in range(0, len(seeds), self._batch_size):
+      batch_seeds = seeds[start : start + self._batch_size]
+      # The refiner continues the random stream of the base for every image.
+      generators = self._generators(batch_seeds)
+      if self._refiner is None:
+        with instrumentation.span('generation/base', images=len(batch_seeds)):
+          images = self._base(
+              **base_embeddings.as_kwargs(),
+              num_images_per_prompt=len(batch_seeds),
+              num_inference_steps=self._num_inference_steps,
+              guidance_scale=self._guidance_scale,
+              generator=generators,
+          ).images
+      else:
+        with instrumentation.span('generation/base', images=len(batch_seeds)):
+          latents = self._base(
+              **base_embeddings.as_kwargs(),
+              num_images_per_prompt=len(batch_seeds),
+              num_inference_steps=self._num_inference_steps,
+              denoising_end=self._high_noise_frac,
+              guidance_scale=self._guidance_scale,
+              generator=generators,
+              output_type='latent',
+          ).images
+        with instrumentation.span(
+            'generation/refiner', images=len(batch_seeds)
+        ):
+          images = self._refiner(
+              **refiner_embeddings.as_kwargs(),
+              image=latents,
+              num_images_per_prompt=len(batch_seeds),
+              num_inference_steps=self._num_inference_steps,
+              denoising_start=self._high_noise_frac,
+              guidance_scale=self._guidance_scale,
+              generator=generators,
+          ).images
+      instrumentation.count('generation/images', len(images))
+      yield from zip(batch_seeds, images)
+
+  def generate(
+      self,
+      prompt: str,
+      seeds: Sequence[int],
+      negative_prompt: Optional[str] = DEFAULT_NEGATIVE_PROMPT,
+  ) -> List[Image.Image]:
+    """Returns one image per seed, in the order of `seeds`.
+
+    Args:
+      prompt: Prompt to generate images for.
+      seeds: Seed of every image.
+      negative_prompt: Negative prompt of every image.
+    """
+    return [
+        image for _, image in self.iter_images(prompt, seeds, negative_prompt)
+    ]
+
+
+def save_images(
+    seeded_images: Iterable[Tuple[int, Image.Image]], output_dir: str
+) -> List[str]:
+  """Saves images as `<seed>.png`, as the notebook does, and returns paths."""
+  os.makedirs(output_dir, exist_ok=True)
+  image_paths = []
+  for seed, image in seeded_images:
+    image_path = os.path.join(output_dir, f'{seed}.png')
+    with instrumentation.span('generation/save_image'):
+      image.save(image_path)
+    instrumentation.count('generation/saved_bytes', os.path.getsize(image_path))
+    image_paths.append(image_path)
+  return image_paths
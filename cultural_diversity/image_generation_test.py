@@ -0,0 +1,96 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import os
+import tempfile
+import unittest
+
+from absl import app
+import numpy as np
+
+from cube_t2i.cultural_diversity import image_generation
+from cube_t2i.cultural_diversity import tiny_pipelines
+
+
+class ImageGenerationTest(unittest.TestCase):
+  """Test class for image_generation.py."""
+
+  def setUp(self):
+    super().setUp()
+    self.base, self.refiner = tiny_pipelines.tiny_sdxl_pipelines()
+
+  def _generator(self, batch_size, refiner=True):
+    return image_generation.SdxlGenerator(
+        self.base,
+        self.refiner if refiner else None,
+        num_inference_steps=4,
+        batch_size=batch_size,
+    )
+
+  def test_images_only_depend_on_their_seed(self):
+    """Test that batching seeds does not change the images."""
+    batched = self._generator(batch_size=3).generate(
+        "Image of a sari", [0, 1, 2]
+    )
+    one_by_one = self._generator(batch_size=1).generate(
+        "Image of a sari", [0, 1, 2]
+    )
+
+    self.assertEqual(len(batched), 3)
+    for batched_image, image in zip(batched, one_by_one):
+      self.assertEqual(batched_image.size, (tiny_pipelines.IMAGE_SIZE,) * 2)
+      np.testing.assert_allclose(
+          np.asarray(batched_image, dtype=np.float32),
+          np.asarray(image, dtype=np.float32),
+          atol=2,
+      )
+    self.assertFalse(
+        np.array_equal(np.asarray(batched[0]), np.asarray(batched[1]))
+    )
+
+  def test_prompt_is_encoded_once(self):
+    """Test that the text encoders run once per prompt, not once per batch."""
+    calls = []
+    for text_encoder in (self.base.text_encoder, self.base.text_encoder_2):
+      handle = text_encoder.register_forward_hook(
+          lambda module, *_: calls.append(module)
+      )
+      self.addCleanup(handle.remove)
+
+    self._generator(batch_size=2).generate("Image of a sari", list(range(5)))
+
+    # The prompt and the negative prompt, by both encoders of the base and by
+    # the second encoder, shared with the refiner.
+    self.assertEqual(calls.count(self.base.text_encoder), 2)
+    self.assertEqual(calls.count(self.base.text_encoder_2), 4)
+
+  def test_iter_images_without_refiner(self):
+    with tempfile.TemporaryDirectory() as output_dir:
+      image_paths = image_generation.save_images(
+          self._generator(batch_size=2, refiner=False).iter_images(
+              "Image of a sari", [3, 1, 4]
+          ),
+          output_dir,
+      )
+
+      self.assertEqual(
+          [os.path.basename(image_path) for image_path in image_paths],
+          ["3.png", "1.png", "4.png"],
+      )
+      self.assertTrue(all(os.path.exists(path) for path in image_paths))
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
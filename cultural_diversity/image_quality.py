@@ -0,0 +1,169 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Per-image quality scores for quality-weighted Vendi scores.
+
+The quality-weighted Vendi score of a set of images
+(https://arxiv.org/abs/2405.17805) is their mean quality times their Vendi
+score. Quality scores come from a pluggable scorer, any function from a batch of
+PIL images to an array of scores, e.g. `linear_probe_scorer` on CLIP embeddings
+for the LAION aesthetic predictor.
+
+Scores are computed in batches and cached by image hash in an `EmbeddingCache`
+of dimension 1, so scoring a benchmark again, or with another kernel, only runs
+the scorer on new images. A cache directory holds the scores of one scorer,
+whose name is recorded when the cache is created by `open_score_cache`, and
+opening it with another scorer's name raises ValueError. Cached scores are
+stored as float16, with about 3 significant digits.
+"""
+
+from typing import Callable, Optional, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+from cube_t2i.cultural_diversity import embedding_cache
+from cube_t2i.cultural_diversity import embedding_diversity
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+QualityScorer = Callable[[Sequence[Image.Image]], np.ndarray]
+
+
+def linear_probe_scorer(
+    encoder: embedding_diversity.ImageEncoder,
+    weights: np.ndarray,
+    bias: float = 0.0,
+) -> QualityScorer:
+  """Returns a scorer applying a linear layer to normalized image embeddings.
+
+  Args:
+    encoder: Function from a batch of images to their embeddings, e.g.
+      `embedding_diversity.clip_image_encoder()`.
+    weights: Array of shape [dim] of the linear layer.
+    bias: Bias of the linear layer.
+  """
+  weights = np.asarray(weights, dtype=np.float64)
+
+  def score(images: Sequence[Image.Image]) -> np.ndarray:
+    embeddings = embedding_diversity.normalize_embeddings(encoder(images))
+    return embeddings @ weights + bias
+
+  return score
+
+
+def open_score_cache(
+    directory: str, scorer_name: str
+) -> embedding_cache.EmbeddingCache:
+  """Opens or creates the cache of the quality scores of a scorer.
+
+  Args:
+    directory: Directory of the cache files.
+    scorer_name: Name of the scorer, including its checkpoint if it matters,
+      e.g. 'laion-aesthetic-v2/clip-vit-large-patch14'.
+
+  Raises:
+    ValueError: If the directory holds the scores of another scorer, or
+      embeddings.
+  """
+  return embedding_cache.EmbeddingCache(directory, 1, scorer_name)
+
+
+def score_images(
+    images: Sequence[embedding_diversity.ImageInput],
+    scorer: QualityScorer,
+    cache: Optional[embedding_cache.EmbeddingCache] = None,
+    batch_size: int = 32,
+) -> np.ndarray:
+  """Scores images in batches, only scoring images missing from the cache.
+
+  Args:
+    images: Paths to image files or in-memory images.
+    scorer: Function from a batch of images to their quality scores.
+    cache: Cache of the scores of `scorer` to read scores from and to store
+      new scores in, see `open_score_cache`.
+    batch_size: Number of images per scorer call.
+
+  Returns:
+    A float32 array of shape [len(images)].
+
+  Raises:
+    ValueError: If the cache holds embeddings rather than scores.
+  """
+  if cache is not None and cache.dim != 1:
+    raise ValueError(f'Expected a cache of dimension 1, got {cache.dim}.')
+  if not images:
+    return np.zeros(0, dtype=np.float32)
+  return embedding_diversity.embed_images(
+      images,
+      lambda batch: np.asarray(scorer(batch)).reshape(-1, 1),
+      cache,
+      batch_size,
+  )[:, 0]
+
+
+def calculate_quality_weighted_diversity_batch(
+    label_lists: Sequence[Sequence[vendi_utils.Label]],
+    image_lists: Sequence[Sequence[embedding_diversity.ImageInput]],
+    scorer: QualityScorer,
+    cache: Optional[embedding_cache.EmbeddingCache] = None,
+    weights: Sequence[float] = vendi_utils.DEFAULT_WEIGHTS,
+    is_global: bool = True,
+    batch_size: int = 8,
+    scorer_batch_size: int = 32,
+    q: Union[float, str] = 1,
+) -> np.ndarray:
+  """Calculates the quality-weighted cultural diversity of many prompts.
+
+  The images of all prompts are scored together, in batches of
+  `scorer_batch_size` images, and only the images that are scored by
+  `vendi_utils.calculate_cultural_diversity_batch` (the first 24 of fewer
+  than 32) are scored.
+
+  Args:
+    label_lists: For each prompt, the labels of its generated images.
+    image_lists: For each prompt, its images, in the order of its labels.
+    scorer: Function from a batch of images to their quality scores.
+    cache: Cache of quality scores, see `score_images`.
+    weights: Weights of the (continent, country, artifact) equalities.
+    is_global: Whether the prompts are global (True) or within-culture (False).
+    batch_size: Number of images per Vendi chunk.
+    scorer_batch_size: Number of images per scorer call.
+    q: Order of the Vendi score.
+
+  Returns:
+    An array with the mean normalized quality-weighted Vendi score of each
+    prompt, NaN for prompts without labels.
+  """
+  image_lists = [
+      vendi_utils.truncate_to_scored(images) for images in image_lists
+  ]
+  qualities = score_images(
+      [image for images in image_lists for image in images],
+      scorer,
+      cache,
+      scorer_batch_size,
+  )
+  offsets = np.cumsum([0] + [len(images) for images in image_lists])
+  return vendi_utils.calculate_cultural_diversity_batch(
+      label_lists,
+      weights,
+      is_global,
+      batch_size,
+      q,
+      quality_lists=[
+          qualities[start:end] for start, end in zip(offsets, offsets[1:])
+      ],
+  )
@@ -0,0 +1,145 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import tempfile
+import unittest
+
+from absl import app
+import numpy as np
+from PIL import Image
+from vendi_score import vendi
+
+from cube_t2i.cultural_diversity import embedding_cache
+from cube_t2i.cultural_diversity import embedding_diversity
+from cube_t2i.cultural_diversity import image_quality
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+class _BrightnessScorer:
+  """Scores images by their mean brightness, counting the scored images."""
+
+  def __init__(self):
+    self.batch_sizes = []
+
+  def __call__(self, images):
+    self.batch_sizes.append(len(images))
+    return np.array(
+        [np.asarray(image, dtype=np.float32).mean() / 255 for image in images]
+    )
+
+
+def _label(country):
+  return {"continent": "Asia", "country": country, "artifact": "sari"}
+
+
+class ImageQualityTest(unittest.TestCase):
+  """Test class for image_quality.py."""
+
+  def setUp(self):
+    super().setUp()
+    self.rng = np.random.default_rng(0)
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.tmp_dir = tmp_dir.name
+
+  def _images(self, n):
+    return [
+        Image.new("RGB", (4, 4), tuple(int(c) for c in color))
+        for color in self.rng.integers(0, 256, size=(n, 3))
+    ]
+
+  def test_quality_weighted_chunks_match_vendi_score(self):
+    countries = ["India", "Japan", "China"]
+    label_lists = [
+        [_label(countries[i % 3]) for i in range(n)] for n in (12, 40)
+    ]
+    quality_lists = [self.rng.uniform(size=len(l)) for l in label_lists]
+
+    scores = vendi_utils.calculate_cultural_diversity_batch(
+        label_lists,
+        weights=(0.0, 1.0, 0.0),
+        quality_lists=quality_lists,
+    )
+
+    def similarity(a, b):
+      return float(a["country"] == b["country"])
+
+    for labels, qualities, score in zip(label_lists, quality_lists, scores):
+      chunks = [
+          (labels[i : i + 8], qualities[i : i + 8])
+          for i in range(0, len(labels), 8)
+      ]
+      expected = np.mean([
+          np.mean(q) * vendi.score(l, similarity) / 8 for l, q in chunks
+      ])
+      self.assertAlmostEqual(score, expected, places=6)
+
+  def test_unit_quality_gives_plain_diversity(self):
+    embeddings = self.rng.normal(size=(20, 8))
+    self.assertAlmostEqual(
+        embedding_diversity.calculate_embedding_diversity(
+            embeddings, qualities=np.ones(20)
+        ),
+        embedding_diversity.calculate_embedding_diversity(embeddings),
+        places=9,
+    )
+    with self.assertRaisesRegex(ValueError, "quality scores"):
+      embedding_diversity.calculate_embedding_diversity(
+          embeddings, qualities=np.ones(19)
+      )
+
+  def test_scores_are_cached_by_image(self):
+    images = self._images(5)
+    scorer = _BrightnessScorer()
+    with image_quality.open_score_cache(self.tmp_dir, "brightness") as cache:
+      first = image_quality.score_images(images, scorer, cache, batch_size=2)
+      again = image_quality.score_images(
+          images + self._images(1), scorer, cache, batch_size=2
+      )
+
+    self.assertEqual(scorer.batch_sizes, [2, 2, 1, 1])
+    np.testing.assert_allclose(first, _BrightnessScorer()(images), atol=1e-3)
+    np.testing.assert_array_equal(again[:5], first)
+    with self.assertRaisesRegex(ValueError, "'brightness'"):
+      image_quality.open_score_cache(self.tmp_dir, "aesthetics")
+
+  def test_rejects_embedding_cache(self):
+    with embedding_cache.EmbeddingCache(self.tmp_dir, 3, "clip") as cache:
+      with self.assertRaisesRegex(ValueError, "dimension 1"):
+        image_quality.score_images(self._images(1), _BrightnessScorer(), cache)
+
+  def test_batch_only_scores_evaluated_images(self):
+    label_lists = [[_label("India")] * 30, [_label("India"), _label("Japan")]]
+    image_lists = [self._images(30), self._images(2)]
+    scorer = _BrightnessScorer()
+
+    scores = image_quality.calculate_quality_weighted_diversity_batch(
+        label_lists, image_lists, scorer, weights=(0.0, 1.0, 0.0)
+    )
+
+    # 24 of the 30 images of the first prompt, and both of the second.
+    self.assertEqual(scorer.batch_sizes, [26])
+    expected = vendi_utils.calculate_cultural_diversity_batch(
+        label_lists,
+        weights=(0.0, 1.0, 0.0),
+        quality_lists=[
+            _BrightnessScorer()(images[:24]) for images in image_lists
+        ],
+    )
+    np.testing.assert_allclose(scores, expected, rtol=1e-6)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
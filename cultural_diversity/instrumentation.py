@@ -0,0 +1,225 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Per-stage timers and counters of the diversity evaluation flow.
+
+Generation, tagging and scoring mark their stages with `span`, e.g.
+'generation/base' or 'vlm/request', and count events such as requests, retries,
+bytes and cache hits with `count`. Both do nothing unless a `Recorder` is
+active, so instrumented code pays almost nothing by default:
+
+  with instrumentation.recording() as recorder:
+    evaluate_shard(...)
+  recorder.write_summary('summary.json')
+  recorder.write_chrome_trace('trace.json')
+
+The summary gives the number, total, mean and tail durations of every span and
+the value of every counter. The Chrome trace has one event per span on the
+thread that ran it, and opens in chrome://tracing or https://ui.perfetto.dev.
+The active recorder is shared by all threads, so the spans of the generation,
+tagging and scoring threads of streaming_evaluation.py show up side by side.
+"""
+
+import collections
+import contextlib
+import dataclasses
+import json
+import os
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+)
+
+import numpy as np
+
+
+@dataclasses.dataclass(frozen=True)
+class SpanEvent:
+  """A timed stage, with times in seconds since the recorder started."""
+
+  name: str
+  start: float
+  end: float
+  thread_id: int
+  thread_name: str
+  args: Dict[str, Any]
+
+  @property
+  def seconds(self) -> float:
+    return self.end - self.start
+
+
+class Recorder:
+  """Thread-safe collection of span events and counters."""
+
+  def __init__(self, clock: Callable[[], float] = time.perf_counter):
+    """Initializes an empty recorder.
+
+    Args:
+      clock: Monotonic clock in seconds, overridable for tests.
+    """
+    self._clock = clock
+    self._origin = clock()
+    self._lock = threading.Lock()
+    self.events: List[SpanEvent] = []
+    self.counters: Dict[str, float] = collections.Counter()
+
+  @contextlib.contextmanager
+  def span(self, name: str, **args: Any) -> Iterator[None]:
+    """Times the body of a `with` statement as a span named `name`.
+
+    Args:
+      name: Name of the stage, '/'-separated from general to specific.
+      **args: JSON-serializable details of the span, e.g. a batch size, shown
+        in the Chrome trace.
+    """
+    start = self._clock()
+    try:
+      yield
+    finally:
+      end = self._clock()
+      thread = threading.current_thread()
+      event = SpanEvent(
+          name,
+          start - self._origin,
+          end - self._origin,
+          thread.ident,
+          thread.name,
+          args,
+      )
+      with self._lock:
+        self.events.append(event)
+
+  def count(self, name: str, value: float = 1) -> None:
+    """Adds `value` to the counter `name`."""
+    with self._lock:
+      self.counters[name] += value
+
+  def summary(self) -> Dict[str, Any]:
+    """Returns the statistics of every span and the counters.
+
+    Returns:
+      A JSON-serializable dictionary with the seconds since the recorder
+      started ('wall_seconds'), the 'count', 'total_seconds', 'mean_seconds',
+      'p50_seconds', 'p95_seconds' and 'max_seconds' of every span name
+      ('spans') and the value of every counter ('counters').
+    """
+    with self._lock:
+      events = list(self.events)
+      counters = dict(self.counters)
+    seconds_by_name = collections.defaultdict(list)
+    for event in events:
+      seconds_by_name[event.name].append(event.seconds)
+    spans = {}
+    for name in sorted(seconds_by_name):
+      seconds = np.array(seconds_by_name[name])
+      spans[name] = {
+          'count': len(seconds),
+          'total_seconds': float(seconds.sum()),
+          'mean_seconds': float(seconds.mean()),
+          'p50_seconds': float(np.percentile(seconds, 50)),
+          'p95_seconds': float(np.percentile(seconds, 95)),
+          'max_seconds': float(seconds.max()),
+      }
+    return {
+        'wall_seconds': self._clock() - self._origin,
+        'spans': spans,
+        'counters': dict(sorted(counters.items())),
+    }
+
+  def chrome_trace(self) -> Dict[str, Any]:
+    """Returns the spans in the Chrome Trace Event Format.
+
+    Every span is a complete ('X') event, with microsecond timestamps, and
+    every thread is named after its Python thread.
+    """
+    with self._lock:
+      events = list(self.events)
+    pid = os.getpid()
+    trace_events = []
+    thread_names = {}
+    for event in events:
+      thread_names[event.thread_id] = event.thread_name
+      trace_events.append({
+          'name': event.name,
+          'cat': event.name.split('/')[0],
+          'ph': 'X',
+          'ts': event.start * 1e6,
+          'dur': event.seconds * 1e6,
+          'pid': pid,
+          'tid': event.thread_id,
+          'args': event.args,
+      })
+    for thread_id, thread_name in thread_names.items():
+      trace_events.append({
+          'name': 'thread_name',
+          'ph': 'M',
+          'pid': pid,
+          'tid': thread_id,
+          'args': {'name': thread_name},
+      })
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+  def write_summary(self, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+      json.dump(self.summary(), f, indent=2)
+
+  def write_chrome_trace(self, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+      json.dump(self.chrome_trace(), f)
+
+
+_active_recorder: Optional[Recorder] = None
+
+
+@contextlib.contextmanager
+def recording(recorder: Optional[Recorder] = None) -> Iterator[Recorder]:
+  """Makes a recorder the one of `span` and `count` in all threads.
+
+  Args:
+    recorder: Recorder to activate. Defaults to a new recorder.
+
+  Yields:
+    The active recorder. The previously active one is restored on exit.
+  """
+  global _active_recorder
+  recorder = recorder or Recorder()
+  previous, _active_recorder = _active_recorder, recorder
+  try:
+    yield recorder
+  finally:
+    _active_recorder = previous
+
+
+def span(name: str, **args: Any) -> ContextManager[None]:
+  """Times a stage with the active recorder, if any. See `Recorder.span`."""
+  recorder = _active_recorder
+  if recorder is None:
+    return contextlib.nullcontext()
+  return recorder.span(name, **args)
+
+
+def count(name: str, value: float = 1) -> None:
+  """Adds to a counter of the active recorder, if any."""
+  recorder = _active_recorder
+  if recorder is not None:
+    recorder.count(name, value)
@@ -0,0 +1,180 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from absl import app
+from PIL import Image
+
+from cube_t2i.cultural_diversity import geo_tagging
+from cube_t2i.cultural_diversity import image_generation
+from cube_t2i.cultural_diversity import instrumentation
+from cube_t2i.cultural_diversity import mock_vlm_server
+from cube_t2i.cultural_diversity import tiny_pipelines
+from cube_t2i.cultural_diversity import vlm_clients
+
+
+class _FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+
+class InstrumentationTest(unittest.TestCase):
+  """Test class for instrumentation.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.tmp_dir = tmp_dir.name
+
+  def test_nothing_is_recorded_without_recorder(self):
+    with instrumentation.span("stage"):
+      instrumentation.count("events")
+    with instrumentation.recording() as recorder:
+      with instrumentation.recording() as inner:
+        instrumentation.count("events")
+      instrumentation.count("events", 2)
+    instrumentation.count("events")
+
+    self.assertEqual(inner.counters, {"events": 1})
+    self.assertEqual(recorder.counters, {"events": 2})
+
+  def test_summary_aggregates_spans(self):
+    clock = _FakeClock()
+    recorder = instrumentation.Recorder(clock)
+    for seconds in (1.0, 3.0):
+      with recorder.span("vlm/request"):
+        clock.now += seconds
+    with recorder.span("scoring/vendi"):
+      clock.now += 0.5
+    recorder.count("vlm/retries")
+
+    summary = recorder.summary()
+
+    self.assertEqual(summary["wall_seconds"], 4.5)
+    self.assertEqual(list(summary["spans"]), ["scoring/vendi", "vlm/request"])
+    request = summary["spans"]["vlm/request"]
+    self.assertEqual(request["count"], 2)
+    self.assertEqual(request["total_seconds"], 4.0)
+    self.assertEqual(request["mean_seconds"], 2.0)
+    self.assertEqual(request["max_seconds"], 3.0)
+    self.assertEqual(summary["counters"], {"vlm/retries": 1})
+
+  def test_chrome_trace_has_a_track_per_thread(self):
+    clock = _FakeClock()
+    recorder = instrumentation.Recorder(clock)
+    with recorder.span("generation/base", images=4):
+      clock.now += 0.25
+    with instrumentation.recording(recorder):
+      # Spans of other threads go to the active recorder too.
+      thread = threading.Thread(target=self._request_span, name="tagger")
+      thread.start()
+      thread.join()
+    trace_path = os.path.join(self.tmp_dir, "trace.json")
+
+    recorder.write_chrome_trace(trace_path)
+
+    with open(trace_path) as f:
+      events = json.load(f)["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    self.assertEqual(
+        spans[0],
+        {
+            "name": "generation/base",
+            "cat": "generation",
+            "ph": "X",
+            "ts": 0.0,
+            "dur": 250000.0,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"images": 4},
+        },
+    )
+    self.assertNotEqual(spans[1]["tid"], spans[0]["tid"])
+    thread_names = {
+        event["tid"]: event["args"]["name"]
+        for event in events
+        if event["ph"] == "M"
+    }
+    self.assertEqual(thread_names[spans[1]["tid"]], "tagger")
+
+  def _request_span(self):
+    with instrumentation.span("vlm/request"):
+      pass
+
+  def test_tagging_counts_requests_and_retries(self):
+    image_paths = []
+    for i in range(6):
+      image_paths.append(os.path.join(self.tmp_dir, f"{i}.png"))
+      Image.new("RGB", (8, 8), color=(i, 0, 0)).save(image_paths[-1])
+
+    with mock_vlm_server.MockVlmServer(
+        failure_status_codes=[429, 503], retry_after="0"
+    ) as server, instrumentation.recording() as recorder:
+      geo_tagging.tag_images(
+          image_paths,
+          "Which country?",
+          vlm_clients.gpt4_response_fn("test-key", url=server.url),
+          max_concurrency=2,
+      )
+
+    summary = recorder.summary()
+    self.assertEqual(summary["counters"]["vlm/requests"], 8)
+    self.assertEqual(summary["counters"]["vlm/retries"], 2)
+    self.assertEqual(summary["counters"]["vlm/payload_cache_misses"], 6)
+    self.assertEqual(summary["counters"]["vlm/payload_cache_hits"], 2)
+    self.assertGreater(summary["counters"]["vlm/request_bytes"], 0)
+    self.assertGreater(summary["counters"]["vlm/response_bytes"], 0)
+    self.assertEqual(summary["spans"]["vlm/request"]["count"], 8)
+    self.assertEqual(summary["spans"]["vlm/backoff"]["count"], 2)
+    self.assertEqual(summary["spans"]["tagging/parse"]["count"], 6)
+
+  def test_generation_times_base_and_refiner(self):
+    base, refiner = tiny_pipelines.tiny_sdxl_pipelines()
+    generator = image_generation.SdxlGenerator(
+        base, refiner, num_inference_steps=4, batch_size=2
+    )
+
+    with instrumentation.recording() as recorder:
+      image_generation.save_images(
+          generator.iter_images("a dish", range(3)), self.tmp_dir
+      )
+
+    spans = recorder.summary()["spans"]
+    self.assertEqual(spans["generation/encode_prompt"]["count"], 1)
+    self.assertEqual(spans["generation/base"]["count"], 2)
+    self.assertEqual(spans["generation/refiner"]["count"], 2)
+    self.assertEqual(spans["generation/save_image"]["count"], 3)
+    self.assertEqual(recorder.counters["generation/images"], 3)
+    self.assertEqual(
+        recorder.counters["generation/saved_bytes"],
+        sum(
+            os.path.getsize(os.path.join(self.tmp_dir, f"{seed}.png"))
+            for seed in range(3)
+        ),
+    )
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,150 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Local stand-in for an OpenAI-compatible chat completions endpoint.
+
+Used to test and benchmark the geo-tagging clients without network access or
+API keys. The server answers every request with a fixed geo-tag, and can be
+configured to add latency, to limit the upload bandwidth and to fail requests
+with a given status code.
+"""
+
+import http.server
+import json
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class MockVlmServer:
+  """Chat completions server on localhost, run from a background thread."""
+
+  def __init__(
+      self,
+      response_text: str = 'Asia, India, sari',
+      latency_seconds: float = 0.0,
+      failure_status_codes: Optional[List[int]] = None,
+      retry_after: Optional[str] = None,
+      upload_bytes_per_second: Optional[float] = None,
+  ):
+    """Initializes the server.
+
+    Args:
+      response_text: Content of every successful response.
+      latency_seconds: Time to wait before answering a request.
+      failure_status_codes: Status codes to answer the first requests with,
+        one request per entry, e.g. [429, 503].
+      retry_after: Value of the Retry-After header of failed requests.
+      upload_bytes_per_second: Simulated bandwidth of the client's uplink:
+        requests are answered after the time their body takes to upload at
+        this rate, on top of `latency_seconds`. Unlimited if None.
+    """
+    self.response_text = response_text
+    self.latency_seconds = latency_seconds
+    self.failure_status_codes = list(failure_status_codes or [])
+    self.retry_after = retry_after
+    self.upload_bytes_per_second = upload_bytes_per_second
+    self.requests: List[Dict[str, object]] = []
+    self.num_connections = 0
+    self._lock = threading.Lock()
+    self._server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0), self._handler_class()
+    )
+    self._thread = threading.Thread(
+        target=self._server.serve_forever, daemon=True
+    )
+
+  @property
+  def url(self) -> str:
+    host, port = self._server.server_address[:2]
+    return f'http://{host}:{port}/v1/chat/completions'
+
+  @property
+  def bytes_received(self) -> int:
+    with self._lock:
+      return sum(request['num_bytes'] for request in self.requests)
+
+  def start(self) -> 'MockVlmServer':
+    self._thread.start()
+    return self
+
+  def stop(self) -> None:
+    self._server.shutdown()
+    self._server.server_close()
+    self._thread.join()
+
+  def __enter__(self) -> 'MockVlmServer':
+    return self.start()
+
+  def __exit__(self, *unused_exc_info) -> None:
+    self.stop()
+
+  def _handler_class(self):
+    server = self
+
+    class _Handler(http.server.BaseHTTPRequestHandler):
+      protocol_version = 'HTTP/1.1'  # Keeps connections alive.
+
+      def setup(self):
+        super().setup()
+        # Answers without waiting for the client's ACK of the headers, which
+        # would otherwise stall every request on a kept-alive connection.
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with server._lock:  # pylint: disable=protected-access
+          server.num_connections += 1
+
+      def do_POST(self):  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with server._lock:  # pylint: disable=protected-access
+          server.requests.append({
+              'num_bytes': len(body),
+              'headers': dict(self.headers),
+              'payload': json.loads(body),
+          })
+          status = (
+              server.failure_status_codes.pop(0)
+              if server.failure_status_codes
+              else 200
+          )
+        delay_seconds = server.latency_seconds
+        if server.upload_bytes_per_second:
+          delay_seconds += len(body) / server.upload_bytes_per_second
+        time.sleep(delay_seconds)
+
+        if status == 200:
+          response = {
+              'choices': [{
+                  'message': {
+                      'role': 'assistant',
+                      'content': server.response_text,
+                  }
+              }]
+          }
+        else:
+          response = {'error': {'message': f'Mock error {status}'}}
+        response_body = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response_body)))
+        if status != 200 and server.retry_after is not None:
+          self.send_header('Retry-After', server.retry_after)
+        self.end_headers()
+        self.wfile.write(response_body)
+
+      def log_message(self, *args):
+        pass
+
+    return _Handler
@@ -0,0 +1,343 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Generates the images of several models over their prompts, one at a time.
+
+A sweep takes (model, prompt) jobs in any order and groups them by model, so
+every model is loaded once, generates the images of all of its prompts and is
+freed before the next model is loaded. Only one model is held in memory at a
+time.
+
+The components listed in `SHARED_COMPONENTS` are identified by the pipeline
+they are loaded from, see `ModelSpec.component_sources`. Models are ordered so
+that models loading a component from the same pipeline, e.g. fine-tunes of
+SDXL keeping its VAE, run one after the other, and the component stays loaded
+from one model to the next instead of being freed and loaded again.
+
+A sweep has no memory budget: it never offloads a model, it only frees it
+before loading the next one. The peak memory of each model is reported in its
+`ModelThroughput`. A model that does not fit on the device by itself must be
+offloaded by its loader, e.g. one wrapping `sdxl_loader` that calls the
+pipelines' `enable_model_cpu_offload`.
+"""
+
+import dataclasses
+import gc
+import logging
+import time
+import zlib
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import diffusers
+from PIL import Image
+import torch
+import transformers
+
+from cube_t2i.cultural_diversity import image_generation
+from cube_t2i.cultural_diversity import tiny_pipelines
+
+
+SHARED_COMPONENTS = ('text_encoder_2', 'vae')
+
+_COMPONENT_CLASSES = {
+    'text_encoder_2': transformers.CLIPTextModelWithProjection,
+    'vae': diffusers.AutoencoderKL,
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class ModelSpec:
+  """A text-to-image model of a sweep."""
+
+  # Name of the model in the results, e.g. 'sdxl'.
+  name: str
+  # Hugging Face name or local path of the SDXL base pipeline.
+  base_path: str
+  # Name or path of the refiner pipeline, or None for the base only.
+  refiner_path: Optional[str] = None
+  # Pipelines to load the shared components from, instead of `base_path`.
+  text_encoder_2_path: Optional[str] = None
+  vae_path: Optional[str] = None
+
+  def component_sources(self) -> Dict[str, str]:
+    """Returns the pipeline every shared component is loaded from."""
+    return {
+        'text_encoder_2': self.text_encoder_2_path or self.base_path,
+        'vae': self.vae_path or self.base_path,
+    }
+
+
+# Function from a model and its already loaded shared components, by name, to
+# its base and refiner pipelines.
+PipelineLoader = Callable[
+    [ModelSpec, Dict[str, Any]],
+    Tuple[
+        diffusers.DiffusionPipeline, Optional[diffusers.DiffusionPipeline]
+    ],
+]
+# Function called with the model name, prompt, seed and image of every image.
+ImageCallback = Callable[[str, str, int, Image.Image], None]
+
+
+@dataclasses.dataclass(frozen=True)
+class ModelThroughput:
+  """Time spent loading a model and generating its images."""
+
+  name: str
+  num_prompts: int
+  num_images: int
+  load_seconds: float
+  generation_seconds: float
+  # Peak CUDA memory allocated while the model was loaded, None on CPU.
+  peak_memory_bytes: Optional[int] = None
+
+  @property
+  def images_per_second(self) -> float:
+    if not self.generation_seconds:
+      return 0.0
+    return self.num_images / self.generation_seconds
+
+
+def sdxl_loader(
+    device: str = 'cuda', torch_dtype: torch.dtype = torch.float16
+) -> PipelineLoader:
+  """Returns a loader of SDXL pipelines from Hugging Face or local paths.
+
+  Shared components not given to the loader and not loaded from the base
+  pipeline are loaded from the subfolder of their name in their pipeline.
+
+  Args:
+    device: Device to move the pipelines to.
+    torch_dtype: Data type of the weights.
+  """
+  variant = 'fp16' if torch_dtype == torch.float16 else None
+
+  def load(spec, components):
+    components = dict(components)
+    for name, source in spec.component_sources().items():
+      if name not in components and source != spec.base_path:
+        components[name] = _COMPONENT_CLASSES[name].from_pretrained(
+            source,
+            subfolder=name,
+            torch_dtype=torch_dtype,
+            variant=variant,
+            use_safetensors=True,
+        ).to(device)
+    return image_generation.load_sdxl_pipelines(
+        spec.base_path, spec.refiner_path, device, torch_dtype, components
+    )
+
+  return load
+
+
+def _tiny_seed(path: str) -> int:
+  return zlib.crc32(path.encode('utf-8'))
+
+
+def tiny_loader(
+    spec: ModelSpec, components: Dict[str, Any]
+) -> Tuple[
+    diffusers.DiffusionPipeline, Optional[diffusers.DiffusionPipeline]
+]:
+  """Loads tiny CPU pipelines with random weights, seeded by their paths.
+
+  Models and components with the same paths have the same weights, so sweeps
+  can be run and tested without model weights, see tiny_pipelines.py.
+
+  Args:
+    spec: Model to load.
+    components: Already loaded shared components, by name.
+  """
+  components = dict(components)
+  for name, source in spec.component_sources().items():
+    if name not in components and source != spec.base_path:
+      source_base, _ = tiny_pipelines.tiny_sdxl_pipelines(_tiny_seed(source))
+      components[name] = getattr(source_base, name)
+  base, refiner = tiny_pipelines.tiny_sdxl_pipelines(
+      _tiny_seed(spec.base_path), **components
+  )
+  return base, refiner if spec.refiner_path else None
+
+
+def order_models(models: Sequence[ModelSpec]) -> List[ModelSpec]:
+  """Orders models so that consecutive models share component sources.
+
+  Starting from the first model, the next model is the remaining one loading
+  the most shared components from the same pipelines as the current one, the
+  earliest one on ties.
+
+  Args:
+    models: Models, in their preferred order.
+  """
+  remaining = list(models)
+  ordered = []
+  while remaining:
+    if ordered:
+      current = set(ordered[-1].component_sources().items())
+      next_model = max(
+          remaining,
+          key=lambda m: len(current & set(m.component_sources().items())),
+      )
+    else:
+      next_model = remaining[0]
+    remaining.remove(next_model)
+    ordered.append(next_model)
+  return ordered
+
+
+def plan_sweep(
+    models: Sequence[ModelSpec], jobs: Iterable[Tuple[str, str]]
+) -> List[Tuple[ModelSpec, List[str]]]:
+  """Groups (model name, prompt) jobs by model.
+
+  Args:
+    models: Models of the sweep, with distinct names.
+    jobs: Pairs of model name and prompt to generate images for. Repeated
+      pairs are generated once.
+
+  Returns:
+    A list of models and their prompts, in the order of `order_models`, without
+    the models that have no prompts.
+
+  Raises:
+    ValueError: If model names repeat or a job names an unknown model.
+  """
+  by_name = {model.name: model for model in models}
+  if len(by_name) != len(models):
+    raise ValueError('Model names must be distinct.')
+  prompts = {name: {} for name in by_name}
+  for name, prompt in jobs:
+    if name not in by_name:
+      raise ValueError(f'Unknown model {name!r} in the jobs.')
+    prompts[name][prompt] = None
+  return [
+      (model, list(prompts[model.name]))
+      for model in order_models(models)
+      if prompts[model.name]
+  ]
+
+
+def _free_memory() -> None:
+  gc.collect()
+  if torch.cuda.is_available():
+    torch.cuda.empty_cache()
+
+
+def run_sweep(
+    models: Sequence[ModelSpec],
+    jobs: Iterable[Tuple[str, str]],
+    seeds: Sequence[int],
+    loader: PipelineLoader,
+    on_image: Optional[ImageCallback] = None,
+    negative_prompt: Optional[str] = image_generation.DEFAULT_NEGATIVE_PROMPT,
+    **generator_kwargs,
+) -> List[ModelThroughput]:
+  """Generates the images of every job, loading every model once.
+
+  Args:
+    models: Models of the sweep, with distinct names.
+    jobs: Pairs of model name and prompt to generate images for.
+    seeds: Seeds of the images of every prompt.
+    loader: Function loading the pipelines of a model, e.g. `sdxl_loader()`.
+    on_image: Function called with every image as soon as it is generated. Its
+      time is not counted as generation time.
+    negative_prompt: Negative prompt of every image.
+    **generator_kwargs: Arguments of `image_generation.SdxlGenerator`, e.g.
+      `num_inference_steps` and `batch_size`.
+
+  Returns:
+    The throughput of every model, in the order the models ran.
+  """
+  plan = plan_sweep(models, jobs)
+  # Shared components, by name and source, kept loaded for the next model.
+  resident: Dict[Tuple[str, str], Any] = {}
+  reports = []
+  for i, (spec, prompts) in enumerate(plan):
+    sources = spec.component_sources()
+    components = {
+        name: resident[name, source]
+        for name, source in sources.items()
+        if (name, source) in resident
+    }
+    if torch.cuda.is_available():
+      torch.cuda.reset_peak_memory_stats()
+    start = time.perf_counter()
+    base, refiner = loader(spec, components)
+    load_seconds = time.perf_counter() - start
+    for name, source in sources.items():
+      resident[name, source] = getattr(base, name)
+
+    generator = image_generation.SdxlGenerator(
+        base, refiner, **generator_kwargs
+    )
+    generation_seconds = 0.0
+    num_images = 0
+    for prompt in prompts:
+      images = generator.iter_images(prompt, seeds, negative_prompt)
+      while True:
+        start = time.perf_counter()
+        seeded_image = next(images, None)
+        generation_seconds += time.perf_counter() - start
+        if seeded_image is None:
+          break
+        num_images += 1
+        if on_image is not None:
+          on_image(spec.name, prompt, *seeded_image)
+
+    reports.append(
+        ModelThroughput(
+            name=spec.name,
+            num_prompts=len(prompts),
+            num_images=num_images,
+            load_seconds=load_seconds,
+            generation_seconds=generation_seconds,
+            peak_memory_bytes=(
+                torch.cuda.max_memory_allocated()
+                if torch.cuda.is_available()
+                else None
+            ),
+        )
+    )
+    logging.info(
+        'Model %s: loaded in %.1fs, %d images at %.2f images/s.',
+        spec.name,
+        load_seconds,
+        num_images,
+        reports[-1].images_per_second,
+    )
+
+    # Frees the model, keeping the components the next model loads.
+    del generator, base, refiner, components
+    next_sources = (
+        set(plan[i + 1][0].component_sources().items())
+        if i + 1 < len(plan)
+        else set()
+    )
+    resident = {
+        key: component
+        for key, component in resident.items()
+        if key in next_sources
+    }
+    _free_memory()
+  return reports
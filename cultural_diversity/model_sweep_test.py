@@ -0,0 +1,134 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import unittest
+import weakref
+
+from absl import app
+import numpy as np
+import torch
+
+from cube_t2i.cultural_diversity import image_generation
+from cube_t2i.cultural_diversity import model_sweep
+
+
+_SDXL = model_sweep.ModelSpec("sdxl", "tiny/sdxl", refiner_path="tiny/refiner")
+_FINETUNE = model_sweep.ModelSpec(
+    "finetune", "tiny/finetune", vae_path="tiny/sdxl"
+)
+_OTHER = model_sweep.ModelSpec("other", "tiny/other")
+
+
+class ModelSweepTest(unittest.TestCase):
+  """Test class for model_sweep.py."""
+
+  def setUp(self):
+    super().setUp()
+    self.loaded = []
+    self.pipelines = []
+
+  def _loader(self, spec, components):
+    self.loaded.append((spec.name, sorted(components)))
+    base, refiner = model_sweep.tiny_loader(spec, components)
+    self.pipelines.append(weakref.ref(base.unet))
+    return base, refiner
+
+  def test_plan_groups_jobs_by_model(self):
+    jobs = [
+        ("sdxl", "a sari"),
+        ("other", "a sari"),
+        ("finetune", "a kimono"),
+        ("sdxl", "a kimono"),
+        ("sdxl", "a sari"),
+    ]
+
+    plan = model_sweep.plan_sweep([_SDXL, _OTHER, _FINETUNE], jobs)
+
+    # The fine-tune loads the VAE of sdxl, so it runs right after it.
+    self.assertEqual(
+        [(model.name, prompts) for model, prompts in plan],
+        [
+            ("sdxl", ["a sari", "a kimono"]),
+            ("finetune", ["a kimono"]),
+            ("other", ["a sari"]),
+        ],
+    )
+    with self.assertRaisesRegex(ValueError, "Unknown model"):
+      model_sweep.plan_sweep([_SDXL], [("dalle", "a sari")])
+
+  def test_sweep_loads_every_model_once(self):
+    images = {}
+
+    def on_image(name, prompt, seed, image):
+      images[name, prompt, seed] = image
+
+    jobs = [
+        (name, prompt)
+        for prompt in ("a sari", "a kimono")
+        for name in ("other", "sdxl", "finetune")
+    ]
+    reports = model_sweep.run_sweep(
+        [_SDXL, _FINETUNE, _OTHER],
+        jobs,
+        seeds=[0, 1, 2],
+        loader=self._loader,
+        on_image=on_image,
+        num_inference_steps=2,
+        batch_size=2,
+    )
+
+    # The VAE of sdxl stays loaded for the fine-tune.
+    self.assertEqual(
+        self.loaded, [("sdxl", []), ("finetune", ["vae"]), ("other", [])]
+    )
+    self.assertEqual([r.name for r in reports], ["sdxl", "finetune", "other"])
+    for report in reports:
+      self.assertEqual(report.num_prompts, 2)
+      self.assertEqual(report.num_images, 6)
+      self.assertGreater(report.images_per_second, 0)
+    self.assertEqual(len(images), 18)
+    # Models are freed once they are done.
+    self.assertTrue(all(unet() is None for unet in self.pipelines))
+
+    # The images are those of a generator of the model alone.
+    base, refiner = model_sweep.tiny_loader(_SDXL, {})
+    expected = image_generation.SdxlGenerator(
+        base, refiner, num_inference_steps=2
+    ).generate("a kimono", [1])[0]
+    np.testing.assert_allclose(
+        np.asarray(images["sdxl", "a kimono", 1], dtype=np.float32),
+        np.asarray(expected, dtype=np.float32),
+        atol=2,
+    )
+
+  def test_tiny_loader_shares_components_by_source(self):
+    sdxl, _ = model_sweep.tiny_loader(_SDXL, {})
+    finetune, _ = model_sweep.tiny_loader(_FINETUNE, {})
+
+    def weights(pipeline, name):
+      return torch.cat(
+          [p.flatten() for p in getattr(pipeline, name).parameters()]
+      )
+
+    self.assertTrue(torch.equal(weights(sdxl, "vae"), weights(finetune, "vae")))
+    self.assertFalse(
+        torch.equal(
+            weights(sdxl, "text_encoder_2"), weights(finetune, "text_encoder_2")
+        )
+    )
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,234 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Vendi scores updated one image at a time, with early stopping.
+
+The scorers keep the similarity structure of the images seen so far and update
+it with every new image, so the Vendi score of all images is available after
+each addition without rebuilding the n x n similarity matrix:
+
+  `OnlineLabelVendi` keeps the counts of distinct labels and the similarity
+    matrix of distinct labels, which gains a row per new label (see
+    `vendi_utils.categorical_vendi_score`). A score costs O(T^3) for T distinct
+    labels, or O(T) with a single level of non-zero weight.
+  `OnlineEmbeddingVendi` keeps the Gram matrix of the normalized embeddings,
+    which gains a row per image, while there are at most `dim` images, and
+    X^T X, updated by a rank-one product per image, after. A score costs
+    O(min(n, dim)^3).
+
+Both stop early once the score has stabilized: generating more images for the
+prompt would not change its diversity.
+"""
+
+import abc
+from typing import Any, Dict, Hashable, Iterable, List, Tuple, Union
+
+import numpy as np
+
+from cube_t2i.cultural_diversity import embedding_diversity
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+class _OnlineVendi(abc.ABC):
+  """Score history and early stopping shared by the online scorers."""
+
+  def __init__(
+      self,
+      q: Union[float, str] = 1,
+      tolerance: float = 0.01,
+      patience: int = 8,
+      min_images: int = 16,
+  ):
+    """Initializes the scorer.
+
+    Args:
+      q: Order of the Vendi score.
+      tolerance: Relative change of the score below which it is stable.
+      patience: Number of consecutive additions the score must stay within
+        `tolerance` of the latest score to have converged.
+      min_images: Minimum number of images before convergence.
+    """
+    self._q = q
+    self._tolerance = tolerance
+    self._patience = patience
+    self._min_images = min_images
+    self.num_images = 0
+    self.history: List[float] = []
+
+  @abc.abstractmethod
+  def _eigenvalues(self) -> np.ndarray:
+    """Returns the eigenvalues of the similarity matrix of the images."""
+
+  def _record_score(self) -> float:
+    score = float(np.exp(vendi_utils.entropy_q(self._eigenvalues(), self._q)))
+    self.history.append(score)
+    return score
+
+  @property
+  def score(self) -> float:
+    """The Vendi score of all images added so far."""
+    if not self.history:
+      raise ValueError('Cannot compute the Vendi score of zero images.')
+    return self.history[-1]
+
+  def has_converged(self) -> bool:
+    """Whether the score stayed stable over the last `patience` additions."""
+    if self.num_images < max(self._min_images, self._patience + 1):
+      return False
+    recent = np.asarray(self.history[-self._patience - 1 :])
+    return bool(
+        np.all(np.abs(recent - recent[-1]) <= self._tolerance * recent[-1])
+    )
+
+
+class OnlineLabelVendi(_OnlineVendi):
+  """Online Vendi score of geo-tagging labels."""
+
+  def __init__(
+      self,
+      weights: Tuple[float, ...] = vendi_utils.DEFAULT_WEIGHTS,
+      is_global: bool = True,
+      **kwargs,
+  ):
+    """Initializes the scorer.
+
+    Args:
+      weights: Non-negative weights of the (continent, country, artifact)
+        equalities.
+      is_global: Whether the labels are for global prompts, see
+        `vendi_utils.encode_labels`.
+      **kwargs: Arguments of the early stopping, see `_OnlineVendi`.
+    """
+    super().__init__(**kwargs)
+    weights = np.asarray(weights, dtype=np.float64)
+    if np.any(weights < 0):
+      raise ValueError(f'Weights must be non-negative, got {weights}.')
+    self._levels = np.flatnonzero(weights)
+    self._weights = weights[self._levels]
+    self._is_global = is_global
+    self._groups: Dict[Tuple[Hashable, ...], int] = {}
+    self._counts = np.zeros(0)
+    # Similarity of distinct labels, grown by doubling its capacity.
+    self._similarity = np.zeros((0, 0))
+
+  def _group(self, label: vendi_utils.Label) -> Tuple[Hashable, ...]:
+    if self._is_global:
+      values = tuple(label[key] for key in vendi_utils.LABEL_KEYS)
+    else:
+      values = (vendi_utils.whole_label(label), None, None)
+    return tuple(values[level] for level in self._levels)
+
+  def add(self, label: vendi_utils.Label) -> float:
+    """Adds the label of an image and returns the updated score."""
+    group = self._group(label)
+    index = self._groups.get(group)
+    if index is None:
+      index = len(self._groups)
+      self._groups[group] = index
+      if index == len(self._counts):
+        capacity = max(1, 2 * index)
+        counts = np.zeros(capacity)
+        counts[:index] = self._counts
+        similarity = np.zeros((capacity, capacity))
+        similarity[:index, :index] = self._similarity
+        self._counts, self._similarity = counts, similarity
+      for other, other_index in self._groups.items():
+        self._similarity[index, other_index] = self._similarity[
+            other_index, index
+        ] = sum(w for w, a, b in zip(self._weights, group, other) if a == b)
+    self._counts[index] += 1
+    self.num_images += 1
+    return self._record_score()
+
+  def _eigenvalues(self) -> np.ndarray:
+    num_groups = len(self._groups)
+    counts = self._counts[:num_groups]
+    if not len(self._levels):
+      return np.ones(1)  # All similarities are zero.
+    if len(self._levels) == 1:
+      return self._weights[0] * counts / self.num_images
+    root_counts = np.sqrt(counts)
+    return np.linalg.eigvalsh(
+        self._similarity[:num_groups, :num_groups]
+        * np.outer(root_counts, root_counts)
+        / self.num_images
+    )
+
+
+class OnlineEmbeddingVendi(_OnlineVendi):
+  """Online Vendi score of image embeddings with a cosine kernel."""
+
+  def __init__(self, dim: int, **kwargs):
+    """Initializes the scorer.
+
+    Args:
+      dim: Dimension of the embeddings.
+      **kwargs: Arguments of the early stopping, see `_OnlineVendi`.
+    """
+    super().__init__(**kwargs)
+    self._dim = dim
+    self._embeddings = np.zeros((0, dim))
+    self._gram = np.zeros((0, 0))
+    self._covariance = np.zeros((dim, dim))
+
+  def add(self, embedding: np.ndarray) -> float:
+    """Adds the embedding of an image and returns the updated score."""
+    embedding = embedding_diversity.normalize_embeddings(
+        np.asarray(embedding).reshape(self._dim)
+    )
+    n = self.num_images
+    self._covariance += np.outer(embedding, embedding)
+    if n < self._dim:
+      if n == len(self._embeddings):
+        capacity = min(max(1, 2 * n), self._dim)
+        embeddings = np.zeros((capacity, self._dim))
+        embeddings[:n] = self._embeddings[:n]
+        gram = np.zeros((capacity, capacity))
+        gram[:n, :n] = self._gram[:n, :n]
+        self._embeddings, self._gram = embeddings, gram
+      self._embeddings[n] = embedding
+      row = self._embeddings[: n + 1] @ embedding
+      self._gram[n, : n + 1] = self._gram[: n + 1, n] = row
+    self.num_images += 1
+    return self._record_score()
+
+  def _eigenvalues(self) -> np.ndarray:
+    n = self.num_images
+    if n <= self._dim:
+      return np.linalg.eigvalsh(self._gram[:n, :n] / n)
+    return np.linalg.eigvalsh(self._covariance / n)
+
+
+def score_until_converged(
+    items: Iterable[Any], scorer: Union[OnlineLabelVendi, OnlineEmbeddingVendi]
+) -> float:
+  """Adds items to `scorer` until its score converges or `items` run out.
+
+  `items` is consumed lazily, so when it generates and tags images on demand,
+  e.g. from `SdxlGenerator.iter_images`, no image is generated after the
+  score has converged (beyond the current generation batch).
+
+  Args:
+    items: Labels or embeddings of images, in generation order.
+    scorer: Online scorer to add them to.
+
+  Returns:
+    The score of the images added. `scorer.num_images` is their number.
+  """
+  for item in items:
+    scorer.add(item)
+    if scorer.has_converged():
+      break
+  return scorer.score
@@ -0,0 +1,108 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import random
+import unittest
+
+from absl import app
+import numpy as np
+
+from cube_t2i.cultural_diversity import embedding_diversity
+from cube_t2i.cultural_diversity import online_vendi
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+def _random_labels(num_images, seed=0):
+  rng = random.Random(seed)
+  return [
+      {
+          "continent": rng.choice(["Asia", "Europe"]),
+          "country": rng.choice(["India", "Japan", "France"]),
+          "artifact": rng.choice(["sari", "kimono", "beret", "kurta"]),
+      }
+      for _ in range(num_images)
+  ]
+
+
+class OnlineVendiTest(unittest.TestCase):
+  """Test class for online_vendi.py."""
+
+  def test_label_scores_match_batch_scores(self):
+    labels = _random_labels(40)
+    for weights, is_global in (
+        ((1.0, 0.0, 0.0), True),
+        ((0.5, 0.3, 0.2), True),
+        ((0.0, 0.0, 0.0), True),
+        ((1.0, 0.0, 0.0), False),
+    ):
+      with self.subTest(weights=weights, is_global=is_global):
+        scorer = online_vendi.OnlineLabelVendi(weights, is_global)
+        for n, label in enumerate(labels, start=1):
+          self.assertAlmostEqual(
+              scorer.add(label),
+              vendi_utils.vendi_score_from_labels(
+                  labels[:n], weights, is_global
+              ),
+          )
+        self.assertEqual(scorer.num_images, 40)
+
+  def test_embedding_scores_match_batch_scores(self):
+    embeddings = np.random.default_rng(0).normal(size=(12, 5))
+    scorer = online_vendi.OnlineEmbeddingVendi(dim=5)
+
+    for n, embedding in enumerate(embeddings, start=1):
+      self.assertAlmostEqual(
+          scorer.add(embedding),
+          embedding_diversity.embedding_vendi_score(embeddings[:n]),
+      )
+    self.assertAlmostEqual(
+        scorer.score, embedding_diversity.embedding_vendi_score(embeddings)
+    )
+
+  def test_stops_once_the_score_is_stable(self):
+    scorer = online_vendi.OnlineLabelVendi(
+        tolerance=0.01, patience=4, min_images=8
+    )
+    consumed = []
+
+    def _labels():
+      for label in _random_labels(1000):
+        consumed.append(label)
+        yield label
+
+    score = online_vendi.score_until_converged(_labels(), scorer)
+
+    self.assertTrue(scorer.has_converged())
+    self.assertEqual(scorer.num_images, len(consumed))
+    self.assertLess(scorer.num_images, 1000)
+    # The score of the two continents is close to 2.
+    self.assertAlmostEqual(score, 2, delta=0.1)
+    recent = scorer.history[-5:]
+    self.assertLessEqual(max(recent) - min(recent), 0.02 * score)
+
+  def test_does_not_stop_before_min_images(self):
+    scorer = online_vendi.OnlineLabelVendi(patience=2, min_images=10)
+    same = {"continent": "Asia", "country": "India", "artifact": "sari"}
+
+    online_vendi.score_until_converged([same] * 20, scorer)
+
+    self.assertEqual(scorer.num_images, 10)
+    self.assertEqual(scorer.score, 1)
+    with self.assertRaises(ValueError):
+      _ = online_vendi.OnlineLabelVendi().score
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,322 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Generates, geo-tags and scores the images of a prompt as a stream.
+
+The notebook generates all images, then tags all of them, then scores the
+labels, so the VLM idles during generation and the generator during tagging.
+Here the three stages run concurrently and are connected by bounded queues:
+
+  generator thread -> images -> tagging threads -> labels -> scorer
+
+Every image is tagged as soon as it is generated, without a round trip through
+a PNG file, and every chunk of `batch_size` consecutive labels is scored as soon
+as it is complete. The bounded queues make a fast generator wait for the VLM
+instead of holding all images in memory. With an `AnnotationCache`, images
+whose response is cached, keyed by their pixels, are not sent to the VLM.
+
+Image saving and chunk scoring are timed as spans of instrumentation.py, next to
+the generation and VLM spans of the threads.
+"""
+
+import dataclasses
+import os
+import queue
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+from PIL import Image
+
+from cube_t2i.cultural_diversity import annotation_cache
+from cube_t2i.cultural_diversity import geo_tagging
+from cube_t2i.cultural_diversity import instrumentation
+from cube_t2i.cultural_diversity import vendi_utils
+from cube_t2i.cultural_diversity import vlm_clients
+
+
+# Seconds between checks for a failure of another stage while blocked on a
+# full or empty queue.
+_POLL_SECONDS = 0.1
+
+
+class StreamingDiversityScorer:
+  """Scores chunks of labels as soon as they are complete.
+
+  Labels may arrive in any order. A chunk is scored once all of its labels are
+  known, and the final score equals `vendi_utils.calculate_cultural_diversity`
+  of the labels in index order.
+  """
+
+  def __init__(
+      self,
+      num_images: int,
+      weights: Sequence[float] = vendi_utils.DEFAULT_WEIGHTS,
+      is_global: bool = True,
+      batch_size: int = 8,
+      q: Union[float, str] = 1,
+  ):
+    """Initializes the scorer.
+
+    Args:
+      num_images: Number of images of the prompt. Only the images kept by
+        `vendi_utils.truncate_to_scored` are scored.
+      weights: Weights of the (continent, country, artifact) equalities.
+      is_global: Whether the prompt is global or within-culture.
+      batch_size: Number of images per chunk.
+      q: Order of the Vendi score.
+    """
+    self._num_scored = len(vendi_utils.truncate_to_scored(range(num_images)))
+    self._weights = weights
+    self._is_global = is_global
+    self._batch_size = batch_size
+    self._q = q
+    self._labels: Dict[int, vendi_utils.Label] = {}
+    self.chunk_scores: List[float] = []
+
+  def _score_chunk(self, start: int, end: int) -> None:
+    with instrumentation.span('scoring/chunk', images=end - start):
+      codes = vendi_utils.encode_labels(
+          [self._labels[i] for i in range(start, end)], self._is_global
+      )
+      mask = np.ones((1, len(codes)), dtype=bool)
+      score = vendi_utils.masked_vendi_scores(
+          codes[None], mask, self._weights, self._q
+      )[0]
+    self.chunk_scores.append(float(score) / self._batch_size)
+
+  def add(self, index: int, label: vendi_utils.Label) -> None:
+    """Adds the label of image `index` and scores the chunks it completes."""
+    self._labels[index] = label
+    while True:
+      start = len(self.chunk_scores) * self._batch_size
+      end = start + self._batch_size
+      if end > self._num_scored or any(
+          i not in self._labels for i in range(start, end)
+      ):
+        return
+      self._score_chunk(start, end)
+
+  def score(self) -> float:
+    """Returns the mean normalized Vendi score over chunks.
+
+    Raises:
+      ValueError: If a label to score is missing.
+    """
+    missing = [i for i in range(self._num_scored) if i not in self._labels]
+    if missing:
+      raise ValueError(f'Missing labels of images {missing}.')
+    start = len(self.chunk_scores) * self._batch_size
+    if start < self._num_scored:
+      self._score_chunk(start, self._num_scored)
+    return float(np.mean(self.chunk_scores)) if self.chunk_scores else np.nan
+
+
+@dataclasses.dataclass
+class EvaluationResult:
+  """Annotations and diversity of the images of a prompt."""
+
+  # Annotations in the order the images were generated, in the format of
+  # `all_annotations` in cultural_diversity.ipynb.
+  annotations: List[Dict[str, Any]]
+  # Normalized Vendi score of every chunk.
+  chunk_scores: List[float]
+  # Mean of `chunk_scores`.
+  diversity: float
+
+
+class _Failure:
+  """Carries an exception of a worker thread to the scorer."""
+
+  def __init__(self, error: BaseException):
+    self.error = error
+
+
+_DONE = object()
+
+
+def _put(items: queue.Queue, item: Any, stop: threading.Event) -> bool:
+  """Puts `item`, unless `stop` is set first. Returns whether it was put."""
+  while not stop.is_set():
+    try:
+      items.put(item, timeout=_POLL_SECONDS)
+      return True
+    except queue.Full:
+      pass
+  return False
+
+
+def evaluate_images(
+    images: Iterable[Tuple[int, Image.Image]],
+    num_images: int,
+    question: str,
+    vlm_fn: vlm_clients.VlmFn,
+    weights: Sequence[float] = vendi_utils.DEFAULT_WEIGHTS,
+    is_global: bool = True,
+    batch_size: int = 8,
+    q: Union[float, str] = 1,
+    max_concurrency: int = 8,
+    requests_per_second: Optional[float] = None,
+    max_retries: int = 5,
+    initial_backoff: float = 1.0,
+    queue_size: Optional[int] = None,
+    output_dir: Optional[str] = None,
+    on_annotation: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    cache: Optional[annotation_cache.AnnotationCache] = None,
+    vlm_name: Optional[str] = None,
+) -> EvaluationResult:
+  """Tags and scores images while they are being generated.
+
+  Args:
+    images: `(seed, image)` pairs, e.g. from `SdxlGenerator.iter_images`. The
+      iterable is consumed by a background thread.
+    num_images: Number of pairs in `images`.
+    question: Question to ask about every image, see
+      `geo_tagging.geo_tagging_question`.
+    vlm_fn: VLM client, see vlm_clients.py.
+    weights: Weights of the (continent, country, artifact) equalities.
+    is_global: Whether the prompt is global or within-culture.
+    batch_size: Number of images per Vendi chunk.
+    q: Order of the Vendi score.
+    max_concurrency: Number of tagging threads, i.e. of requests in flight.
+    requests_per_second: Maximum sustained request rate, including retries.
+      Unlimited if None.
+    max_retries: Number of retries of a failed request.
+    initial_backoff: Backoff before the first retry, in seconds.
+    queue_size: Maximum number of generated images waiting to be tagged, and of
+      labels waiting to be scored. Defaults to `2 * max_concurrency`.
+    output_dir: If given, images are also saved there as `<seed>.png`.
+    on_annotation: Called with the index and the annotation of every image as
+      soon as it is tagged, from the calling thread, e.g. to write results
+      incrementally.
+    cache: Cache of VLM responses to read from and write to, see
+      `geo_tagging.tag_image`.
+    vlm_name: Name of the VLM, part of the cache key. Required with `cache`.
+
+  Returns:
+    The annotations of the images and their diversity.
+
+  Raises:
+    ValueError: If `images` does not hold `num_images` images, or `cache` is
+      given without `vlm_name`.
+    Exception: The first error raised by the generator, the VLM or the parsing
+      of its responses. The other stages are stopped.
+  """
+  if cache is not None and not vlm_name:
+    raise ValueError('A vlm_name is required to cache annotations.')
+  queue_size = queue_size or 2 * max_concurrency
+  image_queue = queue.Queue(maxsize=queue_size)
+  label_queue = queue.Queue(maxsize=queue_size)
+  stop = threading.Event()
+  rate_limiter = (
+      geo_tagging.TokenBucket(requests_per_second)
+      if requests_per_second
+      else None
+  )
+  if output_dir is not None:
+    os.makedirs(output_dir, exist_ok=True)
+
+  def _generate():
+    try:
+      for index, (seed, image) in enumerate(images):
+        if output_dir is not None:
+          image_path = os.path.join(output_dir, f'{seed}.png')
+          with instrumentation.span('generation/save_image'):
+            image.save(image_path)
+          instrumentation.count(
+              'generation/saved_bytes', os.path.getsize(image_path)
+          )
+        if not _put(image_queue, (index, seed, image), stop):
+          return
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      _put(label_queue, _Failure(e), stop)
+    for _ in range(max_concurrency):
+      if not _put(image_queue, _DONE, stop):
+        return
+
+  def _tag():
+    while not stop.is_set():
+      try:
+        item = image_queue.get(timeout=_POLL_SECONDS)
+      except queue.Empty:
+        continue
+      if item is _DONE:
+        _put(label_queue, _DONE, stop)
+        return
+      index, seed, image = item
+      try:
+        label = geo_tagging.tag_image(
+            image,
+            question,
+            vlm_fn,
+            cache,
+            vlm_name,
+            max_retries=max_retries,
+            initial_backoff=initial_backoff,
+            rate_limiter=rate_limiter,
+        )
+        annotation = {'image_name': f'{seed}.png', 'label': label}
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        _put(label_queue, _Failure(e), stop)
+        return
+      _put(label_queue, (index, annotation), stop)
+
+  threads = [threading.Thread(target=_generate, daemon=True)] + [
+      threading.Thread(target=_tag, daemon=True)
+      for _ in range(max_concurrency)
+  ]
+  for thread in threads:
+    thread.start()
+
+  scorer = StreamingDiversityScorer(
+      num_images, weights, is_global, batch_size, q
+  )
+  annotations = {}
+  num_done = 0
+  try:
+    while num_done < max_concurrency:
+      item = label_queue.get()
+      if item is _DONE:
+        num_done += 1
+      elif isinstance(item, _Failure):
+        raise item.error
+      else:
+        index, annotation = item
+        annotations[index] = annotation
+        scorer.add(index, annotation['label'])
+        if on_annotation is not None:
+          on_annotation(index, annotation)
+  finally:
+    stop.set()
+    for thread in threads:
+      thread.join()
+
+  if len(annotations) != num_images:
+    raise ValueError(f'Expected {num_images} images, got {len(annotations)}.')
+  return EvaluationResult(
+      annotations=[annotations[i] for i in range(num_images)],
+      chunk_scores=scorer.chunk_scores,
+      diversity=scorer.score(),
+  )
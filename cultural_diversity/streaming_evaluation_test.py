@@ -0,0 +1,221 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+
+from absl import app
+from PIL import Image
+
+from cube_t2i.cultural_diversity import annotation_cache
+from cube_t2i.cultural_diversity import mock_vlm_server
+from cube_t2i.cultural_diversity import streaming_evaluation
+from cube_t2i.cultural_diversity import vendi_utils
+from cube_t2i.cultural_diversity import vlm_clients
+
+_COUNTRIES = (
+    ("Asia", "India", "sari"),
+    ("Asia", "Japan", "kimono"),
+    ("Europe", "France", "beret"),
+    ("Africa", "Nigeria", "agbada"),
+)
+
+
+def _images(num_images, delay_seconds=0.0, events=None):
+  """Yields images whose red channel encodes the country to tag them with."""
+  for seed in range(num_images):
+    time.sleep(delay_seconds)
+    if events is not None:
+      events.append(("generated", seed))
+    yield seed, Image.new("RGB", (8, 8), color=(seed * 7 % 4, 0, 0))
+
+
+def _color_vlm(events=None, delay_seconds=0.0):
+  lock = threading.Lock()
+
+  def _vlm(image, unused_question):
+    time.sleep(delay_seconds)
+    if events is not None:
+      with lock:
+        events.append(("tagged", None))
+    return ",".join(_COUNTRIES[image.getpixel((0, 0))[0]])
+
+  return _vlm
+
+
+def _labels(num_images):
+  return [
+      dict(zip(vendi_utils.LABEL_KEYS, _COUNTRIES[seed * 7 % 4]))
+      for seed in range(num_images)
+  ]
+
+
+class StreamingDiversityScorerTest(unittest.TestCase):
+  """Test class for StreamingDiversityScorer."""
+
+  def test_matches_calculate_cultural_diversity(self):
+    for num_images in (5, 16, 20, 30, 40):
+      with self.subTest(num_images=num_images):
+        labels = _labels(num_images)
+        scorer = streaming_evaluation.StreamingDiversityScorer(
+            num_images, weights=(0.5, 0.3, 0.2)
+        )
+        order = list(range(num_images))
+        random.Random(num_images).shuffle(order)
+        for index in order:
+          scorer.add(index, labels[index])
+
+        self.assertAlmostEqual(
+            scorer.score(),
+            vendi_utils.calculate_cultural_diversity(
+                labels, weights=(0.5, 0.3, 0.2)
+            ),
+        )
+
+  def test_scores_chunks_as_soon_as_complete(self):
+    labels = _labels(20)
+    scorer = streaming_evaluation.StreamingDiversityScorer(20, batch_size=8)
+    for index in range(1, 8):
+      scorer.add(index, labels[index])
+    self.assertEqual(scorer.chunk_scores, [])
+
+    scorer.add(0, labels[0])
+    self.assertEqual(len(scorer.chunk_scores), 1)
+
+    with self.assertRaises(ValueError):
+      scorer.score()
+
+
+class EvaluateImagesTest(unittest.TestCase):
+  """Test class for evaluate_images."""
+
+  def test_annotations_and_diversity(self):
+    tagged = []
+    annotations = streaming_evaluation.evaluate_images(
+        _images(20),
+        20,
+        "question",
+        _color_vlm(),
+        max_concurrency=4,
+        on_annotation=lambda index, annotation: tagged.append(index),
+    )
+
+    self.assertEqual(
+        [annotation["image_name"] for annotation in annotations.annotations],
+        [f"{seed}.png" for seed in range(20)],
+    )
+    self.assertEqual(
+        [annotation["label"] for annotation in annotations.annotations],
+        _labels(20),
+    )
+    self.assertEqual(sorted(tagged), list(range(20)))
+    self.assertEqual(len(annotations.chunk_scores), 3)
+    self.assertAlmostEqual(
+        annotations.diversity,
+        vendi_utils.calculate_cultural_diversity(_labels(20)),
+    )
+
+  def test_tags_images_while_generating(self):
+    events = []
+    streaming_evaluation.evaluate_images(
+        _images(10, delay_seconds=0.02, events=events),
+        10,
+        "question",
+        _color_vlm(events, delay_seconds=0.01),
+        max_concurrency=2,
+    )
+
+    first_tagged = events.index(("tagged", None))
+    self.assertLess(first_tagged, events.index(("generated", 9)))
+
+  def test_saves_images_on_request(self):
+    with tempfile.TemporaryDirectory() as output_dir:
+      streaming_evaluation.evaluate_images(
+          _images(3), 3, "question", _color_vlm(), output_dir=output_dir
+      )
+
+      self.assertEqual(
+          sorted(os.listdir(output_dir)), ["0.png", "1.png", "2.png"]
+      )
+
+  def test_raises_errors_of_other_stages(self):
+    def _failing_images():
+      yield from _images(3)
+      raise RuntimeError("out of memory")
+
+    with self.assertRaisesRegex(RuntimeError, "out of memory"):
+      streaming_evaluation.evaluate_images(
+          _failing_images(), 5, "question", _color_vlm()
+      )
+    with self.assertRaises(ValueError):
+      streaming_evaluation.evaluate_images(
+          _images(40), 40, "question", lambda *_: "not a geo-tag"
+      )
+    with self.assertRaises(ValueError):
+      streaming_evaluation.evaluate_images(
+          _images(3), 4, "question", _color_vlm()
+      )
+
+  def test_reuses_cached_annotations(self):
+    calls = []
+
+    def _counting_vlm(image, question):
+      calls.append(image.getpixel((0, 0)))
+      return _color_vlm()(image, question)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+      cache_path = os.path.join(cache_dir, "annotations.sqlite")
+      for _ in range(2):
+        with annotation_cache.AnnotationCache(cache_path) as cache:
+          result = streaming_evaluation.evaluate_images(
+              _images(8),
+              8,
+              "question",
+              _counting_vlm,
+              max_concurrency=1,
+              cache=cache,
+              vlm_name="color",
+          )
+
+    # 8 images of 4 colors, tagged once over both runs.
+    self.assertEqual(len(calls), 4)
+    self.assertEqual(
+        [annotation["label"] for annotation in result.annotations],
+        _labels(8),
+    )
+    with self.assertRaises(ValueError):
+      streaming_evaluation.evaluate_images(
+          _images(1), 1, "question", _color_vlm(), cache=cache
+      )
+
+  def test_sends_images_in_memory(self):
+    with mock_vlm_server.MockVlmServer() as server:
+      result = streaming_evaluation.evaluate_images(
+          _images(8),
+          8,
+          "question",
+          vlm_clients.gpt4_response_fn("test-key", url=server.url),
+      )
+
+    self.assertEqual(len(server.requests), 8)
+    self.assertAlmostEqual(result.diversity, 1 / 8)
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
@@ -0,0 +1,153 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Generates the images of every prompt with every model of a sweep.
+
+Every model is loaded once and freed before the next, see model_sweep.py.
+Images are saved to <output_dir>/<model>/<prompt index>/<seed>.png, and the
+throughput of every model to <output_dir>/throughput.json.
+
+Example usage:
+
+  BASE=stabilityai/stable-diffusion-xl-base-1.0
+  REFINER=stabilityai/stable-diffusion-xl-refiner-1.0
+  python3 sweep_models.py --model=sdxl=$BASE,$REFINER --model=sdxl_base=$BASE \
+      --prompts_path=prompts.txt --num_images=16 --output_dir=outs/sweep
+
+  # Tiny random pipelines on CPU, e.g. to check a sweep end to end.
+  python3 sweep_models.py --tiny --model=a=tiny/a --model=b=tiny/b \
+      --prompts_path=prompts.txt --num_images=4 --output_dir=/tmp/sweep
+"""
+
+import dataclasses
+import json
+import os
+
+from absl import app
+from absl import flags
+
+from cube_t2i.cultural_diversity import image_generation
+from cube_t2i.cultural_diversity import model_sweep
+
+
+_MODELS = flags.DEFINE_multi_string(
+    name='model',
+    default=None,
+    help='Model as <name>=<base path>[,<refiner path>]. Can be repeated.',
+    required=True,
+)
+_PROMPTS_PATH = flags.DEFINE_string(
+    name='prompts_path',
+    default=None,
+    help='Text file with one prompt per line, generated by every model.',
+    required=True,
+)
+_VAE_PATH = flags.DEFINE_string(
+    name='vae_path',
+    default=None,
+    help=(
+        'If set, pipeline whose VAE all models use, loaded once for the whole'
+        ' sweep.'
+    ),
+)
+_NUM_IMAGES = flags.DEFINE_integer(
+    name='num_images', default=16, help='Number of images, with seeds 0..n-1.'
+)
+_BATCH_SIZE = flags.DEFINE_integer(
+    name='batch_size', default=4, help='Number of images per pipeline call.'
+)
+_NUM_INFERENCE_STEPS = flags.DEFINE_integer(
+    name='num_inference_steps', default=40, help='Number of denoising steps.'
+)
+_DEVICE = flags.DEFINE_string(
+    name='device', default='cuda:0', help='Device to generate images on.'
+)
+_TINY = flags.DEFINE_bool(
+    name='tiny',
+    default=False,
+    help='Whether to load tiny random pipelines on CPU instead of the models.',
+)
+_OUTPUT_DIR = flags.DEFINE_string(
+    name='output_dir',
+    default=None,
+    help='Directory to save the images and the throughput report to.',
+    required=True,
+)
+
+
+def parse_model(value: str) -> model_sweep.ModelSpec:
+  """Parses a --model flag value."""
+  name, _, paths = value.partition('=')
+  base_path, _, refiner_path = paths.partition(',')
+  if not name or not base_path:
+    raise ValueError(
+        f'Expected <name>=<base path>[,<refiner path>], got {value!r}.'
+    )
+  return model_sweep.ModelSpec(
+      name=name,
+      base_path=base_path,
+      refiner_path=refiner_path or None,
+      vae_path=_VAE_PATH.value,
+  )
+
+
+def main(_):
+  models = [parse_model(value) for value in _MODELS.value]
+  with open(_PROMPTS_PATH.value, 'r') as f:
+    prompts = [line.strip() for line in f if line.strip()]
+  prompt_indices = {prompt: i for i, prompt in enumerate(prompts)}
+
+  def on_image(name, prompt, seed, image):
+    image_generation.save_images(
+        [(seed, image)],
+        os.path.join(_OUTPUT_DIR.value, name, str(prompt_indices[prompt])),
+    )
+
+  reports = model_sweep.run_sweep(
+      models,
+      [(model.name, prompt) for model in models for prompt in prompts],
+      seeds=range(_NUM_IMAGES.value),
+      loader=(
+          model_sweep.tiny_loader
+          if _TINY.value
+          else model_sweep.sdxl_loader(_DEVICE.value)
+      ),
+      on_image=on_image,
+      num_inference_steps=_NUM_INFERENCE_STEPS.value,
+      batch_size=_BATCH_SIZE.value,
+  )
+  with open(os.path.join(_OUTPUT_DIR.value, 'throughput.json'), 'w') as f:
+    json.dump(
+        [
+            dict(
+                dataclasses.asdict(report),
+                images_per_second=report.images_per_second,
+            )
+            for report in reports
+        ],
+        f,
+        indent=2,
+    )
+  for report in reports:
+    print(
+        f'{report.name}: {report.num_images} images in'
+        f' {report.generation_seconds:.1f}s'
+        f' ({report.images_per_second:.2f} images/s), loaded in'
+        f' {report.load_seconds:.1f}s'
+    )
+
+
+if __name__ == '__main__':
+  app.run(main)
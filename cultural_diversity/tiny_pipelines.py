@@ -0,0 +1,183 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tiny, randomly initialized SDXL base and refiner pipelines.
+
+Used to test and benchmark image generation on CPU without downloading model
+weights. The pipelines have the structure of stable-diffusion-xl-base-1.0 and
+stable-diffusion-xl-refiner-1.0 (two text encoders, size and aesthetic
+conditioning, a refiner sharing `text_encoder_2` and the VAE of the base), with
+a few layers of a few channels each, and generate 32x32 noise images.
+"""
+
+import json
+import os
+import tempfile
+from typing import Optional, Tuple
+
+import diffusers
+import torch
+import transformers
+
+
+IMAGE_SIZE = 32
+
+_TEXT_EMBEDDING_DIM = 32
+_TIME_EMBEDDING_DIM = 8
+
+
+def _bytes_to_unicode():
+  """The byte to unicode character table of CLIP's byte-level BPE."""
+  byte_values = (
+      list(range(ord('!'), ord('~') + 1))
+      + list(range(ord('¡'), ord('¬') + 1))
+      + list(range(ord('®'), ord('ÿ') + 1))
+  )
+  characters = byte_values[:]
+  n = 0
+  for b in range(256):
+    if b not in byte_values:
+      byte_values.append(b)
+      characters.append(256 + n)
+      n += 1
+  return [chr(c) for c in characters]
+
+
+def tiny_tokenizer() -> transformers.CLIPTokenizer:
+  """Returns a CLIP tokenizer with one token per byte and no merges."""
+  characters = _bytes_to_unicode()
+  tokens = ['<|startoftext|>', '<|endoftext|>'] + characters + [
+      f'{c}</w>' for c in characters
+  ]
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    vocab_path = os.path.join(tmp_dir, 'vocab.json')
+    merges_path = os.path.join(tmp_dir, 'merges.txt')
+    with open(vocab_path, 'w') as f:
+      json.dump({token: i for i, token in enumerate(tokens)}, f)
+    with open(merges_path, 'w') as f:
+      f.write('#version: 0.2\n')
+    return transformers.CLIPTokenizer(
+        vocab_path, merges_path, model_max_length=16, pad_token='<|endoftext|>'
+    )
+
+
+def _text_encoder_config(vocab_size):
+  return transformers.CLIPTextConfig(
+      bos_token_id=0,
+      eos_token_id=1,
+      pad_token_id=1,
+      hidden_size=_TEXT_EMBEDDING_DIM,
+      intermediate_size=37,
+      num_attention_heads=4,
+      num_hidden_layers=2,
+      max_position_embeddings=16,
+      vocab_size=vocab_size,
+      projection_dim=_TEXT_EMBEDDING_DIM,
+  )
+
+
+def _unet(cross_attention_dim, num_time_ids):
+  return diffusers.UNet2DConditionModel(
+      block_out_channels=(16, 32),
+      layers_per_block=1,
+      sample_size=IMAGE_SIZE // 2,
+      in_channels=4,
+      out_channels=4,
+      down_block_types=('DownBlock2D', 'CrossAttnDownBlock2D'),
+      up_block_types=('CrossAttnUpBlock2D', 'UpBlock2D'),
+      attention_head_dim=(2, 4),
+      use_linear_projection=True,
+      addition_embed_type='text_time',
+      addition_time_embed_dim=_TIME_EMBEDDING_DIM,
+      projection_class_embeddings_input_dim=(
+          num_time_ids * _TIME_EMBEDDING_DIM + _TEXT_EMBEDDING_DIM
+      ),
+      cross_attention_dim=cross_attention_dim,
+      norm_num_groups=1,
+  )
+
+
+def _scheduler():
+  return diffusers.EulerDiscreteScheduler(
+      beta_start=0.00085,
+      beta_end=0.012,
+      beta_schedule='scaled_linear',
+      steps_offset=1,
+      timestep_spacing='leading',
+  )
+
+
+def tiny_sdxl_pipelines(
+    seed: int = 0,
+    text_encoder_2: Optional[transformers.CLIPTextModelWithProjection] = None,
+    vae: Optional[diffusers.AutoencoderKL] = None,
+) -> Tuple[
+    diffusers.StableDiffusionXLPipeline,
+    diffusers.StableDiffusionXLImg2ImgPipeline,
+]:
+  """Returns a tiny SDXL base pipeline and its refiner, on CPU.
+
+  Args:
+    seed: Seed of the random weights.
+    text_encoder_2: Second text encoder to use instead of a new one, e.g. of
+      other tiny pipelines.
+    vae: VAE to use instead of a new one.
+  """
+  torch.manual_seed(seed)
+  tokenizer = tiny_tokenizer()
+  text_encoder = transformers.CLIPTextModel(
+      _text_encoder_config(len(tokenizer))
+  )
+  if text_encoder_2 is None:
+    text_encoder_2 = transformers.CLIPTextModelWithProjection(
+        _text_encoder_config(len(tokenizer))
+    )
+  if vae is None:
+    vae = diffusers.AutoencoderKL(
+        block_out_channels=(16, 32),
+        in_channels=3,
+        out_channels=3,
+        down_block_types=('DownEncoderBlock2D',) * 2,
+        up_block_types=('UpDecoderBlock2D',) * 2,
+        latent_channels=4,
+        norm_num_groups=1,
+        sample_size=IMAGE_SIZE,
+    )
+  base = diffusers.StableDiffusionXLPipeline(
+      vae=vae,
+      text_encoder=text_encoder,
+      text_encoder_2=text_encoder_2,
+      tokenizer=tokenizer,
+      tokenizer_2=tokenizer,
+      # Original size, crop offset and target size, 2 values each.
+      unet=_unet(2 * _TEXT_EMBEDDING_DIM, num_time_ids=6),
+      scheduler=_scheduler(),
+      add_watermarker=False,
+  )
+  refiner = diffusers.StableDiffusionXLImg2ImgPipeline(
+      vae=vae,
+      text_encoder=None,
+      text_encoder_2=text_encoder_2,
+      tokenizer=None,
+      tokenizer_2=tokenizer,
+      # Original size, crop offset and aesthetic score.
+      unet=_unet(_TEXT_EMBEDDING_DIM, num_time_ids=5),
+      scheduler=_scheduler(),
+      requires_aesthetics_score=True,
+      add_watermarker=False,
+  )
+  base.set_progress_bar_config(disable=True)
+  refiner.set_progress_bar_config(disable=True)
+  return base, refiner
@@ -0,0 +1,152 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Compares the batched Vendi engine with per-chunk `vendi_score` calls.
+
+Also compares the group-count Vendi score of all images of a global prompt with
+the eigendecomposition of the full similarity matrix, and times bootstrap
+confidence intervals.
+
+Example usage:
+
+  python3 vendi_benchmark.py --num_prompts 1000 --num_images 16 \
+      --num_global_images 20000
+"""
+
+import random
+import time
+
+from absl import app
+from absl import flags
+import numpy as np
+from vendi_score import vendi
+
+from cube_t2i.cultural_diversity import diversity_bootstrap
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+_NUM_PROMPTS = flags.DEFINE_integer(
+    name='num_prompts', default=1000, help='Number of prompts to score.'
+)
+_NUM_IMAGES = flags.DEFINE_integer(
+    name='num_images', default=16, help='Number of images per prompt.'
+)
+_NUM_BASELINE_PROMPTS = flags.DEFINE_integer(
+    name='num_baseline_prompts',
+    default=100,
+    help='Number of prompts to time the per-chunk baseline on.',
+)
+_NUM_GLOBAL_IMAGES = flags.DEFINE_integer(
+    name='num_global_images',
+    default=20000,
+    help='Number of images of the global prompt scored without chunking.',
+)
+_NUM_BASELINE_GLOBAL_IMAGES = flags.DEFINE_integer(
+    name='num_baseline_global_images',
+    default=2000,
+    help='Number of images to time the full eigendecomposition on.',
+)
+_NUM_RESAMPLES = flags.DEFINE_integer(
+    name='num_resamples',
+    default=2000,
+    help='Number of bootstrap resamples per prompt.',
+)
+
+
+def _random_label_lists(num_prompts, num_images, seed=0):
+  rng = random.Random(seed)
+  return [
+      [
+          {
+              'continent': rng.choice(['Asia', 'Europe', 'Africa']),
+              'country': rng.choice(['India', 'Japan', 'France', 'Nigeria']),
+              'artifact': rng.choice(['sari', 'kimono', 'jeans', 'kurta']),
+          }
+          for _ in range(num_images)
+      ]
+      for _ in range(num_prompts)
+  ]
+
+
+def _baseline_diversity(labels, similarity_function, batch_size=8):
+  """The notebook's per-chunk computation."""
+  if len(labels) < 32:
+    labels = labels[:24]
+  all_vendi = []
+  for i in range(0, len(labels), batch_size):
+    samples = [
+        (item['continent'], item['country'], item['artifact'])
+        for item in labels[i : i + batch_size]
+    ]
+    all_vendi.append(vendi.score(samples, similarity_function) / batch_size)
+  return np.array(all_vendi).mean()
+
+
+def main(_):
+  label_lists = _random_label_lists(_NUM_PROMPTS.value, _NUM_IMAGES.value)
+  similarity_function = lambda a, b: 1 * int(a[0] == b[0])
+
+  baseline_lists = label_lists[: _NUM_BASELINE_PROMPTS.value]
+  start = time.perf_counter()
+  for labels in baseline_lists:
+    _baseline_diversity(labels, similarity_function)
+  baseline_seconds = (
+      (time.perf_counter() - start) / len(baseline_lists) * len(label_lists)
+  )
+
+  start = time.perf_counter()
+  vendi_utils.calculate_cultural_diversity_batch(label_lists)
+  batched_seconds = time.perf_counter() - start
+
+  print(
+      f'{len(label_lists)} prompts x {_NUM_IMAGES.value} images:'
+      f' per-chunk vendi_score {baseline_seconds * 1000:.1f} ms (extrapolated),'
+      f' batched {batched_seconds * 1000:.1f} ms'
+      f' ({baseline_seconds / batched_seconds:.0f}x)'
+  )
+
+  weights = (0.5, 0.3, 0.2)
+  global_labels = _random_label_lists(1, _NUM_GLOBAL_IMAGES.value)[0]
+  codes = vendi_utils.encode_labels(
+      global_labels[: _NUM_BASELINE_GLOBAL_IMAGES.value]
+  )
+  start = time.perf_counter()
+  vendi.score_K(vendi_utils.label_similarity_matrices(codes, weights))
+  full_seconds = time.perf_counter() - start
+
+  start = time.perf_counter()
+  vendi_utils.vendi_score_from_labels(global_labels, weights)
+  group_count_seconds = time.perf_counter() - start
+  print(
+      f'Global prompt: full eigendecomposition of {len(codes)} images'
+      f' {full_seconds * 1000:.1f} ms, group counts of {len(global_labels)}'
+      f' images {group_count_seconds * 1000:.1f} ms'
+  )
+
+  for mode in diversity_bootstrap.MODES:
+    start = time.perf_counter()
+    interval = diversity_bootstrap.bootstrap_cultural_diversity(
+        label_lists[0], num_resamples=_NUM_RESAMPLES.value, mode=mode
+    )
+    print(
+        f'{mode.capitalize()} interval of one prompt from'
+        f' {_NUM_RESAMPLES.value} resamples of {_NUM_IMAGES.value} images:'
+        f' [{interval.lower:.3f}, {interval.upper:.3f}] in'
+        f' {(time.perf_counter() - start) * 1000:.1f} ms'
+    )
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,435 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Vectorized Vendi scores over geo-tagging labels.
+
+Labels are (continent, country, artifact) annotations of generated images. The
+hierarchical similarity of Section 5 of https://arxiv.org/abs/2407.06863 is a
+weighted sum of per-level label equalities, e.g. for the weights (1, 0, 0):
+
+  similarity_function = lambda a, b: 1 * int(a[0] == b[0]) + 0 * ...
+
+Instead of calling such a function for every pair of images, labels are encoded
+as integer codes per level, the similarity matrices of all chunks are built with
+NumPy broadcasting and their eigenvalues are computed in one batched call. The
+scores match `vendi_score.vendi.score` with the equivalent similarity function.
+
+For scoring all images of a prompt at once, `categorical_vendi_score` computes
+the exact score from the counts of distinct labels, without building the
+n x n similarity matrix.
+
+Given per-image quality scores, e.g. from image_quality.py, chunks are scored
+with the quality-weighted Vendi score of https://arxiv.org/abs/2405.17805: the
+mean quality of the images of the chunk times its Vendi score.
+"""
+
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from cube_t2i.cultural_diversity import instrumentation
+
+LABEL_KEYS = ('continent', 'country', 'artifact')
+# Weights of the (continent, country, artifact) equalities used in the paper.
+DEFAULT_WEIGHTS = (1.0, 0.0, 0.0)
+
+Label = Union[Mapping[str, str], Hashable]
+
+
+def whole_label(label: Label) -> Hashable:
+  """Returns a label as one hashable value, e.g. to compare whole labels."""
+  if isinstance(label, Mapping):
+    return tuple(label.get(key) for key in LABEL_KEYS)
+  return label
+
+
+def _encode_column(values: Sequence[Hashable]) -> List[int]:
+  vocabulary: Dict[Hashable, int] = {}
+  return [vocabulary.setdefault(value, len(vocabulary)) for value in values]
+
+
+def encode_labels(
+    labels: Sequence[Label], is_global: bool = True
+) -> np.ndarray:
+  """Encodes labels as integer codes, one column per similarity level.
+
+  Args:
+    labels: Labels with 'continent', 'country' and 'artifact' keys.
+    is_global: Whether the labels are for global prompts, in which case every
+      level is compared separately. Otherwise only whole labels are compared,
+      see `calculate_cultural_diversity`.
+
+  Returns:
+    An int array of shape [len(labels), 3]. Two labels have equal codes in a
+    column if and only if their values at that level are equal.
+  """
+  codes = np.zeros((len(labels), len(LABEL_KEYS)), dtype=np.int64)
+  if is_global:
+    for level, key in enumerate(LABEL_KEYS):
+      codes[:, level] = _encode_column([label[key] for label in labels])
+  else:
+    # Within-culture prompts compare whole labels at the first level only, as
+    # in the notebook's `(item, None, None)` samples.
+    codes[:, 0] = _encode_column([whole_label(label) for label in labels])
+  return codes
+
+
+def label_similarity_matrices(
+    codes: np.ndarray, weights: Sequence[float] = DEFAULT_WEIGHTS
+) -> np.ndarray:
+  """Builds hierarchical similarity matrices from label codes.
+
+  Args:
+    codes: Int array of shape [..., n, num_levels] from `encode_labels`.
+    weights: Weight of the equality at each level.
+
+  Returns:
+    A float array of shape [..., n, n] with entries
+    sum_l weights[l] * (codes[..., i, l] == codes[..., j, l]).
+  """
+  equal = codes[..., :, None, :] == codes[..., None, :, :]
+  return equal @ np.asarray(weights, dtype=np.float64)
+
+
+def entropy_q(eigenvalues: np.ndarray, q: Union[float, str] = 1) -> np.ndarray:
+  """Computes the Renyi entropy of order q over the last axis.
+
+  Args:
+    eigenvalues: Array of shape [..., n] of eigenvalues of normalized kernels.
+      Zero or negative values (from padding or round-off) are ignored.
+    q: Order of the entropy, a non-negative number or 'inf'.
+
+  Returns:
+    An array of shape [...] with the entropies.
+  """
+  positive = eigenvalues > 0
+  p = np.where(positive, eigenvalues, 1.0)
+  if q == 1:
+    return -np.sum(np.where(positive, p * np.log(p), 0.0), axis=-1)
+  if q == 'inf':
+    return -np.log(np.max(eigenvalues, axis=-1))
+  return np.log(np.sum(np.where(positive, p**q, 0.0), axis=-1)) / (1 - q)
+
+
+def vendi_scores_from_kernels(
+    kernels: np.ndarray,
+    sizes: Union[np.ndarray, Sequence[int], None] = None,
+    q: Union[float, str] = 1,
+) -> np.ndarray:
+  """Computes the Vendi scores of a batch of similarity matrices.
+
+  Args:
+    kernels: Array of shape [batch, n, n] of similarity matrices. Kernels of
+      fewer than n samples must be zero-padded, which adds zero eigenvalues
+      that do not change the score.
+    sizes: Number of samples in each kernel, defaults to n.
+    q: Order of the Vendi score.
+
+  Returns:
+    An array of shape [batch] with the Vendi scores.
+  """
+  kernels = np.asarray(kernels, dtype=np.float64)
+  if sizes is None:
+    sizes = np.full(kernels.shape[:-2], kernels.shape[-1])
+  sizes = np.asarray(sizes, dtype=np.float64)
+  eigenvalues = np.linalg.eigvalsh(kernels / sizes[..., None, None])
+  return np.exp(entropy_q(eigenvalues, q))
+
+
+def chunk_label_codes(
+    codes: np.ndarray, lengths: Sequence[int], batch_size: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """Splits runs of label codes into zero-padded chunks of `batch_size` labels.
+
+  Args:
+    codes: Int array of shape [n, num_levels] from `encode_labels`, holding
+      the labels of consecutive runs (e.g. prompts).
+    lengths: Number of labels in each run, adding up to n.
+    batch_size: Number of labels per chunk. The last chunk of a run may be
+      shorter.
+
+  Returns:
+    A tuple of the chunk codes of shape [num_chunks, batch_size, num_levels],
+    a boolean mask of shape [num_chunks, batch_size] marking real labels, and
+    the index of the run of each chunk, of shape [num_chunks].
+  """
+  lengths = np.asarray(lengths, dtype=np.int64)
+  chunks_per_run = -(-lengths // batch_size)
+  num_chunks = int(chunks_per_run.sum())
+  run_starts = np.cumsum(lengths) - lengths
+  chunk_starts = np.cumsum(chunks_per_run) - chunks_per_run
+
+  # Position of every label within its run, and from that within its chunk.
+  run_ids = np.repeat(np.arange(len(lengths)), lengths)
+  offsets = np.arange(len(codes)) - run_starts[run_ids]
+  chunk_ids = chunk_starts[run_ids] + offsets // batch_size
+
+  chunk_codes = np.zeros((num_chunks, batch_size, codes.shape[-1]), codes.dtype)
+  mask = np.zeros((num_chunks, batch_size), dtype=bool)
+  chunk_codes[chunk_ids, offsets % batch_size] = codes
+  mask[chunk_ids, offsets % batch_size] = True
+  return chunk_codes, mask, np.repeat(np.arange(len(lengths)), chunks_per_run)
+
+
+def masked_vendi_scores(
+    chunk_codes: np.ndarray,
+    mask: np.ndarray,
+    weights: Sequence[float] = DEFAULT_WEIGHTS,
+    q: Union[float, str] = 1,
+) -> np.ndarray:
+  """Computes the Vendi scores of zero-padded chunks of label codes.
+
+  Args:
+    chunk_codes: Int array of shape [..., batch_size, num_levels].
+    mask: Boolean array of shape [..., batch_size] marking real labels.
+    weights: Weight of the equality at each level.
+    q: Order of the Vendi score.
+
+  Returns:
+    An array of shape [...] with the Vendi score of each chunk.
+  """
+  kernels = label_similarity_matrices(chunk_codes, weights)
+  kernels *= mask[..., :, None] & mask[..., None, :]
+  return vendi_scores_from_kernels(kernels, mask.sum(axis=-1), q)
+
+
+def categorical_vendi_score(
+    codes: np.ndarray,
+    weights: Sequence[float] = DEFAULT_WEIGHTS,
+    q: Union[float, str] = 1,
+) -> float:
+  """Computes the exact Vendi score of a weighted label-equality kernel.
+
+  Images with the same codes at every level of non-zero weight have identical
+  rows in the similarity matrix K, so K = P M P^T, where P maps the n images to
+  their T distinct labels and M is the T x T similarity of distinct labels.
+  The non-zero eigenvalues of K / n are those of D^1/2 M D^1/2 / n, where D
+  holds the label counts. With a single level of non-zero weight w, M = w * I
+  and the eigenvalues are simply w * counts / n.
+
+  Args:
+    codes: Int array of shape [n, num_levels] from `encode_labels`.
+    weights: Non-negative weight of the equality at each level.
+    q: Order of the Vendi score.
+
+  Returns:
+    The Vendi score, equal to `vendi_score.vendi.score` with the similarity
+    function `lambda a, b: sum(w * int(x == y) for w, x, y in zip(weights, a,
+    b))`, in O(n log n + T^3) instead of O(n^3) time.
+
+  Raises:
+    ValueError: If `codes` is empty or a weight is negative.
+  """
+  weights = np.asarray(weights, dtype=np.float64)
+  if not len(codes):
+    raise ValueError('Cannot compute the Vendi score of zero labels.')
+  if np.any(weights < 0):
+    raise ValueError(f'Weights must be non-negative, got {weights}.')
+
+  levels = np.flatnonzero(weights)
+  if not levels.size:
+    return 1.0  # All similarities are zero.
+  groups, counts = np.unique(codes[:, levels], axis=0, return_counts=True)
+  if levels.size == 1:
+    eigenvalues = weights[levels[0]] * counts / len(codes)
+  else:
+    group_similarity = label_similarity_matrices(groups, weights[levels])
+    root_counts = np.sqrt(counts)
+    eigenvalues = np.linalg.eigvalsh(
+        group_similarity * np.outer(root_counts, root_counts) / len(codes)
+    )
+  return float(np.exp(entropy_q(eigenvalues, q)))
+
+
+def vendi_score_from_labels(
+    labels: Sequence[Label],
+    weights: Sequence[float] = DEFAULT_WEIGHTS,
+    is_global: bool = True,
+    q: Union[float, str] = 1,
+) -> float:
+  """Computes the exact Vendi score of all labels at once.
+
+  Unlike `calculate_cultural_diversity`, labels are not split into chunks, so
+  this scales to evaluations with tens of thousands of images.
+
+  Args:
+    labels: Labels of the generated images, see `encode_labels`.
+    weights: Non-negative weights of the (continent, country, artifact)
+      equalities.
+    is_global: Whether the labels are for global prompts.
+    q: Order of the Vendi score.
+
+  Returns:
+    The (unnormalized) Vendi score of the labels.
+  """
+  return categorical_vendi_score(encode_labels(labels, is_global), weights, q)
+
+
+def truncate_to_scored(items: Sequence[Any]) -> Sequence[Any]:
+  """Returns the items of the images of a prompt that are scored.
+
+  Runs of fewer than 32 images are evaluated on (at most) 24 images, as in the
+  paper's evaluation.
+
+  Args:
+    items: Labels, embeddings or quality scores of the images of a prompt.
+  """
+  if len(items) < 32:
+    return items[:24]
+  return items
+
+
+def chunk_mean_qualities(
+    quality_lists: Sequence[Sequence[float]],
+    lengths: Sequence[int],
+    batch_size: int,
+) -> np.ndarray:
+  """Averages the quality scores of the images of every chunk.
+
+  Args:
+    quality_lists: For each run, the quality scores of its images, truncated
+      like its labels.
+    lengths: Number of images in each run, as passed to `chunk_label_codes`.
+    batch_size: Number of images per chunk.
+
+  Returns:
+    An array of shape [num_chunks] with the mean quality of each chunk, in the
+    order of the chunks of `chunk_label_codes`.
+
+  Raises:
+    ValueError: If a run has a different number of scores than images.
+  """
+  quality_lengths = [len(qualities) for qualities in quality_lists]
+  if quality_lengths != list(lengths):
+    raise ValueError(
+        f'Expected {list(lengths)} quality scores per run, got'
+        f' {quality_lengths}.'
+    )
+  qualities = np.concatenate(
+      [np.asarray(q, dtype=np.float64) for q in quality_lists]
+      + [np.zeros(0)]
+  )
+  chunk_qualities, mask, _ = chunk_label_codes(
+      qualities[:, None], lengths, batch_size
+  )
+  return chunk_qualities[..., 0].sum(axis=-1) / mask.sum(axis=-1)
+
+
+def calculate_cultural_diversity_batch(
+    label_lists: Sequence[Sequence[Label]],
+    weights: Sequence[float] = DEFAULT_WEIGHTS,
+    is_global: bool = True,
+    batch_size: int = 8,
+    q: Union[float, str] = 1,
+    quality_lists: Optional[Sequence[Sequence[float]]] = None,
+) -> np.ndarray:
+  """Calculates the cultural diversity of many prompts at once.
+
+  The chunks of all prompts are scored with a single batched eigenvalue
+  computation.
+
+  Args:
+    label_lists: For each prompt, the labels of its generated images.
+    weights: Weights of the (continent, country, artifact) equalities.
+    is_global: Whether the prompts are global (True) or within-culture (False).
+    batch_size: Number of images per chunk.
+    q: Order of the Vendi score.
+    quality_lists: For each prompt, the quality scores of its images. If
+      given, chunks are scored with the quality-weighted Vendi score.
+
+  Returns:
+    An array with the mean normalized Vendi score of each prompt, NaN for
+    prompts without labels.
+  """
+  label_lists = [truncate_to_scored(labels) for labels in label_lists]
+  num_prompts = len(label_lists)
+  lengths = [len(labels) for labels in label_lists]
+  if quality_lists is not None:
+    quality_lists = [
+        truncate_to_scored(qualities) for qualities in quality_lists
+    ]
+    chunk_qualities = chunk_mean_qualities(quality_lists, lengths, batch_size)
+  if not any(lengths):
+    return np.full(num_prompts, np.nan)
+
+  with instrumentation.span('scoring/vendi', prompts=num_prompts):
+    # Codes are only compared within a chunk, so all prompts share
+    # vocabularies.
+    codes = encode_labels(
+        [label for labels in label_lists for label in labels], is_global
+    )
+    chunk_codes, mask, prompt_ids = chunk_label_codes(
+        codes, lengths, batch_size
+    )
+    normalized_scores = (
+        masked_vendi_scores(chunk_codes, mask, weights, q) / batch_size
+    )
+  if quality_lists is not None:
+    normalized_scores *= chunk_qualities
+  totals = np.bincount(prompt_ids, normalized_scores, minlength=num_prompts)
+  counts = np.bincount(prompt_ids, minlength=num_prompts)
+  with np.errstate(invalid='ignore', divide='ignore'):
+    return totals / counts
+
+
+def calculate_cultural_diversity(
+    labels: Sequence[Label],
+    weights: Sequence[float] = DEFAULT_WEIGHTS,
+    is_global: bool = True,
+    batch_size: int = 8,
+    q: Union[float, str] = 1,
+    qualities: Optional[Sequence[float]] = None,
+) -> float:
+  """Calculates normalized Vendi scores from labels over chunks of images.
+
+  Equivalent to the notebook's `calculate_cultural_diversity` with the
+  similarity function
+  `lambda a, b: sum(w * int(x == y) for w, x, y in zip(weights, a, b))`.
+
+  Args:
+    labels: Labels of the generated images, dictionaries with 'continent',
+      'country' and 'artifact' keys.
+    weights: Weights of the (continent, country, artifact) equalities.
+    is_global: Boolean to control if 'country' and 'continent' should be
+      compared separately. True indicates global prompts, False indicates
+      within-culture prompts, for which only whole labels are compared.
+    batch_size: Number of images per chunk. Scores are normalized by it.
+    q: Order of the Vendi score.
+    qualities: Quality score of every image. If given, chunks are scored with
+      the quality-weighted Vendi score.
+
+  Returns:
+    The mean of the normalized Vendi scores over chunks.
+  """
+  return float(
+      calculate_cultural_diversity_batch(
+          [labels],
+          weights,
+          is_global,
+          batch_size,
+          q,
+          None if qualities is None else [qualities],
+      )[0]
+  )
@@ -0,0 +1,194 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import random
+import unittest
+
+from absl import app
+import numpy as np
+from vendi_score import vendi
+
+from cube_t2i.cultural_diversity import vendi_utils
+
+
+def _random_labels(num_labels, seed=0):
+  rng = random.Random(seed)
+  countries = {
+      "Asia": ["India", "Japan"],
+      "Europe": ["France", "Italy", "Turkey"],
+      "Africa": ["Nigeria"],
+  }
+  labels = []
+  for _ in range(num_labels):
+    continent = rng.choice(sorted(countries))
+    labels.append({
+        "continent": continent,
+        "country": rng.choice(countries[continent]),
+        "artifact": rng.choice(["sari", "kimono", "jeans", "kurta"]),
+    })
+  return labels
+
+
+def _reference_diversity(labels, weights, is_global=True, batch_size=8):
+  """The notebook's calculate_cultural_diversity on top of vendi_score."""
+  similarity_function = lambda a, b: sum(
+      w * int(x == y) for w, x, y in zip(weights, a, b)
+  )
+  if len(labels) < 32:
+    labels = labels[:24]
+  chunks = [labels[i : i + batch_size] for i in range(0, len(labels), batch_size)]
+  all_vendi = []
+  for chunk in chunks:
+    if is_global:
+      samples = [
+          (item["continent"], item["country"], item["artifact"])
+          for item in chunk
+      ]
+    else:
+      samples = [(item, None, None) for item in chunk]
+    all_vendi.append(vendi.score(samples, similarity_function) / batch_size)
+  return np.array(all_vendi).mean()
+
+
+class VendiUtilsTest(unittest.TestCase):
+  """Test class for vendi_utils.py."""
+
+  def test_encode_labels(self):
+    labels = _random_labels(10)
+
+    codes = vendi_utils.encode_labels(labels)
+
+    self.assertEqual(codes.shape, (10, 3))
+    for i in range(10):
+      for j in range(10):
+        for level, key in enumerate(vendi_utils.LABEL_KEYS):
+          self.assertEqual(
+              codes[i, level] == codes[j, level],
+              labels[i][key] == labels[j][key],
+          )
+
+  def test_matches_vendi_score(self):
+    """Test parity with vendi_score for several weights and run lengths."""
+    for weights in [(1, 0, 0), (0.5, 0.3, 0.2), (0, 0, 1)]:
+      for num_labels in [5, 16, 24, 30, 37, 64]:
+        labels = _random_labels(num_labels, seed=num_labels)
+        with self.subTest(weights=weights, num_labels=num_labels):
+          self.assertAlmostEqual(
+              vendi_utils.calculate_cultural_diversity(labels, weights),
+              _reference_diversity(labels, weights),
+              places=10,
+          )
+
+  def test_matches_vendi_score_within_culture(self):
+    labels = _random_labels(16)
+
+    self.assertAlmostEqual(
+        vendi_utils.calculate_cultural_diversity(labels, is_global=False),
+        _reference_diversity(labels, (1, 0, 0), is_global=False),
+        places=10,
+    )
+
+  def test_extreme_diversity(self):
+    """Test that identical labels score 1/batch_size and distinct ones 1."""
+    same = [{"continent": "Asia", "country": "India", "artifact": "sari"}] * 8
+    distinct = [
+        {"continent": f"c{i}", "country": f"k{i}", "artifact": f"a{i}"}
+        for i in range(8)
+    ]
+
+    self.assertAlmostEqual(
+        vendi_utils.calculate_cultural_diversity(same), 1 / 8
+    )
+    self.assertAlmostEqual(
+        vendi_utils.calculate_cultural_diversity(distinct), 1.0
+    )
+
+  def test_batch_matches_single_prompts(self):
+    label_lists = [_random_labels(n, seed=n) for n in [16, 0, 40, 7]]
+
+    scores = vendi_utils.calculate_cultural_diversity_batch(
+        label_lists, (0.6, 0.3, 0.1)
+    )
+
+    self.assertTrue(np.isnan(scores[1]))
+    for i in [0, 2, 3]:
+      self.assertAlmostEqual(
+          scores[i],
+          _reference_diversity(label_lists[i], (0.6, 0.3, 0.1)),
+          places=10,
+      )
+
+  def test_categorical_vendi_score_matches_vendi_score(self):
+    """Test the group-count score against the full eigendecomposition."""
+    labels = _random_labels(60)
+    samples = [
+        (item["continent"], item["country"], item["artifact"])
+        for item in labels
+    ]
+    for weights in [
+        (1, 0, 0),
+        (0, 0, 1),
+        (0.2, 0.8, 0),
+        (0.5, 0.3, 0.2),
+        (0, 0, 0),
+    ]:
+      similarity_function = lambda a, b, w=weights: sum(
+          wi * int(x == y) for wi, x, y in zip(w, a, b)
+      )
+      for q in [0.5, 1, 2, "inf"]:
+        if q != 1 and not any(weights):
+          continue  # vendi_score takes log(0) here.
+        expected = vendi.score(samples, similarity_function, q=q)
+        with self.subTest(weights=weights, q=q):
+          # For q < 1, vendi_score's round-off eigenvalues of ~1e-17 add up
+          # to a relative error of ~1e-7.
+          self.assertAlmostEqual(
+              vendi_utils.vendi_score_from_labels(labels, weights, q=q),
+              expected,
+              delta=1e-6 * expected,
+          )
+
+  def test_categorical_vendi_score_counts(self):
+    """Test the closed form for a single level: exp of the count entropy."""
+    codes = np.array([[0, 0, 0]] * 3 + [[1, 0, 0]])
+
+    score = vendi_utils.categorical_vendi_score(codes, (1, 0, 0))
+
+    p = np.array([0.75, 0.25])
+    self.assertAlmostEqual(score, np.exp(-np.sum(p * np.log(p))))
+
+  def test_categorical_vendi_score_invalid_inputs(self):
+    with self.assertRaises(ValueError):
+      vendi_utils.categorical_vendi_score(np.zeros((0, 3), int))
+    with self.assertRaises(ValueError):
+      vendi_utils.categorical_vendi_score(np.zeros((2, 3), int), (1, -1, 0))
+
+  def test_vendi_scores_from_kernels_orders(self):
+    """Test Vendi scores of other orders against vendi_score."""
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(6, 4))
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    kernel = x @ x.T
+    for q in [0.5, 1, 2, "inf"]:
+      with self.subTest(q=q):
+        self.assertAlmostEqual(
+            vendi_utils.vendi_scores_from_kernels(kernel[None], q=q)[0],
+            vendi.score_K(kernel, q=q),
+            places=8,
+        )
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))
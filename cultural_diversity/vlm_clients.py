@@ -0,0 +1,292 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Clients for the VLMs used to geo-tag generated images.
+
+Each client is a function `(image, question) -> response text`, matching
+`get_gemini_response` and `get_gpt4_response` of cultural_diversity.ipynb. The
+image is the path to an image file or an in-memory PIL image.
+Errors that may go away on retry (rate limiting, server errors and dropped
+connections) are raised as `RetryableError`, so callers can back off and retry.
+
+The GPT-4 client reuses keep-alive connections from a pooled session, and can
+downscale and re-encode images as JPEG before upload: a 1024x1024 SDXL PNG is
+several megabytes once base64-encoded, while the VLM sees at most a few hundred
+pixels per side. Encoded images are cached, so retries and repeated questions
+about an image do not re-encode it.
+
+Requests are timed as 'vlm/request' spans of instrumentation.py, and the bytes
+sent and received and the payload cache hits are counted.
+"""
+
+import base64
+import collections
+import io
+import mimetypes
+import os
+import threading
+from typing import Any, Callable, Mapping, Optional, Tuple, Union
+
+from PIL import Image
+import requests
+from requests import adapters
+
+from cube_t2i.cultural_diversity import annotation_cache
+from cube_t2i.cultural_diversity import instrumentation
+
+
+OPENAI_CHAT_COMPLETIONS_URL = 'https://api.openai.com/v1/chat/completions'
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+ImageInput = Union[str, Image.Image]
+VlmFn = Callable[[ImageInput, str], str]
+
+
+class RetryableError(Exception):
+  """A VLM request failed with an error that may go away on retry."""
+
+  def __init__(self, message: str, retry_after: Optional[float] = None):
+    """Initializes the error.
+
+    Args:
+      message: Description of the error.
+      retry_after: Time in seconds the server asked to wait before retrying.
+    """
+    super().__init__(message)
+    self.retry_after = retry_after
+
+
+def _retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+  """Returns the Retry-After header in seconds, if it is given as a number."""
+  try:
+    return float(headers['Retry-After'])
+  except (KeyError, ValueError):
+    return None
+
+
+def encode_image(
+    image: ImageInput,
+    max_side: Optional[int] = None,
+    jpeg_quality: Optional[int] = None,
+) -> Tuple[bytes, str]:
+  """Encodes an image for upload.
+
+  Args:
+    image: Path to the image, or the image. In-memory images are encoded as PNG
+      unless they are resized or `jpeg_quality` is given.
+    max_side: Maximum width and height. Larger images are downscaled, keeping
+      their aspect ratio. Not resized if None.
+    jpeg_quality: JPEG quality to re-encode the image with, from 1 to 95.
+      Re-encoded only if the image is resized or `jpeg_quality` is given, with
+      quality 90 by default.
+
+  Returns:
+    The encoded image and its MIME type.
+  """
+  output = io.BytesIO()
+  if max_side is None and jpeg_quality is None:
+    if not isinstance(image, str):
+      image.save(output, format='PNG')
+      return output.getvalue(), 'image/png'
+    with open(image, 'rb') as image_file:
+      mime_type, _ = mimetypes.guess_type(image)
+      return image_file.read(), mime_type or 'image/jpeg'
+
+  # `convert` copies the image, so in-memory images are not resized in place.
+  if isinstance(image, str):
+    image = Image.open(image)
+  image = image.convert('RGB')
+  if max_side is not None and max(image.size) > max_side:
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+  image.save(output, format='JPEG', quality=jpeg_quality or 90)
+  return output.getvalue(), 'image/jpeg'
+
+
+class ImagePayloadCache:
+  """Thread-safe LRU cache of base64 data URLs of encoded images.
+
+  Image files are keyed by their path, size and modification time, so an
+  overwritten image is encoded again. In-memory images are keyed by the hash
+  of their pixels, see `annotation_cache.image_digest`.
+  """
+
+  def __init__(
+      self,
+      max_side: Optional[int] = None,
+      jpeg_quality: Optional[int] = None,
+      max_entries: int = 256,
+  ):
+    """Initializes the cache.
+
+    Args:
+      max_side: See `encode_image`.
+      jpeg_quality: See `encode_image`.
+      max_entries: Maximum number of cached images.
+    """
+    self._max_side = max_side
+    self._jpeg_quality = jpeg_quality
+    self._max_entries = max_entries
+    self._entries = collections.OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def data_url(self, image: ImageInput) -> str:
+    """Returns the `data:` URL of the encoded image."""
+    if isinstance(image, str):
+      stat = os.stat(image)
+      key = (os.path.abspath(image), stat.st_size, stat.st_mtime_ns)
+    else:
+      key = annotation_cache.image_digest(image)
+    with self._lock:
+      if key in self._entries:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        instrumentation.count('vlm/payload_cache_hits')
+        return self._entries[key]
+      self.misses += 1
+    instrumentation.count('vlm/payload_cache_misses')
+
+    url = self._encode(image)
+    with self._lock:
+      self._entries[key] = url
+      while len(self._entries) > self._max_entries:
+        self._entries.popitem(last=False)
+    return url
+
+  def _encode(self, image: ImageInput) -> str:
+    with instrumentation.span('vlm/encode_image'):
+      image_bytes, mime_type = encode_image(
+          image, self._max_side, self._jpeg_quality
+      )
+    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    return f'data:{mime_type};base64,{base64_image}'
+
+
+def pooled_session(pool_size: int = 16) -> requests.Session:
+  """Returns a session keeping up to `pool_size` connections per host alive.
+
+  Args:
+    pool_size: Maximum number of idle connections to keep per host. Should be
+      at least the number of concurrent requests.
+  """
+  session = requests.Session()
+  adapter = adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+  session.mount('https://', adapter)
+  session.mount('http://', adapter)
+  return session
+
+
+def gpt4_response_fn(
+    api_key: str,
+    url: str = OPENAI_CHAT_COMPLETIONS_URL,
+    model: str = 'gpt-4-turbo',
+    max_tokens: int = 300,
+    timeout: float = 60.0,
+    session: Optional[requests.Session] = None,
+    keep_alive: bool = True,
+    max_side: Optional[int] = None,
+    jpeg_quality: Optional[int] = None,
+    payload_cache_size: int = 256,
+) -> VlmFn:
+  """Returns a client for an OpenAI-compatible chat completions endpoint.
+
+  Args:
+    api_key: OpenAI API key.
+    url: URL of the chat completions endpoint, e.g. of a local mock server.
+    model: Name of the model to query.
+    max_tokens: Maximum number of tokens of the response.
+    timeout: Timeout of a request in seconds.
+    session: Session to send requests with. Defaults to a new
+      `pooled_session()`.
+    keep_alive: Whether to reuse connections. If False, every request opens a
+      new connection, like `requests.post`, and `session` is ignored.
+    max_side: Maximum width and height of uploaded images, see `encode_image`.
+    jpeg_quality: JPEG quality of uploaded images, see `encode_image`.
+    payload_cache_size: Number of encoded images to cache.
+
+  Returns:
+    A function `(image, question) -> response text`.
+  """
+  if keep_alive and session is None:
+    session = pooled_session()
+  post = session.post if keep_alive else requests.post
+  payload_cache = ImagePayloadCache(
+      max_side, jpeg_quality, max_entries=payload_cache_size
+  )
+
+  def get_gpt4_response(image: ImageInput, question: str) -> str:
+    image_url = payload_cache.data_url(image)
+
+    headers = {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {api_key}',
+    }
+    payload = {
+        'model': model,
+        'messages': [{
+            'role': 'user',
+            'content': [
+                {'type': 'text', 'text': f'{question}'},
+                {
+                    'type': 'image_url',
+                    'image_url': {'url': image_url},
+                },
+            ],
+        }],
+        'max_tokens': max_tokens,
+    }
+
+    # The image makes up nearly all of the request.
+    instrumentation.count('vlm/request_bytes', len(image_url))
+    try:
+      with instrumentation.span('vlm/request', vlm=model):
+        response = post(url, headers=headers, json=payload, timeout=timeout)
+    except (requests.ConnectionError, requests.Timeout) as e:
+      raise RetryableError(f'Request to {url} failed: {e}') from e
+    instrumentation.count('vlm/response_bytes', len(response.content))
+    if response.status_code in RETRYABLE_STATUS_CODES:
+      raise RetryableError(
+          f'Request to {url} failed with status {response.status_code}.',
+          retry_after=_retry_after_seconds(response.headers),
+      )
+    response.raise_for_status()
+    return response.json()['choices'][0]['message']['content']
+
+  return get_gpt4_response
+
+
+def gemini_response_fn(model: Any) -> VlmFn:
+  """Returns a client for a Gemini model.
+
+  Args:
+    model: A `google.generativeai.GenerativeModel`.
+
+  Returns:
+    A function `(image, question) -> response text`.
+  """
+
+  def get_gemini_response(image: ImageInput, question: str) -> str:
+    image_pil = Image.open(image) if isinstance(image, str) else image
+    try:
+      with instrumentation.span('vlm/request', vlm='gemini'):
+        return model.generate_content([image_pil, question]).text
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      # google.api_core exceptions carry the HTTP status code as `code`.
+      if getattr(e, 'code', None) in RETRYABLE_STATUS_CODES:
+        raise RetryableError(f'Gemini request failed: {e}') from e
+      raise
+
+  return get_gemini_response
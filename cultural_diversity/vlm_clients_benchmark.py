@@ -0,0 +1,138 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+r"""Measures the latency and upload size of the GPT-4 client configurations.
+
+Sends the same SDXL-sized images to a local mock server with a fresh connection
+and the full PNG per request, as `get_gpt4_response` of the notebook does, and
+with pooled connections and downscaled JPEG payloads. The server adds a fixed
+latency and simulates a limited uplink, so that upload size shows in latency.
+Requests are sequential; latencies include encoding images on first use.
+
+Example usage:
+
+  python3 vlm_clients_benchmark.py --num_requests 64 --max_side 512 \
+      --jpeg_quality 85 --upload_mbps 20
+"""
+
+import os
+import tempfile
+import time
+
+from absl import app
+from absl import flags
+import numpy as np
+from PIL import Image
+
+from cube_t2i.cultural_diversity import mock_vlm_server
+from cube_t2i.cultural_diversity import vlm_clients
+
+
+_NUM_REQUESTS = flags.DEFINE_integer(
+    name='num_requests', default=64, help='Number of requests per client.'
+)
+_NUM_IMAGES = flags.DEFINE_integer(
+    name='num_images',
+    default=16,
+    help='Number of distinct images, sent in turn.',
+)
+_IMAGE_SIZE = flags.DEFINE_integer(
+    name='image_size', default=1024, help='Width and height of the images.'
+)
+_MAX_SIDE = flags.DEFINE_integer(
+    name='max_side', default=512, help='Maximum side of uploaded images.'
+)
+_JPEG_QUALITY = flags.DEFINE_integer(
+    name='jpeg_quality', default=85, help='JPEG quality of uploaded images.'
+)
+_LATENCY_MS = flags.DEFINE_float(
+    name='latency_ms', default=5.0, help='Server latency per request.'
+)
+_UPLOAD_MBPS = flags.DEFINE_float(
+    name='upload_mbps',
+    default=20.0,
+    help='Simulated upload bandwidth in megabits per second, 0 for unlimited.',
+)
+
+
+def _write_images(image_dir, num_images, image_size):
+  """Writes smooth random images, which compress like generated images."""
+  rng = np.random.default_rng(0)
+  image_paths = []
+  for i in range(num_images):
+    coarse = rng.integers(0, 256, (image_size // 32, image_size // 32, 3))
+    image = Image.fromarray(coarse.astype(np.uint8)).resize(
+        (image_size, image_size), Image.Resampling.BICUBIC
+    )
+    image_path = os.path.join(image_dir, f'{i}.png')
+    image.save(image_path)
+    image_paths.append(image_path)
+  return image_paths
+
+
+def _run(name, image_paths, num_requests, **client_kwargs):
+  """Sends `num_requests` requests and prints latency and upload statistics."""
+  with mock_vlm_server.MockVlmServer(
+      latency_seconds=_LATENCY_MS.value / 1000,
+      upload_bytes_per_second=_UPLOAD_MBPS.value * 1e6 / 8,
+  ) as server:
+    vlm_fn = vlm_clients.gpt4_response_fn(
+        'test-key', url=server.url, **client_kwargs
+    )
+    latencies = []
+    for i in range(num_requests):
+      start = time.perf_counter()
+      vlm_fn(image_paths[i % len(image_paths)], 'question')
+      latencies.append(time.perf_counter() - start)
+
+  latencies_ms = np.array(latencies) * 1000
+  print(
+      f'{name}: mean {latencies_ms.mean():.1f} ms,'
+      f' p50 {np.percentile(latencies_ms, 50):.1f} ms,'
+      f' p95 {np.percentile(latencies_ms, 95):.1f} ms,'
+      f' {server.bytes_received / num_requests / 1024:.0f} KiB per request,'
+      f' {server.num_connections} connections'
+  )
+
+
+def main(_):
+  with tempfile.TemporaryDirectory() as image_dir:
+    image_paths = _write_images(
+        image_dir, _NUM_IMAGES.value, _IMAGE_SIZE.value
+    )
+    _run(
+        'New connection, original PNG',
+        image_paths,
+        _NUM_REQUESTS.value,
+        keep_alive=False,
+        payload_cache_size=0,
+    )
+    _run(
+        'Pooled connection, original PNG',
+        image_paths,
+        _NUM_REQUESTS.value,
+    )
+    _run(
+        f'Pooled connection, JPEG q{_JPEG_QUALITY.value}'
+        f' <= {_MAX_SIDE.value}px',
+        image_paths,
+        _NUM_REQUESTS.value,
+        max_side=_MAX_SIDE.value,
+        jpeg_quality=_JPEG_QUALITY.value,
+    )
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,130 @@
+# Copyright 2025 DeepMind Technologies Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import base64
+import io
+import os
+import tempfile
+import unittest
+
+from absl import app
+import numpy as np
+from PIL import Image
+
+from cube_t2i.cultural_diversity import mock_vlm_server
+from cube_t2i.cultural_diversity import vlm_clients
+
+
+def _uploaded_image(request):
+  image_url = request["payload"]["messages"][0]["content"][1]["image_url"]
+  header, base64_image = image_url["url"].split(",", 1)
+  return header, Image.open(io.BytesIO(base64.b64decode(base64_image)))
+
+
+class VlmClientsTest(unittest.TestCase):
+  """Test class for vlm_clients.py."""
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.image_path = os.path.join(tmp_dir.name, "image.png")
+    pixels = np.random.default_rng(0).integers(0, 256, (256, 128, 3))
+    Image.fromarray(pixels.astype(np.uint8)).save(self.image_path)
+
+  def test_encode_image_keeps_original_by_default(self):
+    image_bytes, mime_type = vlm_clients.encode_image(self.image_path)
+
+    with open(self.image_path, "rb") as image_file:
+      self.assertEqual(image_bytes, image_file.read())
+    self.assertEqual(mime_type, "image/png")
+
+  def test_encode_image_downscales_to_jpeg(self):
+    image_bytes, mime_type = vlm_clients.encode_image(
+        self.image_path, max_side=64, jpeg_quality=80
+    )
+
+    image = Image.open(io.BytesIO(image_bytes))
+    self.assertEqual(mime_type, "image/jpeg")
+    self.assertEqual(image.format, "JPEG")
+    self.assertEqual(image.size, (32, 64))
+
+  def test_encode_image_in_memory(self):
+    image = Image.open(self.image_path)
+
+    image_bytes, mime_type = vlm_clients.encode_image(image)
+    self.assertEqual(mime_type, "image/png")
+    np.testing.assert_array_equal(
+        np.asarray(Image.open(io.BytesIO(image_bytes))), np.asarray(image)
+    )
+
+    image_bytes, mime_type = vlm_clients.encode_image(image, max_side=64)
+    self.assertEqual(mime_type, "image/jpeg")
+    self.assertEqual(Image.open(io.BytesIO(image_bytes)).size, (32, 64))
+    self.assertEqual(image.size, (128, 256))
+
+  def test_payload_cache_encodes_each_image_once(self):
+    payload_cache = vlm_clients.ImagePayloadCache(max_side=64)
+
+    first = payload_cache.data_url(self.image_path)
+    second = payload_cache.data_url(self.image_path)
+
+    self.assertEqual(first, second)
+    self.assertEqual((payload_cache.hits, payload_cache.misses), (1, 1))
+
+  def test_payload_cache_keys_in_memory_images_by_content(self):
+    payload_cache = vlm_clients.ImagePayloadCache()
+    image = Image.new("RGB", (32, 32), color=(255, 0, 0))
+
+    first = payload_cache.data_url(image)
+    second = payload_cache.data_url(image.copy())
+    other = payload_cache.data_url(Image.new("RGB", (32, 32)))
+
+    self.assertEqual(first, second)
+    self.assertNotEqual(first, other)
+    self.assertEqual((payload_cache.hits, payload_cache.misses), (1, 2))
+
+  def test_client_reuses_connections_and_shrinks_payload(self):
+    with mock_vlm_server.MockVlmServer() as server:
+      vlm_fn = vlm_clients.gpt4_response_fn(
+          "test-key", url=server.url, max_side=64, jpeg_quality=80
+      )
+      for _ in range(5):
+        self.assertEqual(
+            vlm_fn(self.image_path, "question"), "Asia, India, sari"
+        )
+
+    self.assertEqual(len(server.requests), 5)
+    self.assertEqual(server.num_connections, 1)
+    header, image = _uploaded_image(server.requests[0])
+    self.assertEqual(header, "data:image/jpeg;base64")
+    self.assertEqual(image.size, (32, 64))
+
+  def test_client_without_keep_alive(self):
+    with mock_vlm_server.MockVlmServer() as server:
+      vlm_fn = vlm_clients.gpt4_response_fn(
+          "test-key", url=server.url, keep_alive=False
+      )
+      for _ in range(3):
+        vlm_fn(self.image_path, "question")
+
+    self.assertEqual(server.num_connections, 3)
+    header, image = _uploaded_image(server.requests[0])
+    self.assertEqual(header, "data:image/png;base64")
+    self.assertEqual(image.size, (128, 256))
+
+
+if __name__ == "__main__":
+  app.run(lambda argv: unittest.main(argv=argv))